@@ -0,0 +1,325 @@
+"""
+Jeux de données SDMX-ML pour les benchmarks
+
+Chaque fixture est lue depuis benchmarks/fixtures/<nom>.xml si une réponse
+réelle de l'API y a été enregistrée, sinon générée de façon déterministe.
+to_sdmx_csv en donne la représentation SDMX-CSV.
+"""
+import csv
+import io
+import os
+import random
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List
+
+import requests
+from requests.adapters import BaseAdapter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Tailles des jeux de données : complètes et réduites (--quick)
+SIZES = {
+    'full': {'series_years': 50, 'dataflow_series': 10_000, 'dataflow_obs': 24,
+             'catalog_series': 150_000, 'dataflows': 200},
+    'quick': {'series_years': 50, 'dataflow_series': 1_000, 'dataflow_obs': 24,
+              'catalog_series': 15_000, 'dataflows': 200}
+}
+
+_HEADER = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<message:StructureSpecificData '
+    b'xmlns:message="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" '
+    b'xmlns:ns1="urn:sdmx:org.sdmx.infomodel.datastructure.Dataflow=FR1:SERIES_BDM(1.0):ObsLevelDim:TIME_PERIOD">'
+    b'<message:Header><message:ID>BENCHMARK</message:ID><message:Test>true</message:Test></message:Header>'
+    b'<message:DataSet ns1:dataScope="DataStructure">'
+)
+_FOOTER = b'</message:DataSet></message:StructureSpecificData>'
+
+# Vocabulaire des titres générés, proche de celui de la BDM
+_SUBJECTS = [
+    "Indice des prix à la consommation", "Indice de production industrielle",
+    "Taux de chômage", "Produit intérieur brut", "Créations d'entreprises",
+    "Défaillances d'entreprises", "Emploi salarié", "Chiffre d'affaires",
+    "Indice du coût de la construction", "Nombre de naissances", "Nombre de décès",
+    "Solde des échanges extérieurs", "Consommation des ménages en biens",
+    "Indice de référence des loyers", "Mises en chantier de logements"
+]
+_SCOPES = [
+    "Ensemble des ménages", "France métropolitaine", "France entière", "Hors tabac",
+    "Industrie manufacturière", "Commerce de détail", "Services marchands",
+    "Alimentation", "Énergie", "Bâtiment", "Hommes", "Femmes", "15-24 ans",
+    "Île-de-France", "Auvergne-Rhône-Alpes", "Nouvelle-Aquitaine", "Occitanie"
+]
+_ADJUSTMENTS = ["Série brute", "Série CVS", "Série CVS-CJO", "Base 2015", "Base 2020"]
+_UNITS = ["IND", "POURCENT", "EUROS", "NOMBRE"]
+
+# Dimensions des séries générées (hors FREQ) : identifiant, libellé, codes et libellés
+# des codes, dans l'ordre des titres (sujet, champ, correction)
+_DIMENSIONS = [
+    ('INDICATEUR', "Indicateur", [f"I{i:02d}" for i in range(len(_SUBJECTS))], _SUBJECTS),
+    ('CHAMP', "Champ", [f"C{i:02d}" for i in range(len(_SCOPES))], _SCOPES),
+    ('CORRECTION', "Correction", ["BRUT", "CVS", "CVS-CJO", "B2015", "B2020"], _ADJUSTMENTS)
+]
+_FREQUENCIES = {'A': "Annuelle", 'T': "Trimestrielle", 'M': "Mensuelle"}
+
+
+def _titles(rng: random.Random) -> Dict[str, str]:
+    """Titres et codes des dimensions cohérents entre eux"""
+    subject = rng.choice(_SUBJECTS)
+    scope = rng.choice(_SCOPES)
+    adjustment = rng.choice(_ADJUSTMENTS)
+    titles = {
+        'TITLE_FR': f"{subject} - {scope} - {adjustment}",
+        'TITLE_EN': f"{subject} ({scope}) - {adjustment}"
+    }
+    for (dimension, _, codes, labels), label in zip(_DIMENSIONS, (subject, scope, adjustment)):
+        titles[dimension] = codes[labels.index(label)]
+    return titles
+
+
+def _xml_attr(value: str) -> str:
+    return value.replace('&', '&amp;').replace('"', '&quot;').replace('<', '&lt;')
+
+
+def _series_open(idbank: int, freq: str, rng: random.Random) -> bytes:
+    titles = _titles(rng)
+    dimensions = ''.join(f'{dimension}="{titles[dimension]}" ' for dimension, *_ in _DIMENSIONS)
+    return (
+        f'<Series IDBANK="{idbank:09d}" FREQ="{freq}" {dimensions}'
+        f'TITLE_FR="{_xml_attr(titles["TITLE_FR"])}" TITLE_EN="{_xml_attr(titles["TITLE_EN"])}" '
+        f'UNIT_MEASURE="{rng.choice(_UNITS)}" UNIT_MULT="0" DECIMALS="1" '
+        f'LAST_UPDATE="2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}">'
+    ).encode('utf-8')
+
+
+def _monthly_obs(count: int, rng: random.Random) -> bytes:
+    """count observations mensuelles, de la plus récente à la plus ancienne (ordre de l'API)"""
+    last_year, value = 2024, 100.0
+    parts = []
+    for offset in range(count):
+        year, month = last_year - offset // 12, 12 - offset % 12
+        value += rng.uniform(-1, 1)
+        parts.append(
+            f'<Obs TIME_PERIOD="{year}-{month:02d}" OBS_VALUE="{value:.1f}" '
+            f'OBS_STATUS="A" OBS_QUAL="DEF" OBS_TYPE="A"/>'
+        )
+    return ''.join(parts).encode('utf-8')
+
+
+def generate_series(years: int = 50, seed: int = 1) -> bytes:
+    """Une série mensuelle couvrant years années"""
+    rng = random.Random(seed)
+    return b''.join([_HEADER, _series_open(1, 'M', rng), _monthly_obs(years * 12, rng),
+                     b'</Series>', _FOOTER])
+
+
+def generate_dataset(series_count: int, obs_per_series: int = 0, seed: int = 2) -> bytes:
+    """
+    Un message de données avec series_count séries
+    (obs_per_series=0 : attributs seuls, comme l'annuaire SERIES_BDM)
+    """
+    rng = random.Random(seed)
+    parts = [_HEADER]
+    for i in range(series_count):
+        parts.append(_series_open(10_000_000 + i, 'M', rng))
+        if obs_per_series:
+            parts.append(_monthly_obs(obs_per_series, rng))
+        parts.append(b'</Series>')
+    parts.append(_FOOTER)
+    return b''.join(parts)
+
+
+def generate_idbank_series(idbanks: List[int], obs_per_series: int) -> bytes:
+    """
+    Un message de données pour des idBank donnés : chaque série est déterministe
+    (mêmes attributs et mêmes dernières valeurs quel que soit obs_per_series)
+    """
+    parts = [_HEADER]
+    for idbank in idbanks:
+        rng = random.Random(idbank)
+        parts.append(_series_open(idbank, 'M', rng))
+        if obs_per_series:
+            parts.append(_monthly_obs(obs_per_series, rng))
+        parts.append(b'</Series>')
+    parts.append(_FOOTER)
+    return b''.join(parts)
+
+
+def generate_dataflows(count: int = 200, seed: int = 3) -> bytes:
+    """Un message de structure listant count dataflows"""
+    rng = random.Random(seed)
+    parts = [
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<message:Structure xmlns:message="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" '
+        b'xmlns:structure="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure" '
+        b'xmlns:common="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common">'
+        b'<message:Structures><structure:Dataflows>'
+    ]
+    for i in range(count):
+        subject, scope = rng.choice(_SUBJECTS), rng.choice(_SCOPES)
+        parts.append((
+            f'<structure:Dataflow id="DF-{i:03d}-{subject.split()[0].upper()}" agencyID="FR1" version="1.0">'
+            f'<common:Name xml:lang="fr">{_xml_attr(subject)} - {_xml_attr(scope)}</common:Name>'
+            f'<common:Description xml:lang="fr">Séries {_xml_attr(subject.lower())} '
+            f'par {_xml_attr(scope.lower())}</common:Description>'
+            f'</structure:Dataflow>'
+        ).encode('utf-8'))
+    parts.append(b'</structure:Dataflows></message:Structures></message:Structure>')
+    return b''.join(parts)
+
+
+# Colonnes SDMX-CSV produites par to_sdmx_csv
+_CSV_SERIES_COLUMNS = ['IDBANK', 'FREQ'] + [dimension for dimension, *_ in _DIMENSIONS] + [
+    'TITLE_FR', 'TITLE_EN', 'UNIT_MEASURE', 'UNIT_MULT', 'DECIMALS', 'LAST_UPDATE']
+_CSV_OBS_COLUMNS = ['TIME_PERIOD', 'OBS_VALUE', 'OBS_STATUS', 'OBS_QUAL', 'OBS_TYPE']
+
+
+def to_sdmx_csv(xml_data: bytes, dataflow: str = "FR1:SERIES_BDM(1.0)") -> bytes:
+    """
+    Représentation SDMX-CSV d'un message de données SDMX-ML : une ligne par
+    observation, attributs de série répétés (une ligne sans TIME_PERIOD pour
+    une série sans observation)
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(['DATAFLOW'] + _CSV_SERIES_COLUMNS + _CSV_OBS_COLUMNS)
+    series, has_obs = None, False
+    for event, elem in ET.iterparse(io.BytesIO(xml_data), events=('start', 'end')):
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if event == 'start':
+            if tag == 'Series':
+                series = [dataflow] + [elem.get(name, '') for name in _CSV_SERIES_COLUMNS]
+                has_obs = False
+            continue
+        if tag == 'Obs':
+            writer.writerow(series + [elem.get(name, '') for name in _CSV_OBS_COLUMNS])
+            has_obs = True
+        elif tag == 'Series':
+            if not has_obs:
+                writer.writerow(series + [''] * len(_CSV_OBS_COLUMNS))
+            elem.clear()
+    return output.getvalue().encode('utf-8')
+
+
+def generate_datastructure(dataflow_id: str) -> bytes:
+    """
+    Structure (DSD) d'un dataflow généré, avec ses codelists et concepts
+    (réponse de V1/datastructure/FR1/{id}?references=children)
+    """
+    dimensions = [('FREQ', "Périodicité", list(_FREQUENCIES), list(_FREQUENCIES.values()))] + _DIMENSIONS
+    parts = [
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<message:Structure xmlns:message="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" '
+        b'xmlns:structure="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure" '
+        b'xmlns:common="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common">'
+        b'<message:Structures><structure:Codelists>'
+    ]
+    for dimension, _, codes, labels in dimensions:
+        parts.append(f'<structure:Codelist id="CL_{dimension}" agencyID="FR1" version="1.0">'.encode('utf-8'))
+        parts.extend(
+            f'<structure:Code id="{code}"><common:Name xml:lang="fr">{_xml_attr(label)}</common:Name>'
+            f'<common:Name xml:lang="en">{_xml_attr(label)}</common:Name></structure:Code>'.encode('utf-8')
+            for code, label in zip(codes, labels)
+        )
+        parts.append(b'</structure:Codelist>')
+    parts.append(b'</structure:Codelists><structure:Concepts>'
+                 b'<structure:ConceptScheme id="CONCEPTS_INSEE" agencyID="FR1" version="1.0">')
+    parts.extend(
+        f'<structure:Concept id="{dimension}"><common:Name xml:lang="fr">{_xml_attr(name)}</common:Name>'
+        f'</structure:Concept>'.encode('utf-8')
+        for dimension, name, *_ in dimensions
+    )
+    parts.append((
+        f'</structure:ConceptScheme></structure:Concepts><structure:DataStructures>'
+        f'<structure:DataStructure id="{_xml_attr(dataflow_id)}" agencyID="FR1" version="1.0">'
+        f'<structure:DataStructureComponents><structure:DimensionList id="DimensionDescriptor">'
+    ).encode('utf-8'))
+    for position, (dimension, *_) in enumerate(dimensions, start=1):
+        parts.append((
+            f'<structure:Dimension id="{dimension}" position="{position}">'
+            f'<structure:ConceptIdentity><Ref id="{dimension}" maintainableParentID="CONCEPTS_INSEE" '
+            f'class="Concept"/></structure:ConceptIdentity>'
+            f'<structure:LocalRepresentation><structure:Enumeration><Ref id="CL_{dimension}" '
+            f'class="Codelist"/></structure:Enumeration></structure:LocalRepresentation>'
+            f'</structure:Dimension>'
+        ).encode('utf-8'))
+    parts.append((
+        f'<structure:TimeDimension id="TIME_PERIOD" position="{len(dimensions) + 1}"/>'
+        f'</structure:DimensionList></structure:DataStructureComponents></structure:DataStructure>'
+        f'</structure:DataStructures></message:Structures></message:Structure>'
+    ).encode('utf-8'))
+    return b''.join(parts)
+
+
+def load_fixture(name: str, generator, *args) -> bytes:
+    """Réponse enregistrée benchmarks/fixtures/<name>.xml si présente, sinon générée"""
+    path = os.path.join(FIXTURE_DIR, f"{name}.xml")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    return generator(*args)
+
+
+def load_fixtures(size: str = 'full') -> Dict[str, bytes]:
+    """Toutes les fixtures utilisées par run_benchmarks.py"""
+    sizes = SIZES[size]
+    return {
+        'series': load_fixture('series_monthly_50y', generate_series, sizes['series_years']),
+        'dataflow': load_fixture('dataflow_10k', generate_dataset,
+                                 sizes['dataflow_series'], sizes['dataflow_obs']),
+        'dataflow_nodata': load_fixture('dataflow_10k_nodata', generate_dataset, sizes['dataflow_series']),
+        'catalog': load_fixture('series_bdm_catalog', generate_dataset, sizes['catalog_series']),
+        'dataflows': load_fixture('dataflows', generate_dataflows, sizes['dataflows'])
+    }
+
+
+def iter_chunks(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    """Découpe une fixture en blocs, comme response.iter_content()"""
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+class FixtureAdapter(BaseAdapter):
+    """
+    Adaptateur requests qui sert les fixtures au lieu d'appeler l'API :
+    les méthodes du client sont mesurées sans réseau, flux de réponse compris
+
+    Args:
+        routes: Suffixe d'URL (ex: '/V1/data/DF/all', ou avec paramètres
+            '/V1/data/DF/all?detail=nodata', testé avant) -> corps de la réponse
+    """
+    def __init__(self, routes: Dict[str, bytes]):
+        super().__init__()
+        self.routes = routes
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        path_url = request.path_url
+        path = path_url.split('?', 1)[0]
+        body = next((data for suffix, data in self.routes.items() if path_url.endswith(suffix)), None)
+        if body is None:
+            body = next((data for suffix, data in self.routes.items() if path.endswith(suffix)), None)
+        if body is None:
+            response.status_code = 404
+            body = b'Not Found'
+        else:
+            response.status_code = 200
+        response.headers['Content-Type'] = 'application/xml'
+        response.raw = io.BytesIO(body)
+        return response
+
+    def close(self):
+        pass
+
+
+def fixture_queries() -> Dict[str, List[str]]:
+    """Requêtes de recherche mesurées (termes exacts, préfixes, fautes de frappe)"""
+    return {
+        'series': ["prix consommation", "chomage", "indice production industrielle",
+                   "cvs", "naissances ile-de-france", "010000123", "loyers base 2020",
+                   "chiffre affaires commerce"],
+        'dataflows': ["prix", "chomage", "production industrielle", "constrction",
+                      "entreprises", "menages", "logements", "pib"]
+    }
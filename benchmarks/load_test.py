@@ -0,0 +1,392 @@
+"""
+Test de charge : N utilisateurs simulés parcourent les pages de visualisation
+et d'explorateur, et cherchent dans l'annuaire des séries, contre le serveur
+local benchmarks/mock_server.py
+
+Comme les sessions Streamlit d'un même processus, les utilisateurs partagent
+le client InseeBdmAPI (session HTTP, token, cache SQLite), le limiteur de débit
+et le cache partagé ; chaque parcours enchaîne les appels de la page simulée.
+Une seconde phase fait tourner autant de tâches asyncio sur un même
+AsyncInseeBdmAPI (séries, lots et dataflows), avec le même limiteur et le même
+disjoncteur.
+
+Usage :
+    python benchmarks/load_test.py [--users 10] [--duration 60] [--think-time 0.5]
+                                   [--latency 0.1] [--error-rate 0.0] [--throttle-rate 0.0] [--drop-rate 0.0]
+                                   [--quota 30] [--rate-per-minute 25] [--no-shared-cache]
+                                   [--no-sqlite-cache] [--data-format xml|csv] [--parser lxml|stdlib]
+                                   [--async-users 5] [--async-duration 10]
+                                   [--url http://hôte:port] [--output fichier.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import fixture_queries
+from benchmarks.mock_server import MockInseeServer
+from benchmarks.run_benchmarks import RESULTS_DIR, git_commit, percentile
+from charting import downsample_frame, max_points_for_width
+from comparison import align_frame, combine_aligned, common_frequency, series_frequency
+from circuit_breaker import CircuitBreaker
+from insee_bdm_api import InseeBdmAPI, DATA_ACCEPT_TYPES, PARSER_BACKENDS, DEFAULT_DEADLINE
+from insee_bdm_async import AsyncInseeBdmAPI
+from instrumentation import Metrics
+from observations import slice_frame
+from rate_limiter import TokenBucketRateLimiter, DEFAULT_RATE_PER_MINUTE
+from search_index import DataflowIndex, DataflowSeriesTable
+from shared_cache import SharedCache, SERIES_TTL, DATAFLOWS_TTL, DATAFLOW_SERIES_TTL
+
+# Répartition des parcours simulés
+FLOW_WEIGHTS = {'visualisation': 0.45, 'comparaison': 0.2, 'explorateur': 0.25, 'recherche': 0.1}
+
+# Répartition des parcours de la phase asynchrone (le client asynchrone n'a pas de cache)
+ASYNC_FLOW_WEIGHTS = {'visualisation': 0.5, 'comparaison': 0.3, 'explorateur': 0.2}
+
+
+class FlowError(Exception):
+    """Un appel du parcours a retourné une erreur"""
+
+
+class SimulatedApp:
+    """
+    Parcours des pages, reproduits avec les mêmes appels que insee_web_app.py
+    et pages/explorer_series.py (sans rendu Streamlit)
+    """
+    def __init__(self, api: InseeBdmAPI, shared_cache: Optional[SharedCache], idbanks: List[str]):
+        self.api = api
+        self.shared_cache = shared_cache
+        self.idbanks = idbanks
+        self.queries = fixture_queries()['dataflows']
+        self.series_queries = fixture_queries()['series']
+
+    def cached(self, key, loader: Callable, ttl: float, cache_if: Optional[Callable] = None):
+        """Cache partagé (get_or_load) ou appel direct s'il est désactivé"""
+        if self.shared_cache is None:
+            return loader()
+        if cache_if is None:
+            return self.shared_cache.get_or_load(key, loader, ttl=ttl)
+        return self.shared_cache.get_or_load(key, loader, ttl=ttl, cache_if=cache_if)
+
+    def full_series(self, idbank: str) -> Dict:
+        result = self.cached(('series', idbank),
+                             lambda: self.api.get_series_by_idbank(idbank, as_frame=True), SERIES_TTL)
+        if "error" in result:
+            raise FlowError(result['error'])
+        return result
+
+    def visualisation(self, rng: random.Random):
+        """Série unique : historique complet, année de début, points du graphique, dernières valeurs"""
+        result = self.full_series(rng.choice(self.idbanks))
+        df = slice_frame(result['frame'], f"{rng.randint(1995, 2020)}-01")
+        downsample_frame(df, max_points_for_width())
+        df.tail(12)
+
+    def comparaison(self, rng: random.Random):
+        """Comparaison : séries absentes du cache demandées en une requête groupée, puis alignées"""
+        idbanks = rng.sample(self.idbanks, min(3, len(self.idbanks)))
+        results, missing = {}, []
+        for idbank in idbanks:
+            cached = self.shared_cache.get(('series', idbank)) if self.shared_cache else None
+            if cached is not None:
+                results[idbank] = cached
+            else:
+                missing.append(idbank)
+        if missing:
+            batch = self.api.get_series_batch(missing, as_frame=True)
+            if batch['errors']:
+                raise FlowError(next(iter(batch['errors'].values())))
+            for idbank in missing:
+                results[idbank] = batch['series'][self.api.format_idbank(idbank)]
+                if self.shared_cache is not None:
+                    self.shared_cache.set(('series', idbank), results[idbank], ttl=SERIES_TTL)
+        frequencies = {idbank: series_frequency(result['metadata']) for idbank, result in results.items()}
+        target = common_frequency(list(frequencies.values()))
+        combine_aligned({
+            idbank: align_frame(result['frame'], frequencies[idbank], target)
+            for idbank, result in results.items()
+        }, normalize=True)
+
+    def explorateur(self, rng: random.Random):
+        """Explorateur : catalogue, recherche d'un thème, séries du thème filtrées et paginées"""
+        def load_dataflows():
+            dataflows = self.api.get_dataflows()
+            if isinstance(dataflows, dict):
+                raise FlowError(dataflows['error'])
+            return DataflowIndex(dataflows)
+        index = self.cached(('dataflows',), load_dataflows, DATAFLOWS_TTL,
+                            cache_if=lambda index: len(index) > 0)
+        matches = index.search(rng.choice(self.queries))
+        if not matches:
+            return
+        dataflow_id = rng.choice(matches[:5])['id']
+
+        def load_table():
+            series = self.api.get_dataflow_series(dataflow_id)
+            if isinstance(series, dict):
+                raise FlowError(series['error'])
+            # Sans structure, la page se contente des filtres fréquence et unité
+            structure = self.api.get_datastructure(dataflow_id)
+            return DataflowSeriesTable(series, None if "error" in structure else structure)
+        table = self.cached(('dataflow_series', dataflow_id), load_table, DATAFLOW_SERIES_TTL,
+                            cache_if=lambda table: len(table) > 0)
+        # Deux dimensions tirées au hasard, puis un terme du titre
+        selections = {}
+        for field in rng.sample(list(table.facet_fields()), min(2, len(table.facet_fields()))):
+            selections[field] = rng.sample(table.facet_values[field], min(2, len(table.facet_values[field])))
+        positions, _ = table.drilldown(selections, rng.choice(["indice", "taux", "cvs", ""]))
+        table.page(positions, 1, 50)
+
+
+    def recherche(self, rng: random.Random):
+        """Recherche dans l'annuaire SERIES_BDM : index local, téléchargé puis rafraîchi au besoin"""
+        found = self.api.search_series(rng.choice(self.series_queries), page=rng.randint(1, 3), page_size=20)
+        if isinstance(found, dict):
+            raise FlowError(found['error'])
+
+
+def run_user(app: SimulatedApp, user: int, deadline: float, think_time: float,
+             samples: Dict[str, List], errors: Dict[str, int], lock: threading.Lock):
+    """Enchaîne des parcours tirés selon FLOW_WEIGHTS jusqu'à l'échéance"""
+    rng = random.Random(user)
+    flows, weights = list(FLOW_WEIGHTS), list(FLOW_WEIGHTS.values())
+    while time.monotonic() < deadline:
+        flow = rng.choices(flows, weights)[0]
+        started = time.perf_counter()
+        failed = False
+        try:
+            getattr(app, flow)(rng)
+        except FlowError:
+            failed = True
+        elapsed = time.perf_counter() - started
+        with lock:
+            samples[flow].append(elapsed)
+            if failed:
+                errors[flow] += 1
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+
+class SimulatedAsyncApp:
+    """Mêmes parcours, appelés depuis des tâches asyncio sur AsyncInseeBdmAPI"""
+    def __init__(self, api: AsyncInseeBdmAPI, idbanks: List[str]):
+        self.api = api
+        self.idbanks = idbanks
+        self.queries = fixture_queries()['dataflows']
+
+    async def visualisation(self, rng: random.Random):
+        result = await self.api.get_series_by_idbank(rng.choice(self.idbanks),
+                                                     start_period=f"{rng.randint(1995, 2020)}-01")
+        if "error" in result:
+            raise FlowError(result['error'])
+
+    async def comparaison(self, rng: random.Random):
+        batch = await self.api.get_series_batch(rng.sample(self.idbanks, min(3, len(self.idbanks))))
+        if batch['errors']:
+            raise FlowError(next(iter(batch['errors'].values())))
+
+    async def explorateur(self, rng: random.Random):
+        dataflows = await self.api.get_dataflows()
+        if isinstance(dataflows, dict):
+            raise FlowError(dataflows['error'])
+        matches = DataflowIndex(dataflows).search(rng.choice(self.queries))
+        if not matches:
+            return
+        series = await self.api.get_dataflow_series(rng.choice(matches[:5])['id'])
+        if isinstance(series, dict):
+            raise FlowError(series['error'])
+
+
+async def run_async_user(app: SimulatedAsyncApp, user: int, deadline: float, think_time: float,
+                         samples: Dict[str, List], errors: Dict[str, int]):
+    """Enchaîne des parcours tirés selon ASYNC_FLOW_WEIGHTS jusqu'à l'échéance"""
+    rng = random.Random(user)
+    flows, weights = list(ASYNC_FLOW_WEIGHTS), list(ASYNC_FLOW_WEIGHTS.values())
+    while time.monotonic() < deadline:
+        flow = rng.choices(flows, weights)[0]
+        started = time.perf_counter()
+        try:
+            await getattr(app, flow)(rng)
+        except FlowError:
+            errors[flow] += 1
+        samples[flow].append(time.perf_counter() - started)
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * think_time))
+
+
+async def run_async_phase(api: AsyncInseeBdmAPI, idbanks: List[str], users: int, duration: float,
+                          think_time: float) -> Tuple[Dict[str, List], Dict[str, int], float]:
+    """Lance users tâches sur le même client asynchrone ; retourne latences, erreurs et durée"""
+    app = SimulatedAsyncApp(api, idbanks)
+    samples = {flow: [] for flow in ASYNC_FLOW_WEIGHTS}
+    errors = {flow: 0 for flow in ASYNC_FLOW_WEIGHTS}
+    started = time.monotonic()
+    async with api:
+        await asyncio.gather(*(run_async_user(app, user, started + duration, think_time, samples, errors)
+                               for user in range(users)))
+    return samples, errors, time.monotonic() - started
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'throughput_per_s': len(latencies) / duration,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else 0.0) * 1000
+        }
+    }
+
+
+def print_results(results: Dict[str, Dict]):
+    for name, result in results.items():
+        print(f"{name:<14} {result['count']:6d} parcours  {result['errors']:4d} erreur(s)  "
+              f"{result['throughput_per_s']:7.2f}/s  p50 {result['latency_ms']['p50']:9.1f} ms  "
+              f"p95 {result['latency_ms']['p95']:9.1f} ms  p99 {result['latency_ms']['p99']:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'application contre un serveur INSEE local")
+    parser.add_argument('--users', type=int, default=10, help="Utilisateurs simultanés")
+    parser.add_argument('--duration', type=float, default=60, help="Durée du test (secondes)")
+    parser.add_argument('--think-time', type=float, default=0.5, help="Pause moyenne entre deux parcours")
+    parser.add_argument('--series', type=int, default=20, help="Nombre de séries sauvegardées simulées")
+    parser.add_argument('--latency', type=float, default=0.1, help="Latence du serveur local (secondes)")
+    parser.add_argument('--jitter', type=float, default=0.05, help="Variation de la latence (secondes)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proportion de réponses 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Proportion de 429 aléatoires")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Proportion de connexions coupées sans réponse")
+    parser.add_argument('--quota', type=float, default=30, help="Quota du serveur par minute (0 : illimité)")
+    parser.add_argument('--rate-per-minute', type=float, default=DEFAULT_RATE_PER_MINUTE,
+                        help="Débit du limiteur du client")
+    parser.add_argument('--no-shared-cache', action='store_true', help="Désactive le cache partagé")
+    parser.add_argument('--no-sqlite-cache', action='store_true', help="Désactive le cache SQLite")
+    parser.add_argument('--data-format', choices=list(DATA_ACCEPT_TYPES), default='xml',
+                        help="Représentation demandée pour les séries")
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, help="Parser SDMX-ML (par défaut : lxml si installé)")
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE,
+                        help="Durée maximale d'un appel, en secondes (0 : illimitée)")
+    parser.add_argument('--async-users', type=int, default=5,
+                        help="Tâches simultanées de la phase asynchrone (0 : pas de phase asynchrone)")
+    parser.add_argument('--async-duration', type=float, default=10, help="Durée de la phase asynchrone (secondes)")
+    parser.add_argument('--url', help="Serveur déjà démarré (mock_server.py) au lieu d'un serveur interne")
+    parser.add_argument('--output', help="Fichier JSON des résultats (par défaut benchmarks/results/)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url, token_url = f"{args.url}/series/BDM", f"{args.url}/token"
+    else:
+        server = MockInseeServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                 throttle_rate=args.throttle_rate, drop_rate=args.drop_rate,
+                                 quota_per_minute=args.quota or None).start()
+        base_url, token_url = server.base_url, server.token_url
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = None if args.no_sqlite_cache else os.path.join(tmp, "load_cache.sqlite")
+        index_path = os.path.join(tmp, "load_series_index.pkl")
+        metrics = Metrics()
+        limiter = TokenBucketRateLimiter(rate_per_minute=args.rate_per_minute)
+        breaker = CircuitBreaker()
+        api = InseeBdmAPI("load", "test", base_url=base_url, token_url=token_url, cache_path=cache_path,
+                          search_index_path=index_path, rate_limiter=limiter, metrics=metrics,
+                          data_format=args.data_format, parser_backend=args.parser,
+                          deadline=args.deadline or None, circuit_breaker=breaker)
+        shared_cache = None if args.no_shared_cache else SharedCache()
+        idbanks = [f"{1_000_000 + i:09d}" for i in range(args.series)]
+        app = SimulatedApp(api, shared_cache, idbanks)
+
+        print(f"Test de charge : {args.users} utilisateur(s) pendant {args.duration:.0f} s ({base_url})")
+        samples = {flow: [] for flow in FLOW_WEIGHTS}
+        errors = {flow: 0 for flow in FLOW_WEIGHTS}
+        lock = threading.Lock()
+        started = time.monotonic()
+        deadline = started + args.duration
+        threads = [
+            threading.Thread(target=run_user, name=f"user-{user}",
+                             args=(app, user, deadline, args.think_time, samples, errors, lock))
+            for user in range(args.users)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.monotonic() - started
+
+        results = {flow: summarize(samples[flow], errors[flow], duration) for flow in FLOW_WEIGHTS}
+        results['total'] = summarize([value for flow in FLOW_WEIGHTS for value in samples[flow]],
+                                     sum(errors.values()), duration)
+        print_results(results)
+
+        async_results = None
+        if args.async_users > 0:
+            print(f"\nPhase asynchrone : {args.async_users} tâche(s) pendant {args.async_duration:.0f} s")
+            async_api = AsyncInseeBdmAPI("load", "test", base_url=base_url, token_url=token_url,
+                                         rate_limiter=limiter, metrics=metrics,
+                                         data_format=args.data_format, parser_backend=args.parser,
+                                         deadline=args.deadline or None, circuit_breaker=breaker)
+            async_samples, async_errors, async_duration = asyncio.run(run_async_phase(
+                async_api, idbanks, args.async_users, args.async_duration, args.think_time))
+            async_results = {flow: summarize(async_samples[flow], async_errors[flow], async_duration)
+                             for flow in ASYNC_FLOW_WEIGHTS}
+            async_results['total'] = summarize(
+                [value for flow in ASYNC_FLOW_WEIGHTS for value in async_samples[flow]],
+                sum(async_errors.values()), async_duration)
+            print_results(async_results)
+
+        upstream = {
+            endpoint: {'count': stats['total']['count'], 'errors': stats['errors'],
+                       'p95_ms': stats['total']['p95_ms'], 'statuses': stats['statuses']}
+            for endpoint, stats in metrics.summary().items()
+        }
+        payload = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'config': vars(args),
+            'duration_s': duration,
+            'results': results,
+            'async_results': async_results,
+            'upstream': upstream,
+            'server': server.stats() if server else None,
+            'rate_limiter': limiter.stats(),
+            'circuit_breaker': breaker.stats(),
+            'shared_cache': shared_cache.stats() if shared_cache else None,
+            'sqlite_cache': api.cache.stats() if api.cache else None
+        }
+        if server is not None:
+            server_stats = server.stats()
+            print(f"Serveur : {sum(server_stats['requests'].values())} requête(s), "
+                  f"statuts {server_stats['statuses']}, {server_stats['bytes'] / 2 ** 20:.1f} Mo envoyés")
+            server.stop()
+        breaker_stats = breaker.stats()
+        print(f"Disjoncteur : {breaker_stats['opened']} ouverture(s), "
+              f"{breaker_stats['rejected']} requête(s) refusée(s)")
+        api.session.close()
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+    print(f"\nRésultats enregistrés dans {output}")
+
+
+if __name__ == '__main__':
+    main()
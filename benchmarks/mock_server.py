@@ -0,0 +1,387 @@
+"""
+Serveur local imitant les points d'accès de l'API BDM utilisés par le client
+
+Les réponses sont générées à partir des fixtures (benchmarks/fixtures.py), avec
+une latence, un taux d'erreurs 503, des 429 aléatoires et un quota par minute
+configurables : les tests de charge n'entament pas le quota INSEE. Les messages
+de données sont servis en SDMX-CSV aux requêtes qui le proposent (Accept), sauf
+avec --no-csv.
+
+Usage :
+    python benchmarks/mock_server.py [--port 8765] [--latency 0.1] [--jitter 0.05]
+                                     [--error-rate 0.01] [--throttle-rate 0.0] [--drop-rate 0.0]
+                                     [--quota 30] [--no-csv]
+
+Pour y connecter l'application, renseigner dans .streamlit/secrets.toml :
+    [api_insee]
+    base_url = "http://127.0.0.1:8765/series/BDM"
+    token_url = "http://127.0.0.1:8765/token"
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Union
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import (generate_dataflows, generate_datastructure, generate_dataset,
+                                 generate_idbank_series, to_sdmx_csv)
+from insee_bdm_api import SDMX_CSV_TYPE
+
+# Dernière période des séries générées (voir fixtures._monthly_obs)
+LAST_YEAR, LAST_MONTH = 2024, 12
+
+# Les idBank commençant par ce préfixe n'existent pas (réponse sans la série, 404 si aucune)
+UNKNOWN_IDBANK_PREFIX = '9'
+
+_SERIES_PATH = re.compile(r'/data/SERIES_BDM/([0-9+]+)$')
+_CATALOG_PATH = re.compile(r'/data/SERIES_BDM/?$')
+_DATAFLOW_DATA_PATH = re.compile(r'/V1/data/([^/]+)/all$')
+_DATASTRUCTURE_PATH = re.compile(r'/V1/datastructure/[^/]+/([^/]+)$')
+
+
+def months_since(period: str) -> int:
+    """Nombre de périodes mensuelles de period (AAAA ou AAAA-MM) à la dernière période générée"""
+    year = int(period[:4])
+    month = int(period[5:7]) if len(period) >= 7 and period[5:7].isdigit() else 1
+    return max(0, (LAST_YEAR - year) * 12 + (LAST_MONTH - month) + 1)
+
+
+class MockInseeServer:
+    """
+    Serveur HTTP multi-thread servant /token, data/SERIES_BDM (annuaire),
+    data/SERIES_BDM/..., V1/dataflow, V1/data/{id}/all et V1/datastructure/FR1/{id}
+
+    Chaque requête attend latency ± jitter secondes, puis peut être refusée
+    par le quota (429 avec Retry-After), par un 429 aléatoire (throttle_rate)
+    ou par une erreur 503 (error_rate), ou voir sa connexion coupée sans réponse
+    (drop_rate) ; les compteurs sont exposés par stats().
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 jitter: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 quota_per_minute: Optional[float] = None, history_years: int = 30,
+                 dataflow_series: int = 2000, dataflows: int = 200, catalog_series: int = 20000,
+                 token_lifetime: float = 7 * 24 * 3600, seed: int = 0, sdmx_csv: bool = True,
+                 drop_rate: float = 0.0):
+        """
+        Args:
+            latency (float): Latence moyenne ajoutée à chaque réponse (secondes)
+            jitter (float): Variation uniforme de la latence (secondes)
+            error_rate (float): Proportion de réponses 503
+            throttle_rate (float): Proportion de réponses 429 hors quota
+            quota_per_minute (float): Quota global de requêtes, comme celui de l'INSEE (None : illimité)
+            history_years (int): Profondeur de l'historique des séries
+            dataflow_series (int): Nombre de séries de chaque dataflow
+            catalog_series (int): Nombre de séries de l'annuaire SERIES_BDM (attributs seuls)
+            sdmx_csv (bool): Servir SDMX-CSV aux requêtes de données qui le proposent
+            drop_rate (float): Proportion de connexions fermées sans réponse (erreur réseau)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.throttle_rate = throttle_rate
+        self.quota_per_minute = quota_per_minute
+        self.history_months = history_years * 12
+        self.dataflow_series = dataflow_series
+        self.catalog_series = catalog_series
+        self.token_lifetime = token_lifetime
+        self.sdmx_csv = sdmx_csv
+        self.dataflows_body = generate_dataflows(dataflows)
+        self._dataflow_bodies = {}
+        self._catalog_bodies = {}
+        self._tokens = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._quota_tokens = quota_per_minute or 0.0
+        self._quota_updated = time.monotonic()
+        self._stats = {'requests': {}, 'statuses': {}, 'bytes': 0}
+        self._server = _MockHTTPServer((host, port), _MockHandler)
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        """Équivalent de DEFAULT_BASE_URL"""
+        return f"{self.url}/series/BDM"
+
+    @property
+    def token_url(self) -> str:
+        """Équivalent de DEFAULT_TOKEN_URL"""
+        return f"{self.url}/token"
+
+    def start(self) -> 'MockInseeServer':
+        """Démarre le serveur dans un thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="insee-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Sert les requêtes dans le thread courant (ligne de commande)"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        """Arrête le serveur démarré par start()"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict:
+        """Requêtes par route, réponses par statut et octets envoyés"""
+        with self._lock:
+            return {
+                'requests': dict(self._stats['requests']),
+                'statuses': dict(self._stats['statuses']),
+                'bytes': self._stats['bytes']
+            }
+
+    def record(self, route: str, status: Union[int, str], size: int):
+        with self._lock:
+            self._stats['requests'][route] = self._stats['requests'].get(route, 0) + 1
+            self._stats['statuses'][status] = self._stats['statuses'].get(status, 0) + 1
+            self._stats['bytes'] += size
+
+    def delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def draw(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def quota_retry_after(self) -> Optional[float]:
+        """Consomme une requête du quota, ou retourne le délai avant la prochaine disponible"""
+        if not self.quota_per_minute:
+            return None
+        rate = self.quota_per_minute / 60
+        with self._lock:
+            now = time.monotonic()
+            self._quota_tokens = min(self.quota_per_minute,
+                                     self._quota_tokens + (now - self._quota_updated) * rate)
+            self._quota_updated = now
+            if self._quota_tokens >= 1:
+                self._quota_tokens -= 1
+                return None
+            return (1 - self._quota_tokens) / rate
+
+    def issue_token(self) -> Dict:
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._tokens[token] = time.time() + self.token_lifetime
+        return {'access_token': token, 'token_type': 'Bearer', 'expires_in': int(self.token_lifetime)}
+
+    def token_valid(self, authorization: Optional[str]) -> bool:
+        if not authorization or not authorization.startswith('Bearer '):
+            return False
+        with self._lock:
+            expires_at = self._tokens.get(authorization[7:])
+        return expires_at is not None and expires_at > time.time()
+
+    def series_body(self, idbanks_path: str, params: Dict[str, str], csv: bool = False) -> Optional[bytes]:
+        """
+        Séries demandées (None si aucune n'existe), selon startPeriod et
+        lastNObservations, en SDMX-ML ou en SDMX-CSV
+        """
+        idbanks = [int(idbank) for idbank in idbanks_path.split('+')
+                   if not idbank.lstrip('0').startswith(UNKNOWN_IDBANK_PREFIX)]
+        if not idbanks:
+            return None
+        count = self.history_months
+        if 'startPeriod' in params:
+            count = min(count, months_since(params['startPeriod']))
+        if 'firstNObservations' in params or 'lastNObservations' in params:
+            count = min(count, int(params.get('lastNObservations') or params['firstNObservations']))
+        if params.get('detail') in ('nodata', 'serieskeysonly'):
+            count = 0
+        body = generate_idbank_series(idbanks, count)
+        return to_sdmx_csv(body) if csv else body
+
+    def dataflow_body(self, dataflow_id: str, params: Dict[str, str], csv: bool = False) -> bytes:
+        """Contenu d'un dataflow, attributs seuls avec detail=nodata"""
+        nodata = params.get('detail') in ('nodata', 'serieskeysonly')
+        if 'lastNObservations' in params:
+            obs = min(24, int(params['lastNObservations']))
+        else:
+            obs = 0 if nodata else 24
+        key = (dataflow_id, obs, csv)
+        with self._lock:
+            body = self._dataflow_bodies.get(key)
+        if body is None:
+            body = generate_dataset(self.dataflow_series, obs, seed=sum(map(ord, dataflow_id)))
+            if csv:
+                body = to_sdmx_csv(body)
+            with self._lock:
+                self._dataflow_bodies[key] = body
+        return body
+
+
+    def catalog_body(self, csv: bool = False) -> bytes:
+        """Annuaire SERIES_BDM : attributs de catalog_series séries, généré au premier appel"""
+        with self._lock:
+            body = self._catalog_bodies.get(csv)
+        if body is None:
+            body = generate_dataset(self.catalog_series)
+            if csv:
+                body = to_sdmx_csv(body)
+            with self._lock:
+                self._catalog_bodies[csv] = body
+        return body
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Connexions keep-alive fermées brutalement par les clients : pas de trace
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, route: str, status: int, body: bytes, content_type: str = 'application/xml',
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client parti avant la fin (délai dépassé côté client)
+            self.close_connection = True
+            return
+        self.server.mock.record(route, status, len(body))
+
+    def _throttled(self, route: str) -> bool:
+        """Applique latence, quota, 429, 503 et coupures simulés ; True si la requête a été refusée"""
+        mock = self.server.mock
+        time.sleep(mock.delay())
+        retry_after = mock.quota_retry_after()
+        if retry_after is None and mock.draw(mock.throttle_rate):
+            retry_after = 1.0
+        if retry_after is not None:
+            self._send(route, 429, b'Too Many Requests', 'text/plain',
+                       {'Retry-After': str(math.ceil(retry_after))})
+            return True
+        if mock.draw(mock.error_rate):
+            self._send(route, 503, b'Service Unavailable', 'text/plain')
+            return True
+        if mock.draw(mock.drop_rate):
+            # Connexion fermée sans réponse : le client voit une erreur réseau
+            mock.record(route, 'dropped', 0)
+            self.close_connection = True
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if urlsplit(self.path).path != '/token':
+            self._send('other', 404, b'Not Found', 'text/plain')
+            return
+        # Le jeton n'est pas soumis au quota des données
+        time.sleep(self.server.mock.delay())
+        body = json.dumps(self.server.mock.issue_token()).encode('utf-8')
+        self._send('token', 200, body, 'application/json')
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        path = url.path
+
+        series_match = _SERIES_PATH.search(path)
+        catalog_match = _CATALOG_PATH.search(path)
+        dataflow_match = _DATAFLOW_DATA_PATH.search(path)
+        structure_match = _DATASTRUCTURE_PATH.search(path)
+        if series_match:
+            route = 'series'
+        elif catalog_match:
+            route = 'catalog'
+        elif dataflow_match:
+            route = 'dataflow_series'
+        elif structure_match:
+            route = 'datastructure'
+        elif path.endswith('/V1/dataflow'):
+            route = 'dataflows'
+        else:
+            self._send('other', 404, b'Not Found', 'text/plain')
+            return
+
+        if not mock.token_valid(self.headers.get('Authorization')):
+            self._send(route, 401, b'Invalid Credentials', 'text/plain')
+            return
+        if self._throttled(route):
+            return
+
+        # Négociation : SDMX-CSV si la requête le propose, SDMX-ML sinon
+        csv = mock.sdmx_csv and 'csv' in (self.headers.get('Accept') or '')
+        content_type = SDMX_CSV_TYPE if csv else 'application/xml'
+        if route == 'series':
+            body = mock.series_body(series_match.group(1), params, csv)
+            if body is None:
+                self._send(route, 404, b'NoRecordsFound', 'text/plain')
+                return
+        elif route == 'catalog':
+            body = mock.catalog_body(csv)
+        elif route == 'dataflow_series':
+            body = mock.dataflow_body(dataflow_match.group(1), params, csv)
+        elif route == 'datastructure':
+            body, content_type = generate_datastructure(structure_match.group(1)), 'application/xml'
+        else:
+            body, content_type = mock.dataflows_body, 'application/xml'
+        self._send(route, 200, body, content_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API BDM de l'INSEE")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.1, help="Latence moyenne (secondes)")
+    parser.add_argument('--jitter', type=float, default=0.05, help="Variation de la latence (secondes)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proportion de réponses 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="Proportion de 429 aléatoires")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Proportion de connexions coupées sans réponse")
+    parser.add_argument('--quota', type=float, default=30, help="Quota par minute (0 : illimité)")
+    parser.add_argument('--dataflow-series', type=int, default=2000, help="Séries par dataflow")
+    parser.add_argument('--catalog-series', type=int, default=20000, help="Séries de l'annuaire SERIES_BDM")
+    parser.add_argument('--no-csv', action='store_true', help="Servir uniquement du SDMX-ML")
+    args = parser.parse_args()
+
+    server = MockInseeServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                             args.throttle_rate, args.quota or None,
+                             dataflow_series=args.dataflow_series, catalog_series=args.catalog_series,
+                             sdmx_csv=not args.no_csv, drop_rate=args.drop_rate)
+    print(f"Serveur INSEE local : base_url = {server.base_url}, token_url = {server.token_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+Benchmarks hors ligne des chemins critiques : parsing SDMX et recherche
+
+Usage :
+    python benchmarks/run_benchmarks.py [--quick] [--repeat N] [--output fichier.json]
+                                        [--compare resultats_precedents.json]
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import (FixtureAdapter, fixture_queries, generate_idbank_series, iter_chunks,
+                                 load_fixtures, to_sdmx_csv)
+from insee_bdm_api import (InseeBdmAPI, SDMX_CHUNK_SIZE, SDMX_CSV_TYPE, iter_sdmx_series, lxml_etree,
+                           parse_dataflows, series_summary)
+from observations import frame_from_observations, period_end_sort_value, period_sort_value
+from rate_limiter import TokenBucketRateLimiter
+from search_index import DataflowIndex, SeriesCatalogIndex
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Version du format des résultats (à incrémenter si la structure change)
+RESULTS_FORMAT_VERSION = 1
+
+BENCH_BASE_URL = "https://bench.invalid/series/BDM"
+BENCH_DATAFLOW = "BENCH-10K"
+
+# Observations du document lu d'un bloc (plus de 10 Mo, limite de tampon de lxml)
+LARGE_DOCUMENT_OBS = 150000
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentile par interpolation linéaire sur une liste triée"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Masque les avertissements du logger insee_bdm_api pendant les mesures (les erreurs restent affichées)"""
+    client_logger = logging.getLogger('insee_bdm_api')
+    level = client_logger.level
+    client_logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        client_logger.setLevel(level)
+
+
+def measure(func: Callable[[], object], repeat: int, items: int, unit: str,
+            warmup: int = 1) -> Dict:
+    """
+    Mesure les latences de func puis sa mémoire de pointe (exécution séparée,
+    tracemalloc ralentissant le code mesuré)
+
+    Args:
+        items (int): Nombre d'éléments traités par appel (observations, séries, requêtes)
+        unit (str): Nature des éléments, pour le débit
+    """
+    with quiet():
+        for _ in range(warmup):
+            func()
+
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            latencies.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    latencies.sort()
+    p50 = percentile(latencies, 0.50)
+    return {
+        'items': items,
+        'unit': unit,
+        'repeat': repeat,
+        'latency_ms': {
+            'min': latencies[0] * 1000,
+            'p50': p50 * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': latencies[-1] * 1000,
+            'mean': sum(latencies) / len(latencies) * 1000
+        },
+        'throughput_per_s': items / p50 if p50 else None,
+        'peak_memory_mb': peak / 2 ** 20
+    }
+
+
+def measure_queries(search: Callable[[str], object], queries: List[str], repeat: int) -> Dict:
+    """Latence par requête de recherche, toutes requêtes confondues"""
+    latencies = []
+    with quiet():
+        for _ in range(repeat):
+            for query in queries:
+                started = time.perf_counter()
+                search(query)
+                latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p50 = percentile(latencies, 0.50)
+    return {
+        'items': len(latencies),
+        'unit': 'requêtes',
+        'repeat': repeat,
+        'latency_ms': {
+            'min': latencies[0] * 1000,
+            'p50': p50 * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': latencies[-1] * 1000,
+            'mean': sum(latencies) / len(latencies) * 1000
+        },
+        'throughput_per_s': 1 / p50 if p50 else None,
+        'peak_memory_mb': None
+    }
+
+
+def build_api(fixtures: Dict[str, bytes]) -> InseeBdmAPI:
+    """Client sans cache ni index disque, dont les requêtes sont servies par les fixtures"""
+    with quiet():
+        api = InseeBdmAPI(base_url=BENCH_BASE_URL, cache_path=None, search_index_path=None,
+                          rate_limiter=TokenBucketRateLimiter(rate_per_minute=10 ** 9, burst=10 ** 6))
+    api.search_index = SeriesCatalogIndex(path=None)
+    api.token = "benchmark"
+    api.token_expires_at = time.time() + 10 ** 9
+    api.session.mount(BENCH_BASE_URL, FixtureAdapter({
+        f"/V1/data/{BENCH_DATAFLOW}/all?detail=nodata": fixtures['dataflow_nodata'],
+        f"/V1/data/{BENCH_DATAFLOW}/all": fixtures['dataflow'],
+        "/data/SERIES_BDM": fixtures['catalog'],
+        "/V1/dataflow": fixtures['dataflows']
+    }))
+    return api
+
+
+def count_observations(data: bytes) -> int:
+    return data.count(b'<Obs ')
+
+
+def check_periods():
+    """Périodes hebdomadaires et absentes : dates ISO ou NaT, sans exception"""
+    frame = frame_from_observations([
+        {'date': '2020-W02', 'valeur': '1.5'},
+        {'date': '2020-W01', 'valeur': '1.0'},
+        {'date': None, 'valeur': '2.0'},
+        {'date': 'n/a', 'valeur': ''}
+    ])
+    dates = [str(date)[:10] for date in frame['date']]
+    if dates != ['2019-12-30', '2020-01-06', 'NaT', 'NaT']:
+        raise RuntimeError(f"Périodes hebdomadaires ou absentes mal converties : {dates}")
+    if (period_sort_value('2020-W01'), period_end_sort_value('2020-W01'), period_sort_value(None)) \
+            != (20191230, 20200105, 0):
+        raise RuntimeError("Bornes SQL des périodes hebdomadaires ou absentes incorrectes")
+
+
+def run(size: str, repeat: int) -> Dict:
+    """Exécute tous les benchmarks et retourne les résultats par cas"""
+    fixtures = load_fixtures(size)
+    queries = fixture_queries()
+    api = build_api(fixtures)
+    results = {}
+    check_periods()
+
+    def report(name: str, result: Dict):
+        results[name] = result
+        print(f"{name:<32} p50 {result['latency_ms']['p50']:10.2f} ms   "
+              f"{result['throughput_per_s'] or 0:14.0f} {result['unit']}/s   "
+              f"mémoire {result['peak_memory_mb'] or 0:8.1f} Mo")
+
+    # Une série de 50 ans de données mensuelles
+    series_obs = count_observations(fixtures['series'])
+    report('parse_series_xml', measure(
+        lambda: api.parse_series_xml(fixtures['series']), repeat, series_obs, 'obs'))
+    report('parse_series_xml[as_frame]', measure(
+        lambda: api.parse_series_xml(fixtures['series'], as_frame=True), repeat, series_obs, 'obs'))
+
+    # Document de plus de 10 Mo passé d'un bloc : chaque parser doit le lire en entier
+    large_series = generate_idbank_series([1], LARGE_DOCUMENT_OBS)
+    default_backend = api.parser_backend
+    for backend in ('stdlib', 'lxml') if lxml_etree is not None else ('stdlib',):
+        api.parser_backend = backend
+        parsed = api.parse_series_xml(large_series)
+        if "error" in parsed or len(parsed['observations']) != LARGE_DOCUMENT_OBS:
+            raise RuntimeError(f"Document de {len(large_series) / 1e6:.1f} Mo non lu par {backend} : "
+                               f"{parsed.get('error')}")
+        report(f'parse_series_xml[large,{backend}]', measure(
+            lambda: api.parse_series_xml(large_series), max(1, repeat // 5), LARGE_DOCUMENT_OBS, 'obs'))
+    api.parser_backend = default_backend
+
+    # Contenu d'un dataflow de 10 000 séries, lu en flux comme une réponse HTTP
+    dataflow_obs = count_observations(fixtures['dataflow'])
+    report('parse_stream[dataflow]', measure(
+        lambda: sum(1 for _ in iter_sdmx_series(iter_chunks(fixtures['dataflow'], SDMX_CHUNK_SIZE))),
+        repeat, dataflow_obs, 'obs'))
+    # Mêmes données selon le parser SDMX-ML, puis en SDMX-CSV (décodage vectorisé)
+    for backend in ('stdlib', 'lxml') if lxml_etree is not None else ('stdlib',):
+        report(f'parse_stream[dataflow,{backend}]', measure(
+            lambda: sum(1 for _ in iter_sdmx_series(iter_chunks(fixtures['dataflow'], SDMX_CHUNK_SIZE),
+                                                    columnar=True, backend=backend)),
+            repeat, dataflow_obs, 'obs'))
+    dataflow_csv = to_sdmx_csv(fixtures['dataflow'])
+    report('decode_csv[dataflow]', measure(
+        lambda: sum(1 for _ in iter_sdmx_series(iter_chunks(dataflow_csv, SDMX_CHUNK_SIZE),
+                                                content_type=SDMX_CSV_TYPE)),
+        repeat, dataflow_obs, 'obs'))
+    series_csv = to_sdmx_csv(fixtures['series'])
+    report('parse_series_xml[csv,as_frame]', measure(
+        lambda: api.parse_series_xml(series_csv, as_frame=True, content_type=SDMX_CSV_TYPE),
+        repeat, series_obs, 'obs'))
+    print(f"{'':<32} taille SDMX-CSV / SDMX-ML : série x{len(series_csv) / len(fixtures['series']):.2f}, "
+          f"dataflow x{len(dataflow_csv) / len(fixtures['dataflow']):.2f} (hors compression)")
+    # Liste des séries d'un dataflow : attributs seuls (detail=nodata)
+    dataflow_series = fixtures['dataflow'].count(b'<Series ')
+    report('get_dataflow_series', measure(
+        lambda: api.get_dataflow_series(BENCH_DATAFLOW), repeat, dataflow_series, 'séries'))
+
+    # Annuaire SERIES_BDM complet : construction de l'index puis recherche
+    catalog_series = fixtures['catalog'].count(b'<Series ')
+    summaries = [series_summary(record['attributes'])
+                 for record in iter_sdmx_series(iter_chunks(fixtures['catalog'], SDMX_CHUNK_SIZE),
+                                                with_observations=False)]
+    report('search_index_build', measure(
+        lambda: SeriesCatalogIndex(path=None).update(summaries), max(1, repeat // 5),
+        catalog_series, 'séries', warmup=0))
+    # Rafraîchissement d'un index déjà à jour (annuaire relu, aucune série réindexée)
+    report('refresh_search_index', measure(
+        lambda: api.refresh_search_index(), max(1, repeat // 5), catalog_series, 'séries'))
+    # Une page nulle ou négative est ramenée à la première
+    query = queries['series'][0]
+    if not api.search_series(query, page=1, page_size=20) \
+            or any(api.search_series(query, page=page, page_size=20) != api.search_series(query, page_size=20)
+                   for page in (0, -1)):
+        raise RuntimeError(f"Pages nulle ou négative de search_series différentes de la première ({query})")
+    report('search_series', measure_queries(
+        lambda query: api.search_series(query, page_size=20), queries['series'], repeat))
+    report('search_series[all_pages]', measure_queries(
+        lambda query: api.search_series(query), queries['series'], repeat))
+
+    # Catalogue des dataflows : index construit au chargement, puis recherche
+    dataflows = parse_dataflows(fixtures['dataflows'])
+    report('dataflow_index_build', measure(
+        lambda: DataflowIndex(dataflows), repeat, len(dataflows), 'dataflows'))
+    dataflow_index = DataflowIndex(dataflows)
+    report('search_dataflows', measure_queries(dataflow_index.search, queries['dataflows'], repeat))
+
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict, baseline_path: str):
+    """Affiche l'évolution de la latence médiane par rapport à un fichier de résultats"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nComparaison avec {baseline_path} (commit {baseline.get('git_commit')}) :")
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            print(f"{name:<32} (nouveau)")
+            continue
+        ratio = result['latency_ms']['p50'] / previous['latency_ms']['p50']
+        print(f"{name:<32} p50 x{ratio:5.2f}  ({previous['latency_ms']['p50']:.2f} ms -> "
+              f"{result['latency_ms']['p50']:.2f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du client INSEE BDM (hors ligne)")
+    parser.add_argument('--quick', action='store_true', help="Jeux de données réduits")
+    parser.add_argument('--repeat', type=int, default=10, help="Nombre de mesures par cas")
+    parser.add_argument('--output', help="Fichier JSON des résultats (par défaut benchmarks/results/)")
+    parser.add_argument('--compare', help="Fichier JSON de résultats précédents à comparer")
+    args = parser.parse_args()
+
+    size = 'quick' if args.quick else 'full'
+    print(f"Benchmarks ({size}, {args.repeat} mesures par cas)")
+    results = run(size, args.repeat)
+
+    payload = {
+        'version': RESULTS_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'size': size,
+        'results': results
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}-{size}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"\nRésultats enregistrés dans {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
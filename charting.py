@@ -0,0 +1,108 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from observations import slice_frame
+
+# Largeur de graphique supposée (px) : Streamlit ne communique pas la largeur réelle
+DEFAULT_CHART_WIDTH = 1200
+
+# Nombre de points conservés par pixel de largeur
+POINTS_PER_PIXEL = 2
+
+# Au-delà de ce nombre de points, le tracé passe en WebGL (Scattergl) sans marqueurs
+WEBGL_THRESHOLD = 1000
+
+
+def max_points_for_width(width: int = DEFAULT_CHART_WIDTH) -> int:
+    """Nombre de points utiles pour un graphique de width pixels"""
+    return max(3, int(width * POINTS_PER_PIXEL))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets : indices des threshold points qui
+    préservent au mieux la forme de la courbe (premier et dernier inclus)
+
+    Args:
+        x: Abscisses croissantes (nombres)
+        y: Ordonnées, sans NaN
+        threshold (int): Nombre de points à conserver
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # Bornes des threshold - 2 classes intermédiaires, le dernier point formant la dernière
+    every = (n - 2) / (threshold - 2)
+    bounds = np.floor(np.arange(threshold - 1) * every).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    sizes = np.diff(np.append(bounds, n))
+    mean_x = np.add.reduceat(x, bounds) / sizes
+    mean_y = np.add.reduceat(y, bounds) / sizes
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        # Aire du triangle (point retenu précédent, candidat, moyenne de la classe suivante)
+        areas = np.abs(
+            (x[previous] - mean_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_frame(df: pd.DataFrame, max_points: int,
+                     window: Optional[Tuple[pd.Timestamp, pd.Timestamp]] = None) -> pd.DataFrame:
+    """
+    Restreint le DataFrame (date, valeur) à la fenêtre visible puis le réduit
+    à max_points par LTTB ; les valeurs manquantes sont ignorées
+
+    Args:
+        window: (début, fin) de la fenêtre affichée, None pour toute la série
+    """
+    if window is not None:
+        df = slice_frame(df, *window)
+
+    values = df['valeur'].to_numpy()
+    valid = ~np.isnan(values)
+    if not valid.all():
+        df, values = df[valid], values[valid]
+    if len(df) <= max_points:
+        return df
+
+    dates = df['date'].to_numpy().astype(np.int64)
+    return df.iloc[lttb_indices(dates, values, max_points)]
+
+
+def series_trace(df: pd.DataFrame, name: str, max_points: Optional[int] = None,
+                 window: Optional[Tuple[pd.Timestamp, pd.Timestamp]] = None,
+                 **kwargs) -> go.Scatter:
+    """
+    Trace d'une série : lignes et marqueurs en SVG pour les séries courtes,
+    Scattergl sans marqueurs au-delà de WEBGL_THRESHOLD points
+
+    Args:
+        max_points (int): Nombre maximum de points transmis au navigateur (None : tous)
+        window: Fenêtre visible, seule détaillée (voir downsample_frame)
+        kwargs: Propriétés supplémentaires de la trace (line, yaxis...)
+    """
+    if max_points is not None:
+        df = downsample_frame(df, max_points, window)
+    elif window is not None:
+        df = downsample_frame(df, len(df), window)
+
+    if len(df) > WEBGL_THRESHOLD:
+        return go.Scattergl(x=df['date'], y=df['valeur'], mode='lines', name=name, **kwargs)
+    kwargs.setdefault('marker', dict(size=6))
+    return go.Scatter(x=df['date'], y=df['valeur'], mode='lines+markers', name=name, **kwargs)
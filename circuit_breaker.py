@@ -0,0 +1,105 @@
+import threading
+import time
+
+# États du disjoncteur
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Nombre d'échecs consécutifs (erreurs réseau, délais dépassés, réponses 5xx) qui
+# ouvrent le circuit, et durée pendant laquelle plus aucune requête n'est émise
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(Exception):
+    """Requête refusée sans appel : l'API est considérée indisponible"""
+    def __init__(self, retry_in: float):
+        self.retry_in = retry_in
+        super().__init__(f"API INSEE indisponible, nouvel essai dans {retry_in:.0f} s")
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur commun à tous les appels à l'API
+
+    Après failure_threshold échecs consécutifs, le circuit s'ouvre : les requêtes
+    sont refusées immédiatement (CircuitOpenError) pendant reset_timeout secondes.
+    Une seule requête d'essai est ensuite autorisée (semi-ouvert) : son succès
+    referme le circuit, son échec le rouvre pour reset_timeout secondes.
+    """
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def _retry_in(self, now: float) -> float:
+        since = self._probe_at if self._state == HALF_OPEN else self._opened_at
+        return max(0.0, since + self.reset_timeout - now)
+
+    def allow(self):
+        """
+        Autorise une requête, ou lève CircuitOpenError si le circuit est ouvert
+
+        En semi-ouvert, une nouvelle requête d'essai n'est autorisée que si la
+        précédente n'a pas rendu de résultat depuis reset_timeout secondes.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            now = time.monotonic()
+            if self._retry_in(now) <= 0:
+                self._state = HALF_OPEN
+                self._probe_at = now
+                return
+            self._stats['rejected'] += 1
+            raise CircuitOpenError(self._retry_in(now))
+
+    def is_open(self) -> bool:
+        """Indique si les requêtes sont actuellement refusées"""
+        with self._lock:
+            return self._state != CLOSED and self._retry_in(time.monotonic()) > 0
+
+    def on_success(self):
+        """Réponse de l'API (hors 5xx) : le circuit est refermé"""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def on_failure(self):
+        """Échec d'une requête : le circuit s'ouvre au seuil, ou dès l'échec d'un essai"""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats['opened'] += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """État, échecs consécutifs, délai avant le prochain essai et compteurs"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self._state
+            stats['failures'] = self._failures
+            stats['retry_in'] = self._retry_in(time.monotonic()) if self._state != CLOSED else 0.0
+        return stats
+
+
+_default_breaker = None
+_default_breaker_lock = threading.Lock()
+
+
+def get_default_circuit_breaker() -> CircuitBreaker:
+    """Disjoncteur unique du processus, partagé par tous les clients"""
+    global _default_breaker
+    with _default_breaker_lock:
+        if _default_breaker is None:
+            _default_breaker = CircuitBreaker()
+        return _default_breaker
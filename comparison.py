@@ -0,0 +1,119 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from observations import SUBPERIOD_MONTHS
+
+# Durée en mois d'une période selon le code FREQ de l'INSEE (D : journalière)
+FREQUENCY_MONTHS = {'A': 12, 'M': 1, 'D': 0, **SUBPERIOD_MONTHS}
+
+# Libellés des fréquences proposées pour l'alignement, de la plus fine à la plus large
+FREQUENCY_LABELS = {
+    'M': "Mensuelle",
+    'B': "Bimestrielle",
+    'T': "Trimestrielle",
+    'S': "Semestrielle",
+    'A': "Annuelle"
+}
+
+# Agrégations possibles lors du passage à une fréquence plus large
+AGGREGATIONS = {
+    'mean': "Moyenne",
+    'last': "Dernière valeur",
+    'sum': "Somme"
+}
+
+
+def series_frequency(metadata: Dict) -> str:
+    """Code de fréquence d'une série (mensuelle si FREQ est absent ou inconnu)"""
+    freq = (metadata.get('FREQ') or 'M').upper()
+    if freq == 'Q':
+        return 'T'
+    return freq if freq in FREQUENCY_MONTHS else 'M'
+
+
+def common_frequency(frequencies: List[str]) -> str:
+    """Fréquence la plus large d'un ensemble de séries (aucune valeur n'est inventée)"""
+    coarsest = max(frequencies, key=lambda freq: FREQUENCY_MONTHS[freq], default='M')
+    return coarsest if coarsest in FREQUENCY_LABELS else 'M'
+
+
+def period_starts(dates: np.ndarray, freq: str) -> np.ndarray:
+    """Début de la période de fréquence freq contenant chaque date (datetime64[ns])"""
+    step = FREQUENCY_MONTHS[freq]
+    if not step:
+        return dates.astype('datetime64[D]').astype('datetime64[ns]')
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    return ((months // step) * step).astype('datetime64[M]').astype('datetime64[ns]')
+
+
+def align_frame(frame: pd.DataFrame, source_freq: str, target_freq: str,
+                how: str = 'mean') -> pd.Series:
+    """
+    Ramène une série (DataFrame date/valeur trié) à la fréquence cible
+
+    Vers une fréquence plus large, les observations de chaque période sont
+    agrégées (how : mean, last ou sum) ; vers une fréquence plus fine, la
+    dernière valeur connue est reportée sur les périodes suivantes.
+
+    Returns:
+        Series indexée par le début de période
+    """
+    dates = frame['date'].to_numpy()
+    values = frame['valeur'].to_numpy(dtype=np.float64)
+    if not len(dates):
+        return pd.Series([], index=pd.DatetimeIndex([]), dtype=np.float64)
+
+    keys = period_starts(dates, target_freq)
+    if FREQUENCY_MONTHS[target_freq] >= FREQUENCY_MONTHS[source_freq]:
+        # Les dates sont triées : chaque période est un bloc contigu
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        valid = ~np.isnan(values)
+        if how == 'last':
+            # Dernière valeur non manquante de chaque bloc
+            positions = np.where(valid, np.arange(len(values)), -1)
+            last = np.maximum.reduceat(positions, starts)
+            aggregated = np.where(last >= 0, values[np.maximum(last, 0)], np.nan)
+        else:
+            sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+            counts = np.add.reduceat(valid.astype(np.int64), starts)
+            if how == 'sum':
+                aggregated = np.where(counts > 0, sums, np.nan)
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    aggregated = sums / counts
+        return pd.Series(aggregated, index=pd.DatetimeIndex(keys[starts]))
+
+    # Fréquence cible plus fine : grille régulière et report de la dernière valeur
+    step = FREQUENCY_MONTHS[target_freq]
+    first, last = keys[0].astype('datetime64[M]').astype(np.int64), \
+        keys[-1].astype('datetime64[M]').astype(np.int64)
+    last += FREQUENCY_MONTHS[source_freq] - step
+    grid = np.arange(first, last + 1, step).astype('datetime64[M]').astype('datetime64[ns]')
+    positions = np.searchsorted(keys, grid, side='right') - 1
+    return pd.Series(values[positions], index=pd.DatetimeIndex(grid))
+
+
+def combine_aligned(aligned: Dict[str, pd.Series], normalize: bool = False) -> pd.DataFrame:
+    """
+    Assemble les séries alignées sur un index temporel commun (une colonne par série)
+
+    Args:
+        normalize (bool): Exprimer chaque série en base 100 à sa première date commune
+    """
+    if not aligned:
+        return pd.DataFrame()
+    combined = pd.concat(aligned, axis=1, sort=True)
+    if normalize:
+        complete = combined.dropna()
+        if not complete.empty:
+            # Une série nulle à la date de base ne peut pas être exprimée en base 100
+            combined = combined / complete.iloc[0].replace(0, np.nan) * 100
+    return combined
+
+
+def frequency_options(series_freqs: List[str]) -> List[str]:
+    """Fréquences cibles proposées : de la plus fine des séries à l'annuelle"""
+    finest = min((FREQUENCY_MONTHS[freq] for freq in series_freqs), default=1)
+    return [freq for freq in FREQUENCY_LABELS if FREQUENCY_MONTHS[freq] >= max(finest, 1)]
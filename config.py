@@ -1,5 +1,14 @@
 import streamlit as st
 import os
+from datetime import datetime
+from insee_bdm_api import InseeBdmAPI, DEFAULT_BASE_URL, DEFAULT_TOKEN_URL
+from scheduler import WarmupScheduler
+from shared_cache import get_shared_cache
+from memory_usage import get_session_registry, session_footprint
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Nombre d'années affichées par défaut sur la page principale
+DEFAULT_HISTORY_YEARS = 5
 
 def init_session_state():
     """Initialise les variables de session globales"""
@@ -12,17 +21,69 @@ def init_session_state():
     if 'series_options' not in st.session_state:
         st.session_state.series_options = {}
     
-    if 'all_dataflows' not in st.session_state:
-        st.session_state.all_dataflows = None
-    
     if 'selected_dataflow' not in st.session_state:
         st.session_state.selected_dataflow = None
     
+    # Clé du tableau des séries du thème dans le cache partagé, et filtres appliqués
     if 'search_results' not in st.session_state:
         st.session_state.search_results = None
     
-    if 'api_calls' not in st.session_state:
-        st.session_state.api_calls = []
+    if 'series_filter' not in st.session_state:
+        st.session_state.series_filter = None
+    
+    record_session_memory()
+
+def record_session_memory():
+    """
+    Relève la mémoire propre de la session (hors données partagées : cache
+    partagé, client API) dans le registre du processus
+    """
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    shared_ids = get_shared_cache().shared_ids()
+    if st.session_state.api is not None:
+        shared_ids.add(id(st.session_state.api))
+    state = {key: st.session_state[key] for key in st.session_state}
+    get_session_registry().record(ctx.session_id, session_footprint(state, shared_ids))
+
+@st.cache_resource
+def get_shared_api() -> InseeBdmAPI:
+    """
+    Client API unique pour le processus : session HTTP, token et caches
+    sont partagés par toutes les sessions
+    """
+    # Récupération des clés d'API depuis les secrets Streamlit
+    consumer_key = st.secrets.api_insee.consumer_key
+    consumer_secret = st.secrets.api_insee.consumer_secret
+    # URLs surchargeables, par exemple vers le serveur local benchmarks/mock_server.py
+    base_url = st.secrets.api_insee.get("base_url", DEFAULT_BASE_URL)
+    token_url = st.secrets.api_insee.get("token_url", DEFAULT_TOKEN_URL)
+    # Représentation des séries : "xml" (SDMX-ML) ou "csv" (SDMX-CSV si l'API le propose)
+    data_format = st.secrets.api_insee.get("data_format", "xml")
+    api = InseeBdmAPI(consumer_key, consumer_secret, base_url=base_url, token_url=token_url,
+                      data_format=data_format)
+    # Une série revalidée en tâche de fond est relue au prochain affichage (les pages
+    # indexent le cache partagé par idBank formaté, celui reçu ici)
+    api.on_revalidated = lambda idbank: get_shared_cache().invalidate(('series', idbank))
+    return api
+
+def default_start_year() -> int:
+    """Année de début proposée par défaut sur la page principale"""
+    return datetime.now().year - DEFAULT_HISTORY_YEARS
+
+@st.cache_resource
+def get_warmup_scheduler() -> WarmupScheduler:
+    """
+    Planificateur de préchargement unique pour le processus : séries
+    sauvegardées et catalogue des dataflows sont chargés en tâche de fond
+    """
+    scheduler = WarmupScheduler(
+        get_shared_api(),
+        default_series=get_default_series()
+    )
+    scheduler.start()
+    return scheduler
 
 def check_global_authentication():
     """Vérifie l'authentification de l'utilisateur de manière globale"""
@@ -55,10 +116,9 @@ def logout():
     st.session_state.authenticated = False
     st.session_state.api = None
     st.session_state.series_options = {}
-    st.session_state.all_dataflows = None
     st.session_state.selected_dataflow = None
     st.session_state.search_results = None
-    st.session_state.api_calls = []
+    st.session_state.series_filter = None
     st.rerun()
 
 def show_logout_button():
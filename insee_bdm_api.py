@@ -1,17 +1,547 @@
 import requests
+import contextvars
+import io
 import json
+import logging
+import threading
+import time
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Union, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Union, Optional, Iterable, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from observations import ObservationColumns, frame_from_observations, to_float
+from series_cache import SeriesCache
+from search_index import SeriesCatalogIndex
+from rate_limiter import (TokenBucketRateLimiter, get_default_rate_limiter, backoff_delay, request_priority,
+                          BACKGROUND, DEFAULT_MAX_RETRIES)
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_default_circuit_breaker
+from instrumentation import Metrics, get_metrics, current_trace, instrumented, mark_cache, phase, iter_download
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml est facultatif : repli sur xml.etree
+    lxml_etree = None
+
+logger = logging.getLogger(__name__)
+
+# Points d'accès par défaut de l'API INSEE
+DEFAULT_BASE_URL = "https://api.insee.fr/series/BDM"
+DEFAULT_TOKEN_URL = "https://api.insee.fr/token"
+
+# Espaces de noms SDMX-ML utilisés par les messages de structure
+SDMX_NS = {
+    'structure': 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure',
+    'common': 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common'
+}
+
+# Taille des blocs lus sur le flux HTTP pendant le parsing
+SDMX_CHUNK_SIZE = 64 * 1024
+
+# Nombre maximum d'idBank par requête accepté par l'API
+MAX_IDBANKS_PER_REQUEST = 400
+
+# Durée pendant laquelle un idBank inconnu de l'API n'est pas revérifié (secondes)
+INVALID_IDBANK_MAX_AGE = 3600
+
+# Nombre de requêtes simultanées pour les récupérations par lots
+DEFAULT_BATCH_WORKERS = 4
+
+# Statuts HTTP donnant lieu à une nouvelle tentative (quota dépassé, service indisponible)
+RETRY_STATUSES = (429, 503)
+
+# Délais par requête (secondes) : établissement de la connexion, puis attente de chaque
+# bloc de la réponse
+DEFAULT_TIMEOUT = (5.0, 20.0)
+
+# Durée maximale d'un appel, attente du quota et nouvelles tentatives comprises
+DEFAULT_DEADLINE = 30.0
+
+# Nombre de séries périmées revalidées simultanément en tâche de fond
+REVALIDATION_WORKERS = 2
+
+# Le token est renouvelé quand il lui reste moins de TOKEN_REFRESH_MARGIN secondes
+TOKEN_REFRESH_MARGIN = 60
+
+# Liste des séries d'un dataflow : attributs seuls (detail=nodata), puis, si l'API
+# refuse ce paramètre, la seule dernière observation de chaque série
+DATAFLOW_METADATA_PARAMS = ({'detail': 'nodata'}, {'lastNObservations': 1})
+
+# Statuts indiquant que les paramètres de la requête ne sont pas pris en charge
+UNSUPPORTED_PARAMS_STATUSES = (400, 501)
+
+# Agence SDMX des structures de la BDM
+SDMX_AGENCY = 'FR1'
+
+# Les structures (dimensions, codelists) changent rarement : une semaine en cache
+DATASTRUCTURE_MAX_AGE = 7 * 24 * 3600
+
+# Attributs descriptifs d'une série, exclus de ses codes (dimensions et attributs codés)
+SERIES_TEXT_ATTRIBUTES = ('IDBANK', 'TITLE_FR', 'TITLE_EN', 'LAST_UPDATE')
+
+# Parsers SDMX-ML : lxml (libxml2) s'il est installé, sinon la bibliothèque standard
+PARSER_BACKENDS = ('lxml', 'stdlib')
+DEFAULT_PARSER_BACKEND = 'lxml' if lxml_etree is not None else 'stdlib'
+
+# Erreurs de syntaxe XML levées par les parsers disponibles
+XML_PARSE_ERRORS = (ET.ParseError,) if lxml_etree is None else (ET.ParseError, lxml_etree.XMLSyntaxError)
+
+# Représentations des messages de données : SDMX-ML seul (par défaut), ou SDMX-CSV
+# proposé en premier avec SDMX-ML en second choix (data_format='csv'). Les attributs
+# de série étant répétés sur chaque ligne, SDMX-CSV n'est plus compact que pour
+# les séries longues à attributs courts, une fois compressé.
+SDMX_ML_TYPE = 'application/xml'
+SDMX_CSV_TYPE = 'application/vnd.sdmx.data+csv;version=1.0.0'
+DATA_ACCEPT_TYPES = {
+    'csv': f'{SDMX_CSV_TYPE}, {SDMX_ML_TYPE};q=0.9',
+    'xml': SDMX_ML_TYPE
+}
+
+# Statuts indiquant que la représentation demandée n'est pas proposée
+UNSUPPORTED_FORMAT_STATUSES = (406, 415)
+
+# Colonnes SDMX-CSV propres à l'observation (les autres décrivent la série)
+SDMX_CSV_OBS_COLUMNS = ('DATAFLOW', 'STRUCTURE', 'STRUCTURE_ID', 'ACTION', 'TIME_PERIOD',
+                        'OBS_VALUE', 'OBS_STATUS', 'OBS_QUAL', 'OBS_TYPE', 'OBS_CONF', 'OBS_COMMENT')
+
+
+def _local_name(tag: str) -> str:
+    """Retire l'éventuel espace de noms d'une balise XML"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def make_xml_parser(target, backend: Optional[str] = None):
+    """
+    Crée un parser XML incrémental (feed / close) qui transmet chaque balise à
+    target (méthodes start(tag, attrib) et end(tag)), sans construire d'arbre
+
+    Args:
+        backend (str): 'lxml' ou 'stdlib' (DEFAULT_PARSER_BACKEND par défaut) ;
+            sans lxml installé, la bibliothèque standard est utilisée
+    """
+    backend = backend or DEFAULT_PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Parser inconnu : {backend} (attendu : {', '.join(PARSER_BACKENDS)})")
+    if backend == 'lxml' and lxml_etree is not None:
+        # Pas de résolution d'entités : les réponses ne sont pas des documents de confiance
+        return lxml_etree.XMLParser(target=target, resolve_entities=False)
+    return ET.XMLParser(target=target)
+
+
+def is_sdmx_csv(content_type: Optional[str]) -> bool:
+    """Indique si le Content-Type d'une réponse désigne du SDMX-CSV"""
+    return bool(content_type) and 'csv' in content_type.lower()
+
+
+class _SdmxSeriesTarget:
+    """
+    Cible du parser XML : construit les séries à partir des seules balises
+    Series et Obs (attributs), au fil des événements
+    """
+    def __init__(self, with_observations: bool, columnar: bool):
+        self.with_observations = with_observations
+        self.columnar = columnar
+        self.completed = []
+        self._current = None
+
+    def start(self, tag: str, attrib: Dict):
+        if tag == 'Obs' or _local_name(tag) == 'Obs':
+            if self._current is not None and self.with_observations:
+                if self.columnar:
+                    # Remplissage direct des colonnes, sans dictionnaire par observation
+                    get = attrib.get
+                    self._current['observations'].append(
+                        get('TIME_PERIOD'), get('OBS_VALUE'), get('OBS_STATUS'), get('OBS_QUAL')
+                    )
+                else:
+                    self._current['observations'].append(dict(attrib))
+        elif _local_name(tag) == 'Series':
+            observations = ObservationColumns() if self.columnar else []
+            self._current = {'attributes': dict(attrib), 'observations': observations}
+
+    def end(self, tag: str):
+        if self._current is not None and _local_name(tag) == 'Series':
+            self.completed.append(self._current)
+            self._current = None
+
+    def close(self):
+        """Fin du document (appelée par le parser, requise par lxml)"""
+        return None
+
+
+class SdmxStreamParser:
+    """
+    Parser SDMX-ML incrémental : reçoit la réponse par blocs et restitue
+    chaque série dès sa balise fermante
+
+    Les balises sont lues par un parser évènementiel (lxml ou expat) : aucun
+    arbre XML n'est construit, la mémoire ne dépend que de la série en cours.
+    """
+    def __init__(self, with_observations: bool = True, columnar: bool = False,
+                 backend: Optional[str] = None):
+        self.with_observations = with_observations
+        self.columnar = columnar
+        self._target = _SdmxSeriesTarget(with_observations, columnar)
+        self._parser = make_xml_parser(self._target, backend)
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Ajoute un bloc de données et retourne les séries complétées"""
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[Dict]:
+        """Termine le parsing et retourne les dernières séries complétées"""
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[Dict]:
+        completed, self._target.completed = self._target.completed, []
+        return completed
+
+
+def decode_sdmx_csv(data: bytes, with_observations: bool = True) -> List[Dict]:
+    """
+    Décode un message SDMX-CSV (une ligne par observation)
+
+    Le texte est lu en une passe par pandas ; les lignes sont regroupées par
+    série (IDBANK, ou clé complète à défaut) et les observations de chaque
+    série sont extraites par indexation des colonnes, sans objet par ligne.
+
+    Returns:
+        list: Séries {'attributes': {...}, 'observations': ObservationColumns}
+    """
+    if not data.strip():
+        return []
+    table = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    if table.empty:
+        return []
+    series_columns = [column for column in table.columns if column not in SDMX_CSV_OBS_COLUMNS]
+    if 'IDBANK' in table.columns:
+        keys = table['IDBANK']
+    else:
+        keys = table[series_columns].agg('|'.join, axis=1)
+
+    # Regroupement par série dans l'ordre d'apparition (tri stable sur le code de série)
+    codes, _ = pd.factorize(keys, sort=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    first_rows = order[np.concatenate(([0], bounds))]
+    attributes = table[series_columns].iloc[first_rows].to_dict('records')
+
+    def column(name: str) -> np.ndarray:
+        if name not in table.columns:
+            return np.full(len(table), None, dtype=object)
+        values = table[name].to_numpy(dtype=object)
+        return np.where(values == '', None, values)
+
+    with_observations = with_observations and 'TIME_PERIOD' in table.columns
+    if with_observations:
+        periods = table['TIME_PERIOD'].to_numpy(dtype=object)
+        values = pd.to_numeric(table['OBS_VALUE'], errors='coerce').to_numpy(dtype=np.float64) \
+            if 'OBS_VALUE' in table.columns else np.full(len(table), np.nan)
+        statuses, qualities = column('OBS_STATUS'), column('OBS_QUAL')
+        # Une série sans observation (detail=nodata) occupe une ligne sans TIME_PERIOD
+        with_period = periods != ''
+
+    records = []
+    for series_attributes, rows in zip(attributes, np.split(order, bounds)):
+        observations = ObservationColumns()
+        if with_observations:
+            rows = rows[with_period[rows]]
+            observations = ObservationColumns.from_arrays(periods[rows], values[rows],
+                                                          statuses[rows], qualities[rows])
+        records.append({
+            # Attribut vide en CSV : absent du message SDMX-ML
+            'attributes': {name: value for name, value in series_attributes.items() if value != ''},
+            'observations': observations
+        })
+    return records
+
+
+class SdmxCsvDecoder:
+    """
+    Décodeur SDMX-CSV avec la même interface que SdmxStreamParser : les blocs
+    sont accumulés puis décodés d'un coup (decode_sdmx_csv) à la fermeture
+
+    Les observations sont toujours colonnaires (ObservationColumns).
+    """
+    def __init__(self, with_observations: bool = True):
+        self.with_observations = with_observations
+        self._chunks = []
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        """Ajoute un bloc de données (aucune série n'est complète avant la fin)"""
+        self._chunks.append(chunk)
+        return []
+
+    def close(self) -> List[Dict]:
+        """Décode le message complet et retourne toutes ses séries"""
+        data, self._chunks = b''.join(self._chunks), []
+        return decode_sdmx_csv(data, self.with_observations)
+
+
+def make_data_decoder(content_type: Optional[str] = None, with_observations: bool = True,
+                      columnar: bool = False, backend: Optional[str] = None):
+    """Décodeur adapté au Content-Type d'un message de données (SDMX-CSV ou SDMX-ML)"""
+    if is_sdmx_csv(content_type):
+        return SdmxCsvDecoder(with_observations)
+    return SdmxStreamParser(with_observations, columnar, backend)
+
+
+def iter_sdmx_series(chunks: Iterable[bytes], with_observations: bool = True,
+                     columnar: bool = False, backend: Optional[str] = None,
+                     content_type: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Parcourt un flux SDMX-ML (ou SDMX-CSV) et produit une série à la fois
+
+    Args:
+        chunks: Blocs d'octets (ex: response.iter_content())
+        with_observations (bool): Conserver les Obs (False pour les seuls attributs de série)
+        columnar (bool): Accumuler les Obs dans un ObservationColumns plutôt qu'une liste
+        backend (str): Parser SDMX-ML ('lxml' ou 'stdlib', voir make_xml_parser)
+        content_type (str): Content-Type de la réponse ; en SDMX-CSV, les
+            observations sont toujours colonnaires
+
+    Returns:
+        Générateur de dictionnaires {'attributes': {...}, 'observations': [{...}, ...]}
+    """
+    parser = make_data_decoder(content_type, with_observations, columnar, backend)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def _as_chunks(data: Union[str, bytes, Iterable[bytes]]) -> Iterable[bytes]:
+    """
+    Accepte un texte XML complet ou un flux de blocs d'octets
+
+    Un texte complet est découpé en blocs de SDMX_CHUNK_SIZE octets, comme une
+    réponse lue en flux : lxml refuse un bloc unique de plus de 10 Mo
+    ("Buffer size limit exceeded") là où expat l'accepte.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if isinstance(data, bytes):
+        return (data[i:i + SDMX_CHUNK_SIZE] for i in range(0, len(data), SDMX_CHUNK_SIZE))
+    return data
+
+
+def format_idbank(idbank: str) -> str:
+    """
+    Formate un idBank en ajoutant les zéros manquants au début
+    """
+    idbank = ''.join(filter(str.isdigit, idbank))
+    return idbank.zfill(9)
+
+
+def build_series_params(first_nth_observations: Optional[int] = None,
+                        last_nth_observations: Optional[int] = None,
+                        start_period: Optional[str] = None,
+                        end_period: Optional[str] = None) -> Dict:
+    """
+    Construit les paramètres de requête communs aux appels de séries
+    """
+    params = {}
+    if first_nth_observations:
+        params['firstNObservations'] = first_nth_observations
+    if last_nth_observations:
+        params['lastNObservations'] = last_nth_observations
+    if start_period:
+        params['startPeriod'] = start_period
+    if end_period:
+        params['endPeriod'] = end_period
+    return params
+
+
+def series_summary(attributes: Dict) -> Dict:
+    """
+    Résume les attributs d'une série (recherche, contenu d'un dataflow)
+    """
+    return {
+        'idbank': attributes.get('IDBANK'),
+        'title_fr': attributes.get('TITLE_FR'),
+        'title_en': attributes.get('TITLE_EN'),
+        'unit': attributes.get('UNIT_MEASURE'),
+        'frequency': attributes.get('FREQ'),
+        'last_update': attributes.get('LAST_UPDATE')
+    }
+
+
+def dataflow_series_summary(attributes: Dict) -> Dict:
+    """
+    Résumé d'une série d'un dataflow : series_summary et codes de la série
+    ('codes' : dimensions et attributs codés, ex: {'FREQ': 'M', 'NATURE': 'INDICE'})
+    """
+    summary = series_summary(attributes)
+    summary['codes'] = {name: value for name, value in attributes.items()
+                        if name not in SERIES_TEXT_ATTRIBUTES}
+    return summary
+
+
+def _sdmx_name(element, lang: str = 'fr') -> Optional[str]:
+    """Nom (common:Name) d'un élément de structure, en français de préférence"""
+    names = element.findall('common:Name', SDMX_NS)
+    for name in names:
+        if name.get('{http://www.w3.org/XML/1998/namespace}lang') == lang:
+            return name.text
+    return names[0].text if names else None
+
+
+def parse_datastructure(xml_data: Union[str, bytes]) -> Dict:
+    """
+    Parse la structure d'un dataflow (DSD avec ses codelists et concepts)
+
+    Returns:
+        dict: {'id', 'dimensions': [{'id', 'position', 'name', 'codelist'}] par position,
+               'codelists': {codelist: {code: libellé}}}
+    """
+    root = ET.fromstring(xml_data)
+    codelists = {
+        codelist.get('id'): {code.get('id'): _sdmx_name(code)
+                             for code in codelist.findall('structure:Code', SDMX_NS)}
+        for codelist in root.iter(f"{{{SDMX_NS['structure']}}}Codelist")
+    }
+    concepts = {concept.get('id'): _sdmx_name(concept)
+                for concept in root.iter(f"{{{SDMX_NS['structure']}}}Concept")}
+
+    structure = root.find('.//structure:DataStructure', SDMX_NS)
+    if structure is None:
+        return {'id': None, 'dimensions': [], 'codelists': codelists}
+    dimensions = []
+    for dimension in structure.iter(f"{{{SDMX_NS['structure']}}}Dimension"):
+        dimension_id = dimension.get('id')
+        concept = dimension.find('structure:ConceptIdentity/Ref', SDMX_NS)
+        enumeration = dimension.find('structure:LocalRepresentation/structure:Enumeration/Ref', SDMX_NS)
+        dimensions.append({
+            'id': dimension_id,
+            'position': int(dimension.get('position') or len(dimensions) + 1),
+            'name': concepts.get(concept.get('id') if concept is not None else dimension_id) or dimension_id,
+            'codelist': enumeration.get('id') if enumeration is not None else None
+        })
+    dimensions.sort(key=lambda dimension: dimension['position'])
+    # Seules les codelists des dimensions sont conservées
+    used = {dimension['codelist'] for dimension in dimensions}
+    return {'id': structure.get('id'), 'dimensions': dimensions,
+            'codelists': {codelist: codes for codelist, codes in codelists.items() if codelist in used}}
+
+
+def parse_dataflows(xml_data: Union[str, bytes]) -> List[Dict]:
+    """
+    Parse la liste des dataflows (message de structure SDMX)
+    """
+    root = ET.fromstring(xml_data)
+    dataflows = []
+    
+    for dataflow in root.findall('.//structure:Dataflow', SDMX_NS):
+        dataflow_id = dataflow.get('id')
+        name = dataflow.find('.//common:Name', SDMX_NS)
+        description = dataflow.find('.//common:Description', SDMX_NS)
+        
+        if name is not None:
+            dataflows.append({
+                'id': dataflow_id,
+                'name': name.text,
+                'description': description.text if description is not None else ''
+            })
+    
+    return dataflows
+
+
+def series_metadata(attributes: Dict) -> Dict:
+    """
+    Extrait les métadonnées d'une série à partir de ses attributs SDMX
+    """
+    return {
+        'IDBANK': attributes.get('IDBANK'),
+        'TITLE_FR': attributes.get('TITLE_FR'),
+        'TITLE_EN': attributes.get('TITLE_EN'),
+        'LAST_UPDATE': attributes.get('LAST_UPDATE'),
+        'UNIT_MEASURE': attributes.get('UNIT_MEASURE'),
+        'FREQ': attributes.get('FREQ')
+    }
+
+
+def build_series_frame(record: Dict) -> Dict:
+    """
+    Convertit une série parsée en mode colonnaire en {'metadata', 'frame'}
+    """
+    return {
+        'metadata': series_metadata(record['attributes']),
+        'frame': record['observations'].to_frame()
+    }
+
+
+def build_series_result(record: Dict) -> Dict:
+    """
+    Convertit une série issue de iter_sdmx_series en {'metadata', 'observations'}
+    """
+    metadata = series_metadata(record['attributes'])
+    
+    observations = []
+    if isinstance(record['observations'], ObservationColumns):
+        # Série décodée en colonnes (SDMX-CSV)
+        columns = record['observations']
+        observations = [
+            {'date': period, 'valeur': value, 'statut': status, 'qualite': quality}
+            for period, value, status, quality
+            in zip(columns.periods, columns.values, columns.statuses, columns.qualities)
+        ]
+    else:
+        for obs in record['observations']:
+            observations.append({
+                'date': obs.get('TIME_PERIOD'),
+                'valeur': to_float(obs.get('OBS_VALUE')),
+                'statut': obs.get('OBS_STATUS'),
+                'qualite': obs.get('OBS_QUAL')
+            })
+    
+    # Tri des observations par date
+    observations.sort(key=lambda x: x['date'] or '')
+    
+    return {
+        'metadata': metadata,
+        'observations': observations
+    }
+
 
 class InseeBdmAPI:
     """
     Classe pour interagir avec l'API BDM (Banque de Données Macroéconomiques) de l'INSEE
     """
-    def __init__(self, consumer_key: str = None, consumer_secret: str = None):
-        self.base_url = "https://api.insee.fr/series/BDM"
+    def __init__(self, consumer_key: str = None, consumer_secret: str = None,
+                 base_url: str = DEFAULT_BASE_URL,
+                 token_url: str = DEFAULT_TOKEN_URL,
+                 cache_path: Optional[str] = "insee_cache.sqlite",
+                 cache_max_age: float = 6 * 3600,
+                 search_index_path: Optional[str] = "series_index.pkl",
+                 pool_connections: int = 4,
+                 pool_maxsize: int = 16,
+                 rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 metrics: Optional[Metrics] = None,
+                 data_format: str = 'xml',
+                 parser_backend: Optional[str] = None,
+                 timeout: Optional[Tuple[float, float]] = DEFAULT_TIMEOUT,
+                 deadline: Optional[float] = DEFAULT_DEADLINE,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 stale_while_revalidate: bool = True):
+        self.base_url = base_url
+        self.token_url = token_url
         self.consumer_key = consumer_key
         self.consumer_secret = consumer_secret
         self.token = None
+        self.token_expires_at = None
+        self._token_lock = threading.Lock()
+        
+        # Cache persistant des séries (None pour le désactiver)
+        self.cache = SeriesCache(cache_path, cache_max_age) if cache_path else None
+        
+        # Index local de l'annuaire SERIES_BDM pour search_series (None pour le désactiver)
+        self.search_index = SeriesCatalogIndex(search_index_path) if search_index_path else None
+        self._search_refresh_lock = threading.Lock()
         
         # Headers de base pour l'API BDM
         self.base_headers = {
@@ -19,37 +549,255 @@ class InseeBdmAPI:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         
+        # Représentation demandée pour les messages de données ('xml', ou 'csv' : SDMX-CSV
+        # si l'API le propose, sinon SDMX-ML) et parser SDMX-ML ('lxml' ou 'stdlib')
+        if data_format not in DATA_ACCEPT_TYPES:
+            raise ValueError(f"Format inconnu : {data_format} (attendu : {', '.join(DATA_ACCEPT_TYPES)})")
+        self.data_format = data_format
+        self.parser_backend = parser_backend or DEFAULT_PARSER_BACKEND
+        self._compact_refused = False
+        
+        # Limiteur de débit commun à tous les clients du processus (quota INSEE)
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
+        self.max_retries = max_retries
+        
+        # Délais stricts : (connexion, lecture) par requête, et durée totale d'un appel
+        # (None pour ne pas borner) ; disjoncteur commun à tous les clients du processus
+        self.timeout = timeout
+        self.deadline = deadline
+        self.circuit_breaker = circuit_breaker or get_default_circuit_breaker()
+        
+        # Séries périmées du cache servies aussitôt et revalidées en tâche de fond ;
+        # on_revalidated(idbank) est appelé après chaque revalidation réussie
+        self.stale_while_revalidate = stale_while_revalidate
+        self.on_revalidated = None
+        self._revalidating = set()
+        self._revalidation_lock = threading.Lock()
+        self._revalidation_executor = None
+        
+        # Mesures des appels amont (durées par phase, statuts, octets), communes au processus
+        self.metrics = metrics or get_metrics()
+        
+        # Session HTTP partagée : connexions keep-alive réutilisées et réponses compressées
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+        
         # Authentification automatique au démarrage
         self.get_token()
 
-    def get_token(self) -> bool:
+    def get_token(self, deadline: Optional[float] = None) -> bool:
         """
         Obtient un token d'accès OAuth2
+        
+        La requête passe par le disjoncteur et reste dans le délai total de
+        l'appel en cours (deadline, instant time.monotonic ; par défaut
+        self.deadline à partir de maintenant) : un /token qui ne répond pas
+        ne bloque pas l'appelant au-delà.
         """
         if not self.consumer_key or not self.consumer_secret:
-            print("Clés d'API manquantes")
+            logger.warning("Clés d'API manquantes")
             return False
 
-        auth_url = "https://api.insee.fr/token"
+        auth_url = self.token_url
         auth = (self.consumer_key, self.consumer_secret)
         headers = {'Accept': 'application/json'}
         data = {'grant_type': 'client_credentials'}
 
+        if deadline is None and self.deadline is not None:
+            deadline = time.monotonic() + self.deadline
+        timeout = self.timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning("Authentification impossible : délai dépassé")
+                return False
+            timeout = (min(timeout[0], remaining), min(timeout[1], remaining)) if timeout else remaining
+
         try:
-            print(f"Tentative d'authentification...")
-            response = requests.post(auth_url, auth=auth, headers=headers, data=data)
+            self.circuit_breaker.allow()
+            logger.debug("Tentative d'authentification...")
+            with self.metrics.call('token') as trace:
+                with phase('connect'):
+                    try:
+                        response = self.session.post(auth_url, auth=auth, headers=headers, data=data,
+                                                     timeout=timeout)
+                    except (requests.ConnectionError, requests.Timeout):
+                        self.circuit_breaker.on_failure()
+                        raise
+                trace.status = response.status_code
+                trace.bytes = len(response.content)
+            if response.status_code >= 500:
+                self.circuit_breaker.on_failure()
+            else:
+                self.circuit_breaker.on_success()
             
             if response.status_code == 200:
-                self.token = response.json().get('access_token')
-                print("Authentification réussie")
+                payload = response.json()
+                self.token = payload.get('access_token')
+                # Sans durée de validité annoncée, seul un 401 déclenchera le renouvellement
+                expires_in = payload.get('expires_in')
+                self.token_expires_at = time.time() + float(expires_in) if expires_in else None
+                logger.info("Authentification réussie")
                 return True
             else:
-                print(f"Échec de l'authentification : {response.status_code}")
-                print(f"Réponse : {response.text}")
+                logger.warning(f"Échec de l'authentification : {response.status_code} {response.text}")
         except Exception as e:
-            print(f"Erreur lors de l'authentification : {str(e)}")
+            logger.warning(f"Erreur lors de l'authentification : {str(e)}")
         return False
 
+    def ensure_token(self, deadline: Optional[float] = None) -> bool:
+        """
+        Vérifie que le token est présent et valide, et le renouvelle avant son expiration
+        
+        Args:
+            deadline (float): Instant (time.monotonic) au-delà duquel le renouvellement,
+                attente du verrou comprise, est abandonné (voir get_token)
+        """
+        def needs_refresh():
+            if not self.token:
+                return True
+            return self.token_expires_at is not None and \
+                time.time() >= self.token_expires_at - TOKEN_REFRESH_MARGIN
+
+        if not needs_refresh():
+            return True
+        wait = -1 if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self._token_lock.acquire(timeout=wait):
+            return False
+        try:
+            # Un autre thread a pu renouveler le token pendant l'attente du verrou
+            if not needs_refresh():
+                return True
+            return self.get_token(deadline)
+        finally:
+            self._token_lock.release()
+
+    def request(self, method: str, url: str, accept_type: str = 'application/xml',
+                priority: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        Envoie une requête authentifiée via la session partagée
+        
+        Chaque tentative attend un jeton du limiteur de débit (priority : INTERACTIVE
+        ou BACKGROUND, priorité courante par défaut). Les 429/503 et erreurs réseau
+        sont rejoués avec un backoff exponentiel (ou le délai Retry-After), tant que
+        l'appel reste dans son délai total (deadline) et que le circuit est fermé.
+        Après un 401, le token est renouvelé (dans le même délai total) et la requête
+        rejouée une seule fois.
+        Les arguments supplémentaires (params, stream...) sont transmis à requests.
+        
+        Raises:
+            CircuitOpenError: Le disjoncteur refuse la requête (API indisponible)
+            requests.Timeout: Délai dépassé (quota, connexion ou lecture)
+        """
+        deadline = None if self.deadline is None else time.monotonic() + self.deadline
+        self.ensure_token(deadline)
+        trace = current_trace()
+        token_renewed = False
+        attempt = 0
+        kwargs.setdefault('timeout', self.timeout)
+        
+        def can_retry(delay: float) -> bool:
+            if attempt >= self.max_retries or self.circuit_breaker.is_open():
+                return False
+            return deadline is None or time.monotonic() + delay < deadline
+        
+        while True:
+            self.circuit_breaker.allow()
+            with phase('wait'):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self.rate_limiter.acquire(priority, timeout=remaining):
+                    raise requests.Timeout(f"Délai de {self.deadline:.0f} s dépassé en attente du quota")
+            if trace is not None:
+                trace.attempts += 1
+            try:
+                # Jusqu'à la réception des en-têtes (ou de tout le corps sans stream=True)
+                with phase('connect'):
+                    response = self.session.request(method, url, headers=self.get_headers(accept_type),
+                                                    **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.circuit_breaker.on_failure()
+                delay = backoff_delay(attempt)
+                if not can_retry(delay):
+                    raise
+                logger.warning(f"Erreur réseau ({str(e)}), nouvelle tentative dans {delay:.1f} s")
+                with phase('wait'):
+                    time.sleep(delay)
+                attempt += 1
+                continue
+            if trace is not None:
+                trace.status = response.status_code
+            
+            # Un 429 relève du quota, pas de l'état de l'API
+            if response.status_code >= 500:
+                self.circuit_breaker.on_failure()
+            elif response.status_code != 429:
+                self.circuit_breaker.on_success()
+            
+            if response.status_code == 401 and not token_renewed:
+                logger.info("Token refusé (401), renouvellement...")
+                token_renewed = True
+                with self._token_lock:
+                    renewed = self.get_token(deadline)
+                if renewed:
+                    response.close()
+                    continue
+                return response
+            
+            if response.status_code in RETRY_STATUSES:
+                delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                if can_retry(delay):
+                    logger.warning(f"Réponse {response.status_code}, nouvelle tentative dans {delay:.1f} s")
+                    response.close()
+                    with phase('wait'):
+                        if response.status_code == 429:
+                            # Pause commune à tous les appels : le limiteur attend et ralentit
+                            self.rate_limiter.on_throttled(delay)
+                        else:
+                            time.sleep(delay)
+                    attempt += 1
+                    continue
+            
+            if response.status_code < 400:
+                self.rate_limiter.on_success()
+            return response
+
+    def request_data(self, url: str, params: Optional[Dict] = None,
+                     compact: bool = True) -> requests.Response:
+        """
+        GET en flux d'un message de données SDMX, dans la représentation la plus compacte
+        
+        Avec data_format='csv', SDMX-CSV est proposé avant SDMX-ML : l'API
+        répond dans l'un ou l'autre (voir iter_records). Si elle refuse la
+        négociation (406, 415), le client repasse en SDMX-ML pour la suite.
+        
+        Args:
+            compact (bool): Proposer SDMX-CSV ; False pour les listes de séries sans
+                observations, que SDMX-CSV ne gagne rien à représenter (attributs
+                répétés sur chaque ligne)
+        """
+        if compact and self.data_format == 'csv' and not self._compact_refused:
+            response = self.request('GET', url, accept_type=DATA_ACCEPT_TYPES['csv'],
+                                    params=params, stream=True)
+            if response.status_code not in UNSUPPORTED_FORMAT_STATUSES:
+                return response
+            response.close()
+            logger.info(f"SDMX-CSV refusé ({response.status_code}), repli sur SDMX-ML")
+            self._compact_refused = True
+        return self.request('GET', url, accept_type=DATA_ACCEPT_TYPES['xml'], params=params, stream=True)
+
+    def iter_records(self, response: requests.Response, with_observations: bool = True,
+                     columnar: bool = False) -> Iterator[Dict]:
+        """Décode une réponse de request_data au fil de la lecture (voir iter_sdmx_series)"""
+        return iter_sdmx_series(iter_download(response.iter_content(SDMX_CHUNK_SIZE)),
+                                with_observations, columnar, self.parser_backend,
+                                response.headers.get('Content-Type'))
+
     def get_headers(self, accept_type='application/xml') -> Dict:
         """
         Prépare les headers pour les requêtes API
@@ -60,138 +808,297 @@ class InseeBdmAPI:
             headers['Authorization'] = f'Bearer {self.token}'
         return headers
 
-    def search_series(self, query: str) -> List[Dict]:
+    def search_series(self, query: str, page: int = 1,
+                      page_size: Optional[int] = None) -> List[Dict]:
         """
         Recherche des séries dans l'annuaire BDM
         
         Args:
             query (str): Terme de recherche
+            page (int): Numéro de page (à partir de 1, une valeur inférieure vaut 1)
+            page_size (int): Nombre de résultats par page (None pour tout retourner)
             
         Returns:
-            list: Liste des séries trouvées
+            list: Liste des séries trouvées, triées par pertinence
+        """
+        page = max(1, page)
+        # Sans index local, parcours complet de l'annuaire à chaque recherche
+        if self.search_index is None:
+            return self._scan_series(query)
+        
+        if not self.search_index.is_fresh():
+            # Un seul téléchargement de l'annuaire pour les recherches simultanées
+            with self._search_refresh_lock:
+                if not self.search_index.is_fresh():
+                    refreshed = self.refresh_search_index()
+                    # Un index existant, même ancien, reste utilisable si l'annuaire est injoignable
+                    if "error" in refreshed and not len(self.search_index):
+                        return refreshed
+        
+        found = self.search_index.search(query, page=page, page_size=page_size)
+        logger.debug(f"Nombre de séries trouvées : {found['total']}")
+        return found['results']
+
+    @instrumented('catalog')
+    def refresh_search_index(self) -> Dict:
+        """
+        Télécharge l'annuaire SERIES_BDM et met à jour l'index local
+        (seules les séries dont LAST_UPDATE a changé sont réindexées)
+        """
+        if not self.ensure_token():
+            return {"error": "Authentification requise"}
+        
+        url = f"{self.base_url}/data/SERIES_BDM"
+        try:
+            with self.request_data(url, compact=False) as response:
+                if response.status_code != 200:
+                    return {"error": f"Erreur {response.status_code}: {response.text}"}
+                with phase('parse'):
+                    records = self.iter_records(response, with_observations=False)
+                    summaries = [series_summary(record['attributes']) for record in records]
+        except Exception as e:
+            logger.warning(f"Exception lors du chargement de l'annuaire : {str(e)}")
+            return {"error": f"Erreur lors du chargement de l'annuaire : {str(e)}"}
+        
+        with phase('index'):
+            counts = self.search_index.update(summaries)
+        logger.info(f"Index de recherche mis à jour : {counts}")
+        return counts
+
+    @instrumented('catalog')
+    def _scan_series(self, query: str) -> List[Dict]:
+        """
+        Recherche par sous-chaîne en parcourant tout l'annuaire BDM
         """
         # Vérification de l'authentification
-        if not self.token and not self.get_token():
+        if not self.ensure_token():
             return {"error": "Authentification requise"}
 
         # Utilisation de l'API de recherche
         url = f"{self.base_url}/data/SERIES_BDM"
-        headers = self.get_headers()
         
         try:
-            # D'abord, récupérons toutes les séries disponibles
-            response = requests.get(url, headers=headers)
-            print(f"URL de recherche : {response.url}")
-            print(f"Status code : {response.status_code}")
-            
-            if response.status_code == 200:
-                # Parse le XML
-                root = ET.fromstring(response.text)
+            # D'abord, récupérons toutes les séries disponibles (lecture en flux)
+            with self.request_data(url, compact=False) as response:
+                
+                if response.status_code != 200:
+                    logger.warning(f"Erreur de recherche : {response.text}")
+                    return {"error": f"Erreur {response.status_code}: {response.text}"}
+                
                 series_list = []
                 query_lower = query.lower()
                 
-                # Recherche dans les séries
-                for series in root.findall('.//Series'):
-                    title_fr = series.get('TITLE_FR', '').lower()
-                    idbank = series.get('IDBANK', '')
-                    
-                    # Si le terme de recherche est dans le titre ou l'idbank
-                    if query_lower in title_fr or query_lower in idbank.lower():
-                        serie_info = {
-                            'idbank': idbank,
-                            'title_fr': series.get('TITLE_FR'),
-                            'title_en': series.get('TITLE_EN'),
-                            'unit': series.get('UNIT_MEASURE'),
-                            'frequency': series.get('FREQ'),
-                            'last_update': series.get('LAST_UPDATE')
-                        }
-                        series_list.append(serie_info)
+                # Recherche dans les séries, sans conserver les observations
+                records = self.iter_records(response, with_observations=False)
+                with phase('parse'):
+                    for record in records:
+                        series = record['attributes']
+                        title_fr = series.get('TITLE_FR', '').lower()
+                        idbank = series.get('IDBANK', '')
+                        
+                        # Si le terme de recherche est dans le titre ou l'idbank
+                        if query_lower in title_fr or query_lower in idbank.lower():
+                            series_list.append(series_summary(series))
                 
-                print(f"Nombre de séries trouvées : {len(series_list)}")
+                logger.debug(f"Nombre de séries trouvées : {len(series_list)}")
                 return series_list
-            else:
-                print(f"Erreur de recherche : {response.text}")
-                return {"error": f"Erreur {response.status_code}: {response.text}"}
                 
         except Exception as e:
-            print(f"Exception lors de la recherche : {str(e)}")
+            logger.warning(f"Exception lors de la recherche : {str(e)}")
             return {"error": f"Erreur lors de la recherche : {str(e)}"}
 
+    @instrumented('dataflows')
+    def get_dataflows(self) -> Union[List[Dict], Dict]:
+        """
+        Récupère la liste des dataflows (thèmes) disponibles
+        
+        Returns:
+            list: Dataflows {'id', 'name', 'description'}, ou {"error": message}
+        """
+        if not self.ensure_token():
+            return {"error": "Authentification requise"}
+        
+        url = f"{self.base_url}/V1/dataflow"
+        try:
+            with self.request('GET', url, stream=True) as response:
+                if response.status_code != 200:
+                    return {"error": f"Erreur {response.status_code}: {response.text}"}
+                content = b''.join(iter_download(response.iter_content(SDMX_CHUNK_SIZE)))
+            with phase('parse'):
+                return parse_dataflows(content)
+        except Exception as e:
+            logger.warning(f"Exception lors de la récupération des dataflows : {str(e)}")
+            return {"error": f"Erreur lors de la récupération des dataflows : {str(e)}"}
+
+    @instrumented('dataflow_series')
+    def get_dataflow_series(self, dataflow_id: str, force_refresh: bool = False) -> Union[List[Dict], Dict]:
+        """
+        Liste les séries d'un dataflow (métadonnées uniquement)
+        
+        Seuls les attributs des séries sont demandés, sans leurs observations ;
+        la liste est conservée dans le cache SQLite (table dataflow_series).
+        
+        Args:
+            force_refresh (bool): Redemander la liste même si le cache est à jour
+        
+        Returns:
+            list: Résumés des séries (voir series_summary), ou {"error": message}
+        """
+        entry = None
+        if self.cache is not None and not force_refresh:
+            with phase('cache'):
+                entry = self.cache.get_dataflow_entry(dataflow_id)
+            if entry is not None and self.cache.is_fresh(entry):
+                mark_cache('hit')
+                return entry['series']
+            mark_cache('miss')
+        
+        if not self.ensure_token():
+            return {"error": "Authentification requise"}
+        
+        url = f"{self.base_url}/V1/data/{dataflow_id}/all"
+        series = self._fetch_dataflow_series(url)
+        if isinstance(series, dict) and entry is not None:
+            # API indisponible : la dernière liste connue reste servie
+            logger.warning(f"Liste des séries de {dataflow_id} périmée servie : {series['error']}")
+            mark_cache('stale')
+            return entry['series']
+        if self.cache is not None and not isinstance(series, dict):
+            with phase('cache'):
+                self.cache.store_dataflow(dataflow_id, series)
+        return series
+
+    def _fetch_dataflow_series(self, url: str) -> Union[List[Dict], Dict]:
+        """Appelle l'API pour la liste des séries d'un dataflow (voir get_dataflow_series)"""
+        try:
+            for params in DATAFLOW_METADATA_PARAMS:
+                with self.request_data(url, params, compact=False) as response:
+                    if response.status_code in UNSUPPORTED_PARAMS_STATUSES and params is not DATAFLOW_METADATA_PARAMS[-1]:
+                        logger.info(f"Paramètres {params} refusés ({response.status_code}), essai suivant")
+                        continue
+                    if response.status_code != 200:
+                        return {"error": f"Erreur {response.status_code}: {response.text}"}
+                    
+                    # Lecture en flux : seules les métadonnées des séries sont conservées
+                    records = self.iter_records(response, with_observations=False)
+                    with phase('parse'):
+                        return [dataflow_series_summary(record['attributes']) for record in records]
+        except Exception as e:
+            logger.warning(f"Exception lors de la récupération du dataflow : {str(e)}")
+            return {"error": f"Erreur lors de la récupération du dataflow : {str(e)}"}
+
+    @instrumented('datastructure')
+    def get_datastructure(self, dataflow_id: str, force_refresh: bool = False) -> Dict:
+        """
+        Récupère la structure d'un dataflow : dimensions et libellés de leurs codes
+        
+        La DSD est demandée avec ses codelists et concepts (references=children)
+        et conservée DATASTRUCTURE_MAX_AGE secondes dans le cache SQLite.
+        
+        Returns:
+            dict: Voir parse_datastructure, ou {"error": message}
+        """
+        entry = None
+        if self.cache is not None and not force_refresh:
+            with phase('cache'):
+                entry = self.cache.get_datastructure(dataflow_id)
+            if entry is not None and self.cache.is_fresh(entry, DATASTRUCTURE_MAX_AGE):
+                mark_cache('hit')
+                return entry['structure']
+            mark_cache('miss')
+        
+        if not self.ensure_token():
+            return {"error": "Authentification requise"}
+        
+        url = f"{self.base_url}/V1/datastructure/{SDMX_AGENCY}/{dataflow_id}"
+        structure = self._fetch_datastructure(url)
+        if "error" in structure and entry is not None:
+            # Structure périmée conservée tant que l'API ne répond pas
+            logger.warning(f"Structure de {dataflow_id} périmée servie : {structure['error']}")
+            mark_cache('stale')
+            return entry['structure']
+        if self.cache is not None and "error" not in structure:
+            with phase('cache'):
+                self.cache.store_datastructure(dataflow_id, structure)
+        return structure
+
+    def _fetch_datastructure(self, url: str) -> Dict:
+        """Appelle l'API pour la structure d'un dataflow (voir get_datastructure)"""
+        try:
+            with self.request('GET', url, params={'references': 'children'}, stream=True) as response:
+                if response.status_code != 200:
+                    return {"error": f"Erreur {response.status_code}: {response.text}"}
+                content = b''.join(iter_download(response.iter_content(SDMX_CHUNK_SIZE)))
+            with phase('parse'):
+                structure = parse_datastructure(content)
+            if not structure['dimensions']:
+                return {"error": "Aucune dimension trouvée dans la structure"}
+            return structure
+        except Exception as e:
+            logger.warning(f"Exception lors de la récupération de la structure : {str(e)}")
+            return {"error": f"Erreur lors de la récupération de la structure : {str(e)}"}
+
     def format_idbank(self, idbank: str) -> str:
         """
         Formate un idBank en ajoutant les zéros manquants au début
         """
-        idbank = ''.join(filter(str.isdigit, idbank))
-        return idbank.zfill(9)
+        return format_idbank(idbank)
 
-    def parse_series_xml(self, xml_data: str) -> Dict:
+    def parse_series_xml(self, xml_data: Union[str, bytes, Iterable[bytes]],
+                         as_frame: bool = False, content_type: Optional[str] = None) -> Dict:
         """
         Parse les données XML de l'API en dictionnaire
+        
+        Args:
+            xml_data: Texte XML complet ou flux de blocs d'octets (lecture incrémentale)
+            as_frame (bool): Retourner les observations sous forme de DataFrame typé ('frame')
+            content_type (str): Content-Type de la réponse (SDMX-CSV décodé par decode_sdmx_csv)
         """
         try:
-            # Parse le XML
-            root = ET.fromstring(xml_data)
-            
-            # Recherche de la série dans le XML
-            series_list = root.findall('.//Series')
-            if not series_list:
-                print("Aucune série trouvée dans le XML")
-                print(f"Contenu XML reçu : {xml_data[:500]}...")
+            # Seule la première série du flux est retenue
+            with phase('parse'):
+                series = next(iter_sdmx_series(_as_chunks(xml_data), columnar=as_frame,
+                                               backend=self.parser_backend,
+                                               content_type=content_type), None)
+            if series is None:
+                logger.warning("Aucune série trouvée dans le XML")
+                if isinstance(xml_data, str):
+                    logger.debug(f"Contenu XML reçu : {xml_data[:500]}...")
                 return {"error": "Aucune série trouvée dans les données"}
             
-            series = series_list[0]
-            print(f"Série trouvée avec ID : {series.get('IDBANK')}")
-            
-            # Récupère les métadonnées de la série
-            metadata = {
-                'IDBANK': series.get('IDBANK'),
-                'TITLE_FR': series.get('TITLE_FR'),
-                'TITLE_EN': series.get('TITLE_EN'),
-                'LAST_UPDATE': series.get('LAST_UPDATE'),
-                'UNIT_MEASURE': series.get('UNIT_MEASURE')
-            }
-            
-            # Récupère les observations
-            observations = []
-            for obs in series.findall('.//Obs'):
-                observation = {
-                    'date': obs.get('TIME_PERIOD'),
-                    'valeur': float(obs.get('OBS_VALUE')),
-                    'statut': obs.get('OBS_STATUS'),
-                    'qualite': obs.get('OBS_QUAL')
-                }
-                observations.append(observation)
+            logger.debug(f"Série trouvée avec ID : {series['attributes'].get('IDBANK')}")
+            logger.debug(f"Nombre d'observations trouvées : {len(series['observations'])}")
+            with phase('frame'):
+                if as_frame:
+                    return build_series_frame(series)
+                return build_series_result(series)
             
-            print(f"Nombre d'observations trouvées : {len(observations)}")
-            
-            # Tri des observations par date
-            observations.sort(key=lambda x: x['date'])
-            
-            return {
-                'metadata': metadata,
-                'observations': observations
-            }
-            
-        except ET.ParseError as e:
-            print(f"Erreur de parsing XML : {str(e)}")
-            print(f"Données XML reçues : {xml_data[:200]}...")
+        except XML_PARSE_ERRORS as e:
+            logger.warning(f"Erreur de parsing XML : {str(e)}")
+            if isinstance(xml_data, str):
+                logger.debug(f"Données XML reçues : {xml_data[:200]}...")
             return {"error": f"Erreur lors du parsing XML : {str(e)}"}
         except Exception as e:
-            print(f"Erreur inattendue : {str(e)}")
+            logger.warning(f"Erreur inattendue : {str(e)}")
             return {"error": f"Erreur inattendue : {str(e)}"}
 
+    @instrumented('series')
     def get_series_by_idbank(self, idbanks: Union[str, List[str]], 
                            first_nth_observations: Optional[int] = None,
                            last_nth_observations: Optional[int] = None,
                            start_period: Optional[str] = None,
-                           end_period: Optional[str] = None) -> Dict:
+                           end_period: Optional[str] = None,
+                           as_frame: bool = False,
+                           force_refresh: bool = False) -> Dict:
         """
         Récupère les données des séries par leurs identifiants idBank
+        
+        Avec as_frame, les observations sont retournées sous 'frame' : un DataFrame
+        (date en datetime64, valeur en float64 avec NaN, statut/qualite catégoriels)
+        rempli directement pendant le parsing. Avec force_refresh, une série en
+        cache est rafraîchie (incrémentalement) même si elle est encore fraîche.
+        Une série servie depuis le cache ne demande ni token ni appel réseau.
         """
-        # Vérification de l'authentification
-        if not self.token and not self.get_token():
-            return {"error": "Authentification requise"}
-
         # Conversion en liste si nécessaire
         if isinstance(idbanks, str):
             idbanks = [idbanks]
@@ -200,34 +1107,357 @@ class InseeBdmAPI:
         idbanks = [self.format_idbank(idbank) for idbank in idbanks]
         
         # Vérification de la limite
-        if len(idbanks) > 400:
-            return {"error": "Le nombre maximum d'idBank est limité à 400"}
+        if len(idbanks) > MAX_IDBANKS_PER_REQUEST:
+            return {"error": f"Le nombre maximum d'idBank est limité à {MAX_IDBANKS_PER_REQUEST}, "
+                             f"utilisez get_series_batch"}
             
-        # Construction des paramètres
-        params = {}
-        if first_nth_observations:
-            params['firstNObservations'] = first_nth_observations
-        if last_nth_observations:
-            params['lastNObservations'] = last_nth_observations
-        if start_period:
-            params['startPeriod'] = start_period
-        if end_period:
-            params['endPeriod'] = end_period
+        # Le cache ne porte que sur l'historique d'une série unique
+        if self.cache is not None and len(idbanks) == 1 and not first_nth_observations \
+                and not last_nth_observations:
+            return self._get_series_cached(idbanks[0], start_period, end_period, as_frame,
+                                           force_refresh)
+        
+        # Vérification de l'authentification
+        if not self.ensure_token():
+            return {"error": "Authentification requise"}
             
+        params = build_series_params(first_nth_observations, last_nth_observations,
+                                     start_period, end_period)
+        return self._fetch_series(idbanks, params, as_frame)
+
+    def get_series_batch(self, idbanks: Union[str, List[str]],
+                         last_nth_observations: Optional[int] = None,
+                         start_period: Optional[str] = None,
+                         end_period: Optional[str] = None,
+                         max_workers: int = DEFAULT_BATCH_WORKERS,
+                         as_frame: bool = False) -> Dict:
+        """
+        Récupère un nombre quelconque de séries, indexées par idBank
+        
+        La liste est découpée en lots de MAX_IDBANKS_PER_REQUEST idBank,
+        récupérés en parallèle sur un nombre limité de threads.
+        
+        Returns:
+            dict: {'series': {idbank: {'metadata', 'observations'}},
+                   'errors': {idbank: message}}
+                  (avec as_frame, chaque série est {'metadata', 'frame'})
+        """
+        if isinstance(idbanks, str):
+            idbanks = [idbanks]
+        
+        # Formatage et dédoublonnage en conservant l'ordre
+        idbanks = list(dict.fromkeys(self.format_idbank(idbank) for idbank in idbanks))
+        series, errors = {}, {}
+        
+        # Les séries fraîches en cache ne sont pas redemandées, les séries périmées
+        # sont servies telles quelles et revalidées en tâche de fond
+        cacheable = self.cache is not None and not last_nth_observations and not end_period
+        if cacheable:
+            to_fetch = []
+            for idbank in idbanks:
+                entry = self.cache.get_entry(idbank)
+                if entry is not None and self.cache.covers(entry, start_period) \
+                        and (self.cache.is_fresh(entry) or self.stale_while_revalidate):
+                    if self.cache.is_fresh(entry):
+                        self.cache.record('hits')
+                    else:
+                        self.cache.record('stale')
+                        self._schedule_revalidation(idbank)
+                    series[idbank] = self.cache.load(idbank, start_period, as_frame=as_frame)
+                    series[idbank]['freshness'] = self._freshness(idbank, entry)
+                else:
+                    self.cache.record('misses')
+                    to_fetch.append(idbank)
+            self.metrics.count_cache('series_batch', 'hit', len(idbanks) - len(to_fetch))
+            self.metrics.count_cache('series_batch', 'miss', len(to_fetch))
+            idbanks = to_fetch
+        
+        chunks = [idbanks[i:i + MAX_IDBANKS_PER_REQUEST]
+                  for i in range(0, len(idbanks), MAX_IDBANKS_PER_REQUEST)]
+        if not chunks:
+            return {'series': series, 'errors': errors}
+        
+        # Token demandé seulement pour les séries à récupérer
+        if not self.ensure_token():
+            errors.update({idbank: "Authentification requise" for idbank in idbanks})
+            return {'series': series, 'errors': errors}
+        
+        params = build_series_params(None, last_nth_observations, start_period, end_period)
+        logger.debug(f"Récupération de {len(idbanks)} série(s) en {len(chunks)} lot(s)")
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            # Chaque lot hérite du contexte appelant (priorité des requêtes)
+            futures = {executor.submit(contextvars.copy_context().run,
+                                       self._fetch_series_chunk, chunk, params): chunk
+                       for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": f"Erreur inattendue : {str(e)}"}
+                
+                # Échec du lot : l'erreur est reportée sur chacun de ses idBank
+                if "error" in result:
+                    for idbank in chunk:
+                        errors[idbank] = result['error']
+                    continue
+                
+                for idbank in chunk:
+                    if idbank not in result:
+                        errors[idbank] = "Série non trouvée dans la réponse"
+                        continue
+                    series[idbank] = result[idbank]
+                    if cacheable:
+                        self.cache.store(idbank, result[idbank]['metadata'],
+                                         result[idbank]['observations'], covered_from=start_period)
+                    if as_frame:
+                        series[idbank] = {
+                            'metadata': result[idbank]['metadata'],
+                            'frame': frame_from_observations(result[idbank]['observations'])
+                        }
+        
+        logger.info(f"{len(series)} série(s) récupérée(s), {len(errors)} en erreur")
+        return {'series': series, 'errors': errors}
+
+    def validate_idbanks(self, idbanks: Union[str, List[str]],
+                         max_workers: int = DEFAULT_BATCH_WORKERS) -> Dict:
+        """
+        Vérifie l'existence d'idBank sans télécharger leur historique
+        
+        Seules les métadonnées et la dernière observation sont demandées
+        (lastNObservations=1), par lots de MAX_IDBANKS_PER_REQUEST idBank ;
+        les résultats sont conservés dans le cache SQLite.
+        
+        Returns:
+            dict: {'valid': {idbank: métadonnées}, 'invalid': {idbank: message}}
+        """
+        if isinstance(idbanks, str):
+            idbanks = [idbanks]
+        idbanks = list(dict.fromkeys(self.format_idbank(idbank) for idbank in idbanks))
+        valid, invalid = {}, {}
+        
+        known = {}
+        if self.cache is not None:
+            with phase('cache'):
+                known = self.cache.get_validations(idbanks, INVALID_IDBANK_MAX_AGE)
+        for idbank, metadata in known.items():
+            if metadata is None:
+                invalid[idbank] = "Série non trouvée"
+            else:
+                valid[idbank] = metadata
+        to_check = [idbank for idbank in idbanks if idbank not in known]
+        self.metrics.count_cache('validate', 'hit', len(known))
+        self.metrics.count_cache('validate', 'miss', len(to_check))
+        if not to_check:
+            return {'valid': valid, 'invalid': invalid}
+        
+        if not self.ensure_token():
+            invalid.update({idbank: "Authentification requise" for idbank in to_check})
+            return {'valid': valid, 'invalid': invalid}
+        
+        chunks = [to_check[i:i + MAX_IDBANKS_PER_REQUEST]
+                  for i in range(0, len(to_check), MAX_IDBANKS_PER_REQUEST)]
+        checked = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            futures = {executor.submit(contextvars.copy_context().run, self._fetch_series_chunk,
+                                       chunk, {'lastNObservations': 1}): chunk
+                       for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": f"Erreur inattendue : {str(e)}"}
+                
+                # 404 : aucun idBank du lot n'existe ; autre erreur : rien n'est conclu
+                if "error" in result and result.get('status') != 404:
+                    invalid.update({idbank: result['error'] for idbank in chunk})
+                    continue
+                for idbank in chunk:
+                    if idbank in result:
+                        checked[idbank] = valid[idbank] = result[idbank]['metadata']
+                    else:
+                        checked[idbank] = None
+                        invalid[idbank] = "Série non trouvée"
+        
+        if self.cache is not None and checked:
+            with phase('cache'):
+                self.cache.store_validations(checked)
+        logger.info(f"{len(valid)} idBank valide(s), {len(invalid)} invalide(s)")
+        return {'valid': valid, 'invalid': invalid}
+
+    def _get_series_cached(self, idbank: str, start_period: Optional[str],
+                           end_period: Optional[str], as_frame: bool = False,
+                           force_refresh: bool = False) -> Dict:
+        """
+        Sert une série depuis le cache local, en ne demandant à l'API
+        que les périodes postérieures à la dernière période connue
+        
+        Une série périmée est servie aussitôt et revalidée en tâche de fond
+        (stale_while_revalidate) ; avec force_refresh, elle est rafraîchie avant
+        d'être servie. Si l'API ne répond pas, la dernière copie est conservée.
+        Le résultat indique sous 'freshness' l'âge des données (voir _freshness).
+        """
+        with phase('cache'):
+            entry = self.cache.get_entry(idbank)
+        
+        if entry is not None and self.cache.covers(entry, start_period):
+            error = None
+            if self.cache.is_fresh(entry) and not force_refresh:
+                self.cache.record('hits')
+                mark_cache('hit')
+                logger.debug(f"Série {idbank} servie depuis le cache")
+            elif self.stale_while_revalidate and not force_refresh:
+                self.cache.record('stale')
+                mark_cache('stale')
+                logger.debug(f"Série {idbank} périmée servie depuis le cache, revalidation en tâche de fond")
+                self._schedule_revalidation(idbank)
+            else:
+                self.cache.record('refreshes')
+                mark_cache('refresh')
+                error = self._refresh_series(idbank, entry)
+                if error is not None:
+                    logger.warning(f"Rafraîchissement impossible, données en cache conservées : {error}")
+            with phase('cache'):
+                if error is None:
+                    entry = self.cache.get_entry(idbank)
+                result = self.cache.load(idbank, start_period, end_period, as_frame)
+                result['freshness'] = self._freshness(idbank, entry, error)
+                return result
+        
+        # Absente du cache (ou historique insuffisant) : appel complet jusqu'à aujourd'hui
+        self.cache.record('misses')
+        mark_cache('miss')
+        if not self.ensure_token():
+            return {"error": "Authentification requise"}
+        params = {'startPeriod': start_period} if start_period else {}
+        try:
+            result = self._fetch_series([idbank], params)
+        except (requests.RequestException, CircuitOpenError) as e:
+            return {"error": f"Erreur lors de la récupération de la série : {str(e)}"}
+        if "error" in result:
+            return result
+        with phase('cache'):
+            self.cache.store(idbank, result['metadata'], result['observations'],
+                             covered_from=start_period)
+            result = self.cache.load(idbank, start_period, end_period, as_frame)
+            result['freshness'] = self._freshness(idbank, self.cache.get_entry(idbank))
+            return result
+
+    def _freshness(self, idbank: str, entry: Dict, error: Optional[str] = None) -> Dict:
+        """
+        Fraîcheur d'une série servie depuis le cache
+        
+        Returns:
+            dict: {'fetched_at': horodatage du dernier appel réussi,
+                   'stale': plus ancienne que cache.max_age,
+                   'revalidating': revalidation en cours,
+                   'error': échec du dernier rafraîchissement (None sinon)}
+        """
+        with self._revalidation_lock:
+            revalidating = idbank in self._revalidating
+        return {
+            'fetched_at': entry['fetched_at'],
+            'stale': not self.cache.is_fresh(entry),
+            'revalidating': revalidating,
+            'error': error
+        }
+
+    def _refresh_series(self, idbank: str, entry: Dict) -> Optional[str]:
+        """
+        Rafraîchit incrémentalement une série en cache
+        
+        Returns:
+            str: Message d'erreur si l'API n'a pas répondu (cache inchangé), sinon None
+        """
+        if not self.ensure_token():
+            return "Authentification requise"
+        # La dernière période est redemandée pour intégrer ses éventuelles révisions
+        refresh_from = entry['last_period'] or entry['covered_from']
+        params = {'startPeriod': refresh_from} if refresh_from else {}
+        try:
+            result = self._fetch_series([idbank], params)
+        except (requests.RequestException, CircuitOpenError) as e:
+            return str(e)
+        if "error" in result:
+            return result['error']
+        with phase('cache'):
+            self.cache.store(idbank, result['metadata'], result['observations'],
+                             covered_from=entry['covered_from'])
+        return None
+
+    def _schedule_revalidation(self, idbank: str):
+        """Lance la revalidation d'une série en tâche de fond (une seule à la fois par série)"""
+        with self._revalidation_lock:
+            if idbank in self._revalidating:
+                return
+            self._revalidating.add(idbank)
+            if self._revalidation_executor is None:
+                self._revalidation_executor = ThreadPoolExecutor(
+                    max_workers=REVALIDATION_WORKERS, thread_name_prefix='insee-revalidate')
+        self._revalidation_executor.submit(self._revalidate, idbank)
+
+    @instrumented('revalidate')
+    def _revalidate(self, idbank: str):
+        """Revalidation d'une série périmée, avec la priorité des tâches de fond"""
+        try:
+            with request_priority(BACKGROUND):
+                entry = self.cache.get_entry(idbank)
+                error = self._refresh_series(idbank, entry) if entry is not None else None
+            if error is not None:
+                logger.warning(f"Revalidation de {idbank} impossible : {error}")
+                return
+            self.cache.record('revalidations')
+            if self.on_revalidated is not None:
+                self.on_revalidated(idbank)
+        except Exception as e:
+            logger.warning(f"Revalidation de {idbank} en échec : {str(e)}")
+        finally:
+            with self._revalidation_lock:
+                self._revalidating.discard(idbank)
+
+    def _fetch_series(self, idbanks: List[str], params: Dict, as_frame: bool = False) -> Dict:
+        """
+        Appelle l'API pour une liste d'idBank déjà formatés
+        """
         # Construction de l'URL selon la documentation
         idbanks_path = '+'.join(idbanks)
         url = f"{self.base_url}/data/SERIES_BDM/{idbanks_path}"
         
-        print(f"URL de la requête : {url}")
-        print(f"Paramètres : {params}")
+        logger.debug(f"URL de la requête : {url}")
+        logger.debug(f"Paramètres : {params}")
         
-        # Appel de l'API
-        response = requests.get(url, params=params, headers=self.get_headers())
+        # Appel de l'API, la réponse est parsée au fil de la lecture
+        with self.request_data(url, params) as response:
+            if response.status_code != 200:
+                logger.warning(f"Réponse d'erreur : {response.text}")
+                
+            if response.status_code == 200:
+                return self.parse_series_xml(iter_download(response.iter_content(SDMX_CHUNK_SIZE)),
+                                             as_frame, response.headers.get('Content-Type'))
+            return {"error": f"Erreur {response.status_code}: {response.text}"}
+
+    @instrumented('series_batch')
+    def _fetch_series_chunk(self, idbanks: List[str], params: Dict) -> Dict:
+        """
+        Appelle l'API pour un lot d'idBank et retourne toutes les séries de la réponse
+        
+        Returns:
+            dict: {idbank: {'metadata', 'observations'}} ou {"error": message}
+        """
+        idbanks_path = '+'.join(idbanks)
+        url = f"{self.base_url}/data/SERIES_BDM/{idbanks_path}"
         
-        print(f"Status code : {response.status_code}")
-        if response.status_code != 200:
-            print(f"Réponse d'erreur : {response.text}")
+        with self.request_data(url, params) as response:
+            if response.status_code != 200:
+                return {"error": f"Erreur {response.status_code}: {response.text}",
+                        'status': response.status_code}
             
-        if response.status_code == 200:
-            return self.parse_series_xml(response.text)
-        return {"error": f"Erreur {response.status_code}: {response.text}"}
\ No newline at end of file
+            results = {}
+            with phase('parse'):
+                for record in self.iter_records(response):
+                    idbank = record['attributes'].get('IDBANK')
+                    with phase('frame'):
+                        results[idbank] = build_series_result(record)
+            return results
@@ -0,0 +1,450 @@
+import asyncio
+import logging
+import time
+from typing import List, Dict, Union, Optional, Tuple
+
+import aiohttp
+
+from insee_bdm_api import (
+    DEFAULT_BASE_URL, DEFAULT_TOKEN_URL, SDMX_CHUNK_SIZE, MAX_IDBANKS_PER_REQUEST,
+    RETRY_STATUSES, TOKEN_REFRESH_MARGIN, DATAFLOW_METADATA_PARAMS, UNSUPPORTED_PARAMS_STATUSES,
+    DATA_ACCEPT_TYPES, UNSUPPORTED_FORMAT_STATUSES, DEFAULT_PARSER_BACKEND, XML_PARSE_ERRORS,
+    DEFAULT_TIMEOUT, DEFAULT_DEADLINE,
+    SdmxStreamParser, SdmxCsvDecoder, build_series_params, build_series_result,
+    dataflow_series_summary, format_idbank, is_sdmx_csv, parse_dataflows, series_summary
+)
+from rate_limiter import TokenBucketRateLimiter, get_default_rate_limiter, backoff_delay, DEFAULT_MAX_RETRIES
+from instrumentation import Metrics, get_metrics
+from circuit_breaker import CircuitBreaker, get_default_circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximum de requêtes simultanées par défaut
+DEFAULT_MAX_CONCURRENCY = 20
+
+
+class AsyncInseeBdmAPI:
+    """
+    Variante asynchrone (asyncio + aiohttp) de InseeBdmAPI
+
+    Les méthodes ont les mêmes paramètres et formats de retour que la version
+    synchrone. Un sémaphore limite le nombre de requêtes en vol et le token est
+    partagé par toutes les tâches. À utiliser comme gestionnaire de contexte :
+
+        async with AsyncInseeBdmAPI(key, secret) as api:
+            result = await api.get_series_by_idbank("001641607")
+    """
+    def __init__(self, consumer_key: str = None, consumer_secret: str = None,
+                 base_url: str = DEFAULT_BASE_URL,
+                 token_url: str = DEFAULT_TOKEN_URL,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rate_limiter: Optional[TokenBucketRateLimiter] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 metrics: Optional[Metrics] = None,
+                 data_format: str = 'xml',
+                 parser_backend: Optional[str] = None,
+                 timeout: Optional[Tuple[float, float]] = DEFAULT_TIMEOUT,
+                 deadline: Optional[float] = DEFAULT_DEADLINE,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url
+        self.token_url = token_url
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        
+        # Même limiteur de débit que le client synchrone : le quota INSEE est commun
+        self.rate_limiter = rate_limiter or get_default_rate_limiter()
+        self.metrics = metrics or get_metrics()
+        self.token = None
+
+        # Délais (connexion, lecture) et durée totale d'une requête, disjoncteur commun
+        # avec le client synchrone
+        self.timeout = timeout
+        self.deadline = deadline
+        self.circuit_breaker = circuit_breaker or get_default_circuit_breaker()
+        self.token_expires_at = None
+
+        # Headers de base pour l'API BDM
+        self.base_headers = {
+            'Accept': 'application/xml',
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+
+        # Représentation des messages de données et parser SDMX-ML, comme InseeBdmAPI
+        if data_format not in DATA_ACCEPT_TYPES:
+            raise ValueError(f"Format inconnu : {data_format} (attendu : {', '.join(DATA_ACCEPT_TYPES)})")
+        self.data_format = data_format
+        self.parser_backend = parser_backend or DEFAULT_PARSER_BACKEND
+        self._compact_refused = False
+
+        # La session et les primitives asyncio sont créées dans la boucle d'exécution
+        self.session = None
+        self._semaphore = None
+        self._token_lock = None
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Crée à la demande la session HTTP (connexions keep-alive partagées)"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            connect, read = self.timeout or (None, None)
+            timeout = aiohttp.ClientTimeout(total=self.deadline, sock_connect=connect, sock_read=read)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._token_lock = asyncio.Lock()
+        return self.session
+
+    def _request_timeout(self, deadline: Optional[float]) -> aiohttp.ClientTimeout:
+        """Délais (connexion, lecture) d'une tentative, bornés par l'échéance de l'appel"""
+        connect, read = self.timeout or (None, None)
+        # total=0 désactiverait la limite : un délai écoulé laisse un minimum symbolique
+        total = None if deadline is None else max(0.001, deadline - time.monotonic())
+        return aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=read)
+
+    async def close(self):
+        """Ferme la session HTTP"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def get_token(self) -> bool:
+        """
+        Obtient un token d'accès OAuth2 (via le disjoncteur et dans le délai
+        total d'un appel, comme InseeBdmAPI.get_token)
+        """
+        if not self.consumer_key or not self.consumer_secret:
+            logger.warning("Clés d'API manquantes")
+            return False
+
+        auth = aiohttp.BasicAuth(self.consumer_key, self.consumer_secret)
+        headers = {'Accept': 'application/json'}
+        data = {'grant_type': 'client_credentials'}
+        deadline = None if self.deadline is None else time.monotonic() + self.deadline
+
+        try:
+            logger.debug("Tentative d'authentification...")
+            self.circuit_breaker.allow()
+            try:
+                response = await self._get_session().post(self.token_url, auth=auth, headers=headers,
+                                                          data=data, timeout=self._request_timeout(deadline))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.circuit_breaker.on_failure()
+                raise
+            async with response:
+                if response.status >= 500:
+                    self.circuit_breaker.on_failure()
+                else:
+                    self.circuit_breaker.on_success()
+                if response.status == 200:
+                    payload = await response.json(content_type=None)
+                    self.token = payload.get('access_token')
+                    expires_in = payload.get('expires_in')
+                    self.token_expires_at = time.time() + float(expires_in) if expires_in else None
+                    logger.info("Authentification réussie")
+                    return True
+                logger.warning(f"Échec de l'authentification : {response.status} {await response.text()}")
+        except Exception as e:
+            logger.warning(f"Erreur lors de l'authentification : {str(e)}")
+        return False
+
+    def _token_needs_refresh(self) -> bool:
+        if not self.token:
+            return True
+        return self.token_expires_at is not None and \
+            time.time() >= self.token_expires_at - TOKEN_REFRESH_MARGIN
+
+    async def ensure_token(self) -> bool:
+        """
+        Vérifie que le token est valide ; un seul renouvellement pour toutes les tâches
+        """
+        if not self._token_needs_refresh():
+            return True
+        self._get_session()
+        async with self._token_lock:
+            if not self._token_needs_refresh():
+                return True
+            return await self.get_token()
+
+    def get_headers(self, accept_type='application/xml') -> Dict:
+        """
+        Prépare les headers pour les requêtes API
+        """
+        headers = self.base_headers.copy()
+        headers['Accept'] = accept_type
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        return headers
+
+    def _parser(self, with_observations: bool = True) -> SdmxStreamParser:
+        """Parser SDMX-ML du backend configuré"""
+        return SdmxStreamParser(with_observations, backend=self.parser_backend)
+
+    async def _get(self, endpoint: str, url: str, params: Optional[Dict] = None,
+                   parser: Optional[SdmxStreamParser] = None, compact: bool = False) -> Dict:
+        """
+        Requête GET authentifiée, limitée par le sémaphore de concurrence
+
+        Avec un parser, la réponse est lue en flux et les séries complètes sont
+        retournées sous 'records' ; sinon le corps brut est retourné sous 'body'.
+        Avec compact et data_format='csv', SDMX-CSV est proposé avant SDMX-ML
+        (décodé par SdmxCsvDecoder s'il est retenu par l'API).
+        Après un 401, le token est renouvelé et la requête rejouée une seule fois ;
+        comme dans InseeBdmAPI.request, les 429/503 et erreurs réseau (connexion,
+        délai dépassé) sont rejoués avec backoff tant que l'appel reste dans son
+        délai total (deadline) et que le circuit est fermé. Chaque tentative est
+        soumise au disjoncteur (CircuitOpenError si le circuit est ouvert).
+        L'appel est mesuré sous endpoint dans self.metrics.
+
+        Raises:
+            CircuitOpenError: Le disjoncteur refuse la requête (API indisponible)
+            asyncio.TimeoutError: Délai dépassé (quota, connexion ou lecture)
+        """
+        session = self._get_session()
+        token_renewed = False
+        attempt = 0
+        deadline = None if self.deadline is None else time.monotonic() + self.deadline
+
+        def can_retry(delay: float) -> bool:
+            if attempt >= self.max_retries or self.circuit_breaker.is_open():
+                return False
+            return deadline is None or time.monotonic() + delay < deadline
+
+        with self.metrics.call(endpoint) as trace:
+            started = time.perf_counter()
+            async with self._semaphore:
+                while True:
+                    # Le limiteur est bloquant : l'attente se fait hors de la boucle asyncio
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    if not await asyncio.to_thread(self.rate_limiter.acquire, None, remaining):
+                        raise asyncio.TimeoutError(f"Délai de {self.deadline:.0f} s dépassé en attente du quota")
+                    trace.add('wait', time.perf_counter() - started)
+                    trace.attempts += 1
+                    token_used = self.token
+                    accept_csv = compact and self.data_format == 'csv' and not self._compact_refused
+                    accept_type = DATA_ACCEPT_TYPES['csv' if accept_csv else 'xml']
+                    started = time.perf_counter()
+                    self.circuit_breaker.allow()
+                    try:
+                        response = await session.get(url, params=params, headers=self.get_headers(accept_type),
+                                                     timeout=self._request_timeout(deadline))
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        self.circuit_breaker.on_failure()
+                        trace.add('connect', time.perf_counter() - started)
+                        delay = backoff_delay(attempt)
+                        if not can_retry(delay):
+                            raise
+                        logger.warning(f"Erreur réseau ({str(e) or type(e).__name__}), "
+                                       f"nouvelle tentative dans {delay:.1f} s")
+                        started = time.perf_counter()
+                        await asyncio.sleep(delay)
+                        attempt += 1
+                        continue
+                    async with response:
+                        trace.add('connect', time.perf_counter() - started)
+                        trace.status = response.status
+                        started = time.perf_counter()
+                        if response.status >= 500:
+                            self.circuit_breaker.on_failure()
+                        elif response.status != 429:
+                            self.circuit_breaker.on_success()
+                        if response.status == 401 and not token_renewed:
+                            logger.info("Token refusé (401), renouvellement...")
+                            token_renewed = True
+                            async with self._token_lock:
+                                # Le token a pu être renouvelé par une autre tâche entre-temps
+                                renewed = self.token != token_used or await self.get_token()
+                            if renewed:
+                                continue
+                        if response.status in UNSUPPORTED_FORMAT_STATUSES and accept_csv:
+                            logger.info(f"SDMX-CSV refusé ({response.status}), repli sur SDMX-ML")
+                            self._compact_refused = True
+                            continue
+                        delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                        if response.status in RETRY_STATUSES and can_retry(delay):
+                            logger.warning(f"Réponse {response.status}, nouvelle tentative dans {delay:.1f} s")
+                            if response.status == 429:
+                                self.rate_limiter.on_throttled(delay)
+                            else:
+                                await asyncio.sleep(delay)
+                            attempt += 1
+                            continue
+                        if response.status != 200:
+                            return {"error": f"Erreur {response.status}: {await response.text()}",
+                                    'status': response.status}
+                        self.rate_limiter.on_success()
+                        if parser is None:
+                            body = await response.read()
+                            trace.bytes += len(body)
+                            trace.add('download', time.perf_counter() - started)
+                            return {'body': body}
+
+                        if is_sdmx_csv(response.headers.get('Content-Type')):
+                            parser = SdmxCsvDecoder(parser.with_observations)
+
+                        # Le temps passé à attendre chaque bloc compte en download, le reste en parse
+                        records = []
+                        async for chunk in response.content.iter_chunked(SDMX_CHUNK_SIZE):
+                            parsing = time.perf_counter()
+                            trace.add('download', parsing - started)
+                            trace.bytes += len(chunk)
+                            records.extend(parser.feed(chunk))
+                            started = time.perf_counter()
+                            trace.add('parse', started - parsing)
+                        parsing = time.perf_counter()
+                        trace.add('download', parsing - started)
+                        records.extend(parser.close())
+                        trace.add('parse', time.perf_counter() - parsing)
+                        return {'records': records}
+
+    async def search_series(self, query: str) -> List[Dict]:
+        """
+        Recherche des séries dans l'annuaire BDM
+        """
+        if not await self.ensure_token():
+            return {"error": "Authentification requise"}
+
+        url = f"{self.base_url}/data/SERIES_BDM"
+        try:
+            result = await self._get('catalog', url, parser=self._parser(with_observations=False))
+            if "error" in result:
+                return result
+
+            query_lower = query.lower()
+            return [
+                series_summary(record['attributes'])
+                for record in result['records']
+                if query_lower in record['attributes'].get('TITLE_FR', '').lower()
+                or query_lower in record['attributes'].get('IDBANK', '').lower()
+            ]
+        except Exception as e:
+            logger.warning(f"Exception lors de la recherche : {str(e)}")
+            return {"error": f"Erreur lors de la recherche : {str(e)}"}
+
+    async def get_dataflows(self) -> Union[List[Dict], Dict]:
+        """
+        Récupère la liste des dataflows (thèmes) disponibles
+        """
+        if not await self.ensure_token():
+            return {"error": "Authentification requise"}
+
+        try:
+            result = await self._get('dataflows', f"{self.base_url}/V1/dataflow")
+            if "error" in result:
+                return result
+            return parse_dataflows(result['body'])
+        except Exception as e:
+            logger.warning(f"Exception lors de la récupération des dataflows : {str(e)}")
+            return {"error": f"Erreur lors de la récupération des dataflows : {str(e)}"}
+
+    async def get_dataflow_series(self, dataflow_id: str) -> Union[List[Dict], Dict]:
+        """
+        Liste les séries d'un dataflow (métadonnées uniquement)
+        """
+        if not await self.ensure_token():
+            return {"error": "Authentification requise"}
+
+        url = f"{self.base_url}/V1/data/{dataflow_id}/all"
+        try:
+            # Attributs seuls, avec le même repli que InseeBdmAPI.get_dataflow_series
+            for params in DATAFLOW_METADATA_PARAMS:
+                result = await self._get('dataflow_series', url, params=params,
+                                         parser=self._parser(with_observations=False))
+                if result.get('status') not in UNSUPPORTED_PARAMS_STATUSES:
+                    break
+            if "error" in result:
+                return {"error": result['error']}
+            return [dataflow_series_summary(record['attributes']) for record in result['records']]
+        except Exception as e:
+            logger.warning(f"Exception lors de la récupération du dataflow : {str(e)}")
+            return {"error": f"Erreur lors de la récupération du dataflow : {str(e)}"}
+
+    async def get_series_by_idbank(self, idbanks: Union[str, List[str]],
+                                   first_nth_observations: Optional[int] = None,
+                                   last_nth_observations: Optional[int] = None,
+                                   start_period: Optional[str] = None,
+                                   end_period: Optional[str] = None) -> Dict:
+        """
+        Récupère les données des séries par leurs identifiants idBank
+        (première série de la réponse, comme InseeBdmAPI)
+        """
+        if not await self.ensure_token():
+            return {"error": "Authentification requise"}
+
+        if isinstance(idbanks, str):
+            idbanks = [idbanks]
+        idbanks = [format_idbank(idbank) for idbank in idbanks]
+
+        if len(idbanks) > MAX_IDBANKS_PER_REQUEST:
+            return {"error": f"Le nombre maximum d'idBank est limité à {MAX_IDBANKS_PER_REQUEST}, "
+                             f"utilisez get_series_batch"}
+
+        params = build_series_params(first_nth_observations, last_nth_observations,
+                                     start_period, end_period)
+        url = f"{self.base_url}/data/SERIES_BDM/{'+'.join(idbanks)}"
+        try:
+            result = await self._get('series', url, params=params, parser=self._parser(), compact=True)
+        except XML_PARSE_ERRORS as e:
+            return {"error": f"Erreur lors du parsing XML : {str(e)}"}
+        if "error" in result:
+            return result
+        if not result['records']:
+            return {"error": "Aucune série trouvée dans les données"}
+        return build_series_result(result['records'][0])
+
+    async def get_series_batch(self, idbanks: Union[str, List[str]],
+                               last_nth_observations: Optional[int] = None,
+                               start_period: Optional[str] = None,
+                               end_period: Optional[str] = None) -> Dict:
+        """
+        Récupère un nombre quelconque de séries, indexées par idBank
+
+        Les lots de MAX_IDBANKS_PER_REQUEST idBank sont lancés simultanément,
+        dans la limite de max_concurrency requêtes en vol.
+
+        Returns:
+            dict: {'series': {idbank: {'metadata', 'observations'}},
+                   'errors': {idbank: message}}
+        """
+        if isinstance(idbanks, str):
+            idbanks = [idbanks]
+        idbanks = list(dict.fromkeys(format_idbank(idbank) for idbank in idbanks))
+        series, errors = {}, {}
+
+        if not await self.ensure_token():
+            return {'series': series, 'errors': {idbank: "Authentification requise" for idbank in idbanks}}
+
+        params = build_series_params(None, last_nth_observations, start_period, end_period)
+        chunks = [idbanks[i:i + MAX_IDBANKS_PER_REQUEST]
+                  for i in range(0, len(idbanks), MAX_IDBANKS_PER_REQUEST)]
+
+        async def fetch_chunk(chunk: List[str]) -> Dict:
+            url = f"{self.base_url}/data/SERIES_BDM/{'+'.join(chunk)}"
+            return await self._get('series_batch', url, params=params, parser=self._parser(),
+                                   compact=True)
+
+        results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks),
+                                       return_exceptions=True)
+
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                result = {"error": f"Erreur inattendue : {str(result)}"}
+            if "error" in result:
+                for idbank in chunk:
+                    errors[idbank] = result['error']
+                continue
+
+            fetched = {record['attributes'].get('IDBANK'): record for record in result['records']}
+            for idbank in chunk:
+                if idbank in fetched:
+                    series[idbank] = build_series_result(fetched[idbank])
+                else:
+                    errors[idbank] = "Série non trouvée dans la réponse"
+
+        return {'series': series, 'errors': errors}
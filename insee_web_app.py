@@ -1,12 +1,21 @@
 import streamlit as st
 import plotly.graph_objects as go
-from insee_bdm_api import InseeBdmAPI
+from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime, timedelta
+import csv
 import json
 import os
 import warnings
-from config import init_session_state, check_global_authentication, get_default_series, show_logout_button
+from config import init_session_state, check_global_authentication, get_default_series, show_logout_button, get_shared_api, get_warmup_scheduler, default_start_year
+from shared_cache import get_shared_cache, SERIES_TTL
+from circuit_breaker import CLOSED
+from charting import series_trace, downsample_frame, max_points_for_width, DEFAULT_CHART_WIDTH
+from observations import slice_frame
+from comparison import (
+    AGGREGATIONS, FREQUENCY_LABELS, align_frame, combine_aligned, common_frequency,
+    frequency_options, series_frequency
+)
 
 # Supprimer les warnings de dépréciation
 warnings.filterwarnings('ignore', category=FutureWarning)
@@ -55,20 +64,85 @@ def load_series_from_json(filename: str = "saved_series.json") -> dict:
         # Retourne les séries par défaut en cas d'erreur
         return get_default_series()
 
+def parse_idbank_list(text: str) -> tuple:
+    """
+    Extrait les couples (idBank, nom) d'une liste collée ou d'un fichier CSV
+
+    Une ligne contient un idBank, éventuellement suivi ou précédé d'un nom
+    (séparateurs ; , tabulation ou espaces), ou plusieurs idBank séparés par des
+    espaces. Le nom vaut None s'il est absent.
+
+    Returns:
+        tuple: (liste des couples (idBank, nom), lignes sans idBank, en-têtes compris)
+    """
+    entries, skipped = [], []
+    for line in text.splitlines():
+        words = line.split()
+        if not words:
+            continue
+        if len(words) > 1 and all(word.isdigit() for word in words):
+            entries.extend((word, None) for word in words)
+            continue
+        delimiter = next((char for char in ';\t' if char in line), ',')
+        fields = [field.strip() for row in csv.reader([line], delimiter=delimiter) for field in row]
+        if len(fields) == 1:
+            # Sans séparateur : idBank en premier ou dernier mot, le reste formant le nom
+            for idbank, name_words in ((words[0], words[1:]), (words[-1], words[:-1])):
+                if idbank.isdigit() and len(idbank) <= 9:
+                    fields = [idbank, ' '.join(name_words)]
+                    break
+        idbank = next((field for field in fields if field.isdigit() and len(field) <= 9), None)
+        if idbank is None:
+            skipped.append(line.strip())
+            continue
+        name = next((field for field in fields if field and field != idbank), None)
+        entries.append((idbank, name))
+    return entries, skipped
+
+def import_idbanks(entries: list) -> dict:
+    """
+    Valide des idBank par lots et ajoute les séries existantes aux séries
+    sauvegardées, en une seule écriture de saved_series.json
+
+    Returns:
+        dict: {'added': [noms], 'duplicates': [idBank], 'invalid': {idBank: message}}
+    """
+    api = st.session_state.api
+    validation = api.validate_idbanks([idbank for idbank, _ in entries])
+    new_series_dict = st.session_state.series_options.copy()
+    saved_idbanks = {api.format_idbank(idbank) for idbank in new_series_dict.values()}
+    added, duplicates = [], []
+    for idbank, name in entries:
+        idbank = api.format_idbank(idbank)
+        if idbank not in validation['valid']:
+            continue
+        if idbank in saved_idbanks:
+            duplicates.append(idbank)
+            continue
+        name = name or validation['valid'][idbank]['TITLE_FR'] or idbank
+        if name in new_series_dict:
+            name = f"{name} ({idbank})"
+        new_series_dict[name] = idbank
+        saved_idbanks.add(idbank)
+        added.append(name)
+    if added:
+        update_series_and_save(new_series_dict)
+    return {'added': added, 'duplicates': duplicates, 'invalid': validation['invalid']}
+
 # Titre de l'application
 st.title("📊 Visualisation des données INSEE")
 
-# Initialisation de l'API si nécessaire
+# Initialisation de l'API si nécessaire (client partagé par toutes les sessions)
 if st.session_state.api is None:
     try:
-        # Récupération des clés d'API depuis les secrets Streamlit
-        consumer_key = st.secrets.api_insee.consumer_key
-        consumer_secret = st.secrets.api_insee.consumer_secret
-        st.session_state.api = InseeBdmAPI(consumer_key, consumer_secret)
+        st.session_state.api = get_shared_api()
     except Exception as e:
         st.error(f"Erreur lors de l'initialisation de l'API : {str(e)}")
         st.stop()
 
+# Préchargement en tâche de fond (démarré une seule fois par processus)
+scheduler = get_warmup_scheduler()
+
 # Initialisation du dictionnaire des séries dans la session state
 if not st.session_state.series_options:
     st.session_state.series_options = load_series_from_json()
@@ -79,13 +153,280 @@ def update_series_and_save(new_series_dict: dict):
     st.session_state.series_options = new_series_dict
     save_series_to_json(new_series_dict)
 
+def get_full_series(idbank: str) -> dict:
+    """
+    Historique complet d'une série ({'metadata', 'frame'}), chargé une seule fois
+    pour toutes les sessions : les changements de période sont de simples découpages
+
+    La clé porte l'idBank formaté, celui que le client passe à on_revalidated.
+    """
+    return get_shared_cache().get_or_load(
+        ('series', st.session_state.api.format_idbank(idbank)),
+        lambda: st.session_state.api.get_series_by_idbank(idbank, as_frame=True),
+        ttl=SERIES_TTL
+    )
+
+def load_series_frames(names: list) -> tuple:
+    """
+    Récupère l'historique complet de plusieurs séries sauvegardées : celles déjà
+    en cache partagé sont réutilisées, les autres sont demandées en une requête groupée,
+    une seule fois pour les sessions qui demandent en même temps les mêmes séries
+    """
+    shared_cache = get_shared_cache()
+    api = st.session_state.api
+    results, errors, missing = {}, {}, {}
+    for name in names:
+        formatted = api.format_idbank(st.session_state.series_options[name])
+        cached = shared_cache.get(('series', formatted))
+        if cached is not None:
+            results[name] = cached
+        else:
+            missing[name] = formatted
+    
+    if missing:
+        idbanks = tuple(sorted(set(missing.values())))
+
+        def load_batch():
+            batch = api.get_series_batch(list(idbanks), as_frame=True)
+            # Même clé que la vue d'une série unique, renseignée avant la fin du vol
+            for idbank, result in batch['series'].items():
+                shared_cache.set(('series', idbank), result, ttl=SERIES_TTL)
+            return batch
+
+        # Le lot lui-même n'est pas conservé : seules ses séries le sont
+        batch = shared_cache.get_or_load(('series_batch', idbanks), load_batch,
+                                         cache_if=lambda batch: False)
+        for name, formatted in missing.items():
+            if formatted in batch['series']:
+                results[name] = batch['series'][formatted]
+            else:
+                errors[name] = batch['errors'].get(formatted, "Série non trouvée")
+    return results, errors
+
+def get_aligned_series(name: str, result: dict, target_freq: str, how: str):
+    """
+    Historique complet aligné sur la fréquence cible, mémorisé pour toutes les sessions
+    (les périodes commencent en janvier : le découpage par année se fait ensuite)
+    """
+    idbank = st.session_state.series_options[name]
+    source_freq = series_frequency(result['metadata'])
+    return get_shared_cache().get_or_load(
+        ('aligned', idbank, result['metadata'].get('LAST_UPDATE'), target_freq, how),
+        lambda: align_frame(result['frame'], source_freq, target_freq, how),
+        ttl=SERIES_TTL
+    )
+
+def get_chart_points(idbank: str, result: dict, df: pd.DataFrame, start_period: str,
+                     max_points, window) -> pd.DataFrame:
+    """
+    Points transmis au graphique (fenêtre et réduction LTTB), recalculés
+    uniquement quand la série, la période, la fenêtre ou la résolution change
+    """
+    if max_points is None and window is None:
+        return df
+    return get_shared_cache().get_or_load(
+        ('points', idbank, result['metadata'].get('LAST_UPDATE'), start_period, window, max_points),
+        lambda: downsample_frame(df, max_points or len(df), window),
+        ttl=SERIES_TTL
+    )
+
+def get_last_values(idbank: str, result: dict, count: int) -> pd.DataFrame:
+    """
+    Tableau des count dernières valeurs : identique pour toutes les années de
+    début qui les incluent, il n'est reconstruit que si la série change
+    """
+    def build():
+        last_values = result['frame'].tail(count)
+        return pd.DataFrame({
+            'Date': last_values['date'].dt.strftime('%Y-%m'),
+            'Valeur': last_values['valeur']
+        })
+    return get_shared_cache().get_or_load(
+        ('last_values', idbank, result['metadata'].get('LAST_UPDATE'), count),
+        build,
+        ttl=SERIES_TTL
+    )
+
+def get_series_figure(idbank: str, result: dict, df: pd.DataFrame, name: str, start_period: str,
+                      max_points, window) -> go.Figure:
+    """
+    Graphique d'une série, mémorisé pour toutes les sessions par série,
+    LAST_UPDATE, période, fenêtre et résolution : un affichage répété ne
+    reconstruit pas la figure (ni ses traces réduites, déjà validées par Plotly)
+    """
+    def build():
+        # Création du graphique avec Plotly (WebGL et points réduits pour les séries longues)
+        fig = go.Figure()
+        
+        fig.add_trace(series_trace(
+            get_chart_points(idbank, result, df, start_period, max_points, window),
+            name=name,
+            line=dict(width=2)
+        ))
+        
+        # Personnalisation du graphique
+        fig.update_layout(
+            title={
+                'text': f"Évolution de {name}",
+                'y':0.9,
+                'x':0.5,
+                'xanchor': 'center',
+                'yanchor': 'top'
+            },
+            xaxis_title="Date",
+            yaxis_title=f"Valeur ({result['metadata']['UNIT_MEASURE']})",
+            hovermode='x unified',
+            template='plotly_white'
+        )
+        return fig
+    
+    return get_shared_cache().get_or_load(
+        ('figure', idbank, result['metadata'].get('LAST_UPDATE'), name, start_period, window, max_points),
+        build,
+        ttl=SERIES_TTL
+    )
+
+def get_comparison_render(results: dict, target_freq: str, how: str, normalize: bool,
+                          start_period: str, layout: str, max_points) -> dict:
+    """
+    Graphique et tableau des dernières valeurs d'une comparaison, mémorisés
+    par séries (idBank et LAST_UPDATE de chacune) et options d'affichage
+
+    Returns:
+        dict: {'figure': go.Figure, 'table': DataFrame des 12 dernières dates}
+    """
+    def build():
+        aligned = {
+            name: get_aligned_series(name, result, target_freq, how).loc[start_period:]
+            for name, result in results.items()
+        }
+        combined = combine_aligned(aligned, normalize=normalize)
+        
+        def column_frame(name: str) -> pd.DataFrame:
+            return pd.DataFrame({'date': combined.index, 'valeur': combined[name].to_numpy()})
+        
+        if layout == "Empilées":
+            fig = make_subplots(rows=len(combined.columns), cols=1, shared_xaxes=True,
+                                vertical_spacing=0.04, subplot_titles=list(combined.columns))
+            for row, name in enumerate(combined.columns, start=1):
+                fig.add_trace(series_trace(column_frame(name), name=name, max_points=max_points,
+                                           line=dict(width=2)), row=row, col=1)
+            fig.update_layout(height=250 * len(combined.columns), showlegend=False,
+                              template='plotly_white')
+        else:
+            fig = go.Figure()
+            for name in combined.columns:
+                fig.add_trace(series_trace(column_frame(name), name=name, max_points=max_points,
+                                           line=dict(width=2)))
+            fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Base 100" if normalize else "Valeur",
+                hovermode='x unified',
+                template='plotly_white'
+            )
+        
+        last_values = combined.tail(12).copy()
+        last_values.index = last_values.index.strftime('%Y-%m')
+        return {'figure': fig, 'table': last_values.rename_axis('Date').reset_index()}
+    
+    versions = tuple(
+        (name, st.session_state.series_options[name], result['metadata'].get('LAST_UPDATE'))
+        for name, result in results.items()
+    )
+    return get_shared_cache().get_or_load(
+        ('comparison', versions, target_freq, how, normalize, start_period, layout, max_points),
+        build,
+        ttl=SERIES_TTL
+    )
+
+def format_age(seconds: float) -> str:
+    """Âge lisible d'une donnée (ex: 5 min, 3 h, 2 j)"""
+    if seconds < 60:
+        return "moins d'une minute"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds // 3600:.0f} h"
+    return f"{seconds // 86400:.0f} j"
+
+def show_freshness(result: dict, name: str = None):
+    """
+    Indique la date des données servies et, si elles sont périmées, si une
+    mise à jour est en cours ou pourquoi l'API n'a pas pu les rafraîchir
+    """
+    freshness = result.get('freshness')
+    if freshness is None:
+        return
+    fetched_at = datetime.fromtimestamp(freshness['fetched_at'])
+    age = format_age((datetime.now() - fetched_at).total_seconds())
+    prefix = f"{name} : d" if name else "D"
+    if freshness['error']:
+        st.warning(f"⚠️ {prefix}onnées du {fetched_at:%d/%m/%Y %H:%M} (il y a {age}) : "
+                   f"l'API INSEE n'a pas répondu ({freshness['error']})")
+    elif freshness['stale']:
+        status = "mise à jour en cours" if freshness['revalidating'] else "mise à jour demandée"
+        st.caption(f"🕒 {prefix}onnées en cache du {fetched_at:%d/%m/%Y %H:%M} (il y a {age}), {status}")
+    else:
+        st.caption(f"🕒 {prefix}onnées à jour du {fetched_at:%d/%m/%Y %H:%M} (il y a {age})")
+
+def show_comparison(names: list, start_period: str, max_points):
+    """Affiche plusieurs séries alignées sur un index temporel commun, à partir de start_period"""
+    if len(names) < 2:
+        st.info("👈 Sélectionnez au moins deux séries à comparer")
+        return
+    
+    with st.spinner("Récupération des données en cours..."):
+        results, errors = load_series_frames(names)
+    for name, error in errors.items():
+        st.error(f"Erreur lors de la récupération de {name} : {error}")
+    for name, result in results.items():
+        freshness = result.get('freshness')
+        if freshness is not None and (freshness['stale'] or freshness['error']):
+            show_freshness(result, name)
+    results = {
+        name: result for name, result in results.items()
+        if not slice_frame(result['frame'], start_period).empty
+    }
+    if not results:
+        st.warning("Aucune donnée disponible pour la période sélectionnée")
+        return
+    
+    # Options d'alignement : par défaut la fréquence la plus large des séries
+    frequencies = [series_frequency(result['metadata']) for result in results.values()]
+    options = frequency_options(frequencies)
+    default_freq = common_frequency(frequencies)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        target_freq = st.selectbox(
+            "📅 Fréquence commune",
+            options=options,
+            index=options.index(default_freq) if default_freq in options else len(options) - 1,
+            format_func=lambda freq: FREQUENCY_LABELS[freq]
+        )
+    with col2:
+        how = st.selectbox(
+            "➕ Agrégation",
+            options=list(AGGREGATIONS),
+            format_func=lambda key: AGGREGATIONS[key]
+        )
+    with col3:
+        layout = st.radio("🗂️ Disposition", ["Superposées", "Empilées"], horizontal=True)
+        normalize = st.checkbox("Base 100 à la première date commune", value=False)
+    
+    render = get_comparison_render(results, target_freq, how, normalize, start_period, layout, max_points)
+    st.plotly_chart(render['figure'], use_container_width=True)
+    
+    # Tableau des dernières valeurs alignées
+    st.subheader("📊 Dernières valeurs alignées")
+    st.dataframe(render['table'], hide_index=True)
+
 # Sidebar pour les contrôles
 st.sidebar.header("Paramètres")
 
 # Gestion des séries (ajout/suppression)
 with st.sidebar.expander("⚙️ Gérer les séries", expanded=False):
     # Onglets pour séparer l'ajout et la suppression
-    tab_add, tab_delete = st.tabs(["Ajouter", "Supprimer"])
+    tab_add, tab_import, tab_delete = st.tabs(["Ajouter", "Importer", "Supprimer"])
     
     # Onglet Ajout manuel
     with tab_add:
@@ -93,27 +434,28 @@ with st.sidebar.expander("⚙️ Gérer les séries", expanded=False):
             new_series_name = st.text_input("Nom de la série")
             new_series_id = st.text_input("IdBank de la série")
             
-            # Bouton pour tester l'IdBank
+            # Bouton pour tester l'IdBank (métadonnées et dernière observation, résultat mis en cache)
             test_submitted = st.form_submit_button("Tester l'IdBank")
             if test_submitted and new_series_id:
                 # Test de l'IdBank avec indicateur de chargement
                 with st.spinner("Test de l'IdBank en cours..."):
-                    test_result = st.session_state.api.get_series_by_idbank(new_series_id)
-                if "error" in test_result:
+                    validation = st.session_state.api.validate_idbanks(new_series_id)
+                if not validation['valid']:
                     st.error("❌ IdBank invalide ou série non trouvée")
                 else:
-                    st.success(f"✅ Série trouvée : {test_result['metadata']['TITLE_FR']}")
+                    metadata = next(iter(validation['valid'].values()))
+                    st.success(f"✅ Série trouvée : {metadata['TITLE_FR']}")
                     # Pré-remplir le nom si non fourni
                     if not new_series_name:
-                        new_series_name = test_result['metadata']['TITLE_FR']
+                        new_series_name = metadata['TITLE_FR']
             
             # Bouton pour ajouter la série
             submitted = st.form_submit_button("Ajouter la série")
             if submitted and new_series_name and new_series_id:
-                # Vérification de l'IdBank avec indicateur de chargement
+                # Vérification de l'IdBank (servie par le cache après un test)
                 with st.spinner("Vérification de l'IdBank..."):
-                    test_result = st.session_state.api.get_series_by_idbank(new_series_id)
-                if "error" in test_result:
+                    validation = st.session_state.api.validate_idbanks(new_series_id)
+                if not validation['valid']:
                     st.error("❌ IdBank invalide ou série non trouvée")
                 else:
                     # Ajout de la série et sauvegarde
@@ -122,7 +464,44 @@ with st.sidebar.expander("⚙️ Gérer les séries", expanded=False):
                     update_series_and_save(new_series_dict)
                     st.success(f"✅ Série '{new_series_name}' ajoutée avec succès !")
     
-
+    # Onglet Import en masse
+    with tab_import:
+        uploaded_file = st.file_uploader("Fichier CSV d'IdBank", type=['csv', 'txt'])
+        pasted_idbanks = st.text_area(
+            "Ou liste d'IdBank",
+            help="Un IdBank par ligne, éventuellement suivi d'un nom (IdBank;Nom ou IdBank Nom) ; les lignes sans IdBank sont signalées"
+        )
+        if st.button("Importer les séries"):
+            text = pasted_idbanks
+            if uploaded_file is not None:
+                content = uploaded_file.getvalue()
+                try:
+                    text = content.decode('utf-8-sig') + "\n" + text
+                except UnicodeDecodeError:
+                    text = content.decode('latin-1') + "\n" + text
+            entries, skipped = parse_idbank_list(text)
+            if skipped:
+                with st.expander(f"ℹ️ {len(skipped)} ligne(s) sans IdBank ignorée(s)"):
+                    st.text("\n".join(skipped))
+            if not entries:
+                st.warning("Aucun IdBank trouvé")
+            else:
+                with st.spinner(f"Vérification de {len(entries)} IdBank..."):
+                    report = import_idbanks(entries)
+                if report['added']:
+                    st.success(f"✅ {len(report['added'])} série(s) ajoutée(s)")
+                if report['duplicates']:
+                    st.info(f"ℹ️ {len(report['duplicates'])} série(s) déjà sauvegardée(s)")
+                if report['invalid']:
+                    st.warning(f"⚠️ {len(report['invalid'])} IdBank invalide(s)")
+                    st.dataframe(
+                        pd.DataFrame(
+                            list(report['invalid'].items()),
+                            columns=['IdBank', 'Erreur']
+                        ),
+                        hide_index=True
+                    )
+    
     # Onglet Suppression
     with tab_delete:
         st.write("Sélectionnez les séries à supprimer :")
@@ -145,12 +524,22 @@ with st.sidebar.expander("⚙️ Gérer les séries", expanded=False):
             else:
                 st.warning("Aucune série sélectionnée pour la suppression")
 
+# Mode d'affichage : une série ou plusieurs séries comparées
+view_mode = st.sidebar.radio("Mode d'affichage", ["Série unique", "Comparaison"], horizontal=True)
+
 # Liste des séries disponibles
 st.sidebar.subheader("Séries disponibles")
-selected_series = st.sidebar.selectbox(
-    "Choisir une série",
-    list(st.session_state.series_options.keys())
-)
+if view_mode == "Comparaison":
+    compared_series = st.sidebar.multiselect(
+        "Choisir les séries à comparer",
+        list(st.session_state.series_options.keys()),
+        default=list(st.session_state.series_options.keys())[:2]
+    )
+else:
+    selected_series = st.sidebar.selectbox(
+        "Choisir une série",
+        list(st.session_state.series_options.keys())
+    )
 
 # Sélection de la période
 current_year = datetime.now().year
@@ -158,9 +547,23 @@ start_year = st.sidebar.slider(
     "Année de début",
     min_value=1990,
     max_value=current_year,
-    value=current_year-5
+    value=default_start_year()
 )
 
+# Rendu du graphique : nombre de points adapté à la largeur d'affichage
+with st.sidebar.expander("🖥️ Affichage du graphique", expanded=False):
+    chart_width = st.select_slider(
+        "Largeur du graphique (pixels)",
+        options=[800, 1200, 1600, 2400, 3200],
+        value=DEFAULT_CHART_WIDTH
+    )
+    full_resolution = st.checkbox(
+        "Afficher tous les points",
+        value=False,
+        help="Désactive la réduction du nombre de points (séries longues plus lentes à afficher)"
+    )
+max_points = None if full_resolution else max_points_for_width(chart_width)
+
 # Bouton de déconnexion
 show_logout_button()
 
@@ -169,6 +572,27 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("💾 Sauvegarde")
 st.sidebar.info(f"📊 {len(st.session_state.series_options)} série(s) sauvegardée(s)")
 
+# Statistiques du cache local des séries
+if st.session_state.api.cache is not None:
+    cache_stats = st.session_state.api.cache.stats()
+    st.sidebar.caption(
+        f"🗄️ Cache : {cache_stats['hits']} hit(s), {cache_stats['stale']} périmée(s) servie(s), "
+        f"{cache_stats['misses']} miss, "
+        f"{cache_stats['refreshes']} rafraîchissement(s) "
+        f"({cache_stats['hit_ratio']:.0%} de hits)"
+    )
+breaker_stats = st.session_state.api.circuit_breaker.stats()
+if breaker_stats['state'] != CLOSED:
+    st.sidebar.warning(
+        f"🔌 API INSEE indisponible : les données en cache sont servies "
+        f"(nouvel essai dans {breaker_stats['retry_in']:.0f} s)"
+    )
+shared_stats = get_shared_cache().stats()
+st.sidebar.caption(
+    f"🧠 Cache partagé : {shared_stats['entries']} entrée(s), {shared_stats['hits']} hit(s), "
+    f"{shared_stats['coalesced']} appel(s) regroupé(s)"
+)
+
 # Bouton pour réinitialiser les séries
 if st.sidebar.button("🔄 Réinitialiser les séries"):
     default_series = get_default_series()
@@ -177,75 +601,62 @@ if st.sidebar.button("🔄 Réinitialiser les séries"):
     st.rerun()
 
 # Récupération des données avec indicateur de chargement
-try:
-    idbank = st.session_state.series_options[selected_series]
-    
-    # Affichage de l'indicateur de chargement
-    with st.spinner("Récupération des données en cours..."):
-        result = st.session_state.api.get_series_by_idbank(
-            idbank,
-            start_period=f"{start_year}-01"
-        )
+if view_mode == "Comparaison":
+    show_comparison(compared_series, f"{start_year}-01", max_points)
+else:
+    try:
+        idbank = st.session_state.series_options[selected_series]
+        
+        # Affichage de l'indicateur de chargement
+        # (cache du processus : une seule requête pour toutes les sessions qui affichent cette série)
+        with st.spinner("Récupération des données en cours..."):
+            result = get_full_series(idbank)
 
-    if "error" in result:
-        st.error(f"Erreur lors de la récupération des données : {result['error']}")
-    else:
-        # Création du DataFrame
-        df = pd.DataFrame(result['observations'])
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            df['valeur'] = pd.to_numeric(df['valeur'])
-            
-            # Affichage des métadonnées
-            st.subheader("📋 Informations sur la série")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.info(f"**Titre** : {result['metadata']['TITLE_FR']}")
-            with col2:
-                st.info(f"**Unité** : {result['metadata']['UNIT_MEASURE']}")
-            
-            # Création du graphique avec Plotly
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=df['date'],
-                y=df['valeur'],
-                mode='lines+markers',
-                name=selected_series,
-                line=dict(width=2),
-                marker=dict(size=6)
-            ))
-            
-            # Personnalisation du graphique
-            fig.update_layout(
-                title={
-                    'text': f"Évolution de {selected_series}",
-                    'y':0.9,
-                    'x':0.5,
-                    'xanchor': 'center',
-                    'yanchor': 'top'
-                },
-                xaxis_title="Date",
-                yaxis_title=f"Valeur ({result['metadata']['UNIT_MEASURE']})",
-                hovermode='x unified',
-                template='plotly_white'
-            )
-            
-            # Affichage du graphique
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Tableau des dernières valeurs
-            st.subheader("📊 Dernières valeurs")
-            last_values = df.tail(12).copy()
-            last_values['date'] = last_values['date'].dt.strftime('%Y-%m')
-            last_values = last_values[['date', 'valeur']]
-            last_values.columns = ['Date', 'Valeur']
-            st.dataframe(last_values, hide_index=True)
+        if "error" in result:
+            st.error(f"Erreur lors de la récupération des données : {result['error']}")
         else:
-            st.warning("Aucune donnée disponible pour la période sélectionnée")
+            # DataFrame déjà typé par le parser (dates et valeurs numériques) ;
+            # l'année de début ne fait que découper l'historique en mémoire
+            start_period = f"{start_year}-01"
+            df = slice_frame(result['frame'], start_period)
+            if not df.empty:
+                # Affichage des métadonnées
+                st.subheader("📋 Informations sur la série")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.info(f"**Titre** : {result['metadata']['TITLE_FR']}")
+                with col2:
+                    st.info(f"**Unité** : {result['metadata']['UNIT_MEASURE']}")
+                show_freshness(result)
+                
+                # Série trop longue pour la largeur du graphique : le détail est
+                # recalculé pour la fenêtre choisie, à partir des données complètes
+                window = None
+                if max_points is not None and len(df) > max_points:
+                    first_date = df['date'].iloc[0].to_pydatetime()
+                    last_date = df['date'].iloc[-1].to_pydatetime()
+                    window = st.slider(
+                        "🔎 Fenêtre affichée",
+                        min_value=first_date,
+                        max_value=last_date,
+                        value=(first_date, last_date),
+                        format="YYYY-MM-DD"
+                    )
+                
+                # Graphique mémorisé (WebGL et points réduits pour les séries longues)
+                st.plotly_chart(
+                    get_series_figure(idbank, result, df, selected_series, start_period, max_points, window),
+                    use_container_width=True
+                )
+                
+                # Tableau des dernières valeurs
+                st.subheader("📊 Dernières valeurs")
+                st.dataframe(get_last_values(idbank, result, min(12, len(df))), hide_index=True)
+            else:
+                st.warning("Aucune donnée disponible pour la période sélectionnée")
 
-except Exception as e:
-    st.error(f"Une erreur est survenue : {str(e)}")
+    except Exception as e:
+        st.error(f"Une erreur est survenue : {str(e)}")
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,308 @@
+import bisect
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Phases d'un appel amont : attente du limiteur, envoi jusqu'aux en-têtes de réponse,
+# lecture du corps, parsing SDMX, construction du résultat (DataFrame), cache SQLite
+# et mise à jour de l'index de recherche (ordre d'affichage)
+PHASES = ('wait', 'connect', 'download', 'parse', 'frame', 'cache', 'index')
+
+# Nombre d'appels récents conservés pour l'affichage
+DEFAULT_MAX_EVENTS = 500
+
+# Bornes des histogrammes de durée : de 0,05 ms à ~2 min, +20 % par classe
+HISTOGRAM_MIN_SECONDS = 0.00005
+HISTOGRAM_GROWTH = 1.2
+HISTOGRAM_BUCKETS = 80
+HISTOGRAM_BOUNDS = [HISTOGRAM_MIN_SECONDS * HISTOGRAM_GROWTH ** i for i in range(HISTOGRAM_BUCKETS)]
+
+_current_trace = contextvars.ContextVar('insee_call_trace', default=None)
+
+
+class Histogram:
+    """
+    Histogramme à classes logarithmiques fixes : mémoire constante quel que soit
+    le nombre de mesures, percentiles estimés à ±10 %
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (HISTOGRAM_BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Percentile en secondes (interpolé dans la classe), None sans mesure"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            if seen + count >= rank:
+                lower = HISTOGRAM_BOUNDS[index - 1] if index else 0.0
+                upper = HISTOGRAM_BOUNDS[index] if index < HISTOGRAM_BUCKETS else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def summary(self) -> Dict:
+        """Nombre de mesures, moyenne, p50/p95/p99 et maximum en millisecondes"""
+        def ms(value):
+            return None if value is None else round(value * 1000, 3)
+        return {
+            'count': self.count,
+            'mean_ms': ms(self.total / self.count) if self.count else None,
+            'p50_ms': ms(self.percentile(0.50)),
+            'p95_ms': ms(self.percentile(0.95)),
+            'p99_ms': ms(self.percentile(0.99)),
+            'max_ms': ms(self.max) if self.count else None
+        }
+
+
+class CallTrace:
+    """
+    Mesures d'un appel en cours : durées exclusives par phase (une phase
+    imbriquée n'est pas comptée dans la phase englobante), octets reçus,
+    statut HTTP, tentatives et accès au cache
+    """
+    __slots__ = ('endpoint', 'started', 'phases', 'bytes', 'status', 'attempts', 'cache', '_stack')
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.bytes = 0
+        self.status = None
+        self.attempts = 0
+        self.cache = None
+        self._stack = []
+
+    def add(self, phase: str, seconds: float):
+        """Ajoute une durée mesurée par l'appelant (ex: client asynchrone)"""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def enter(self, phase: str):
+        self._stack.append([phase, time.perf_counter(), 0.0])
+
+    def exit(self):
+        phase, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.add(phase, elapsed - nested)
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def to_event(self, duration: float, error: Optional[str]) -> Dict:
+        return {
+            'time': time.time(),
+            'endpoint': self.endpoint,
+            'status': self.status,
+            'duration_ms': round(duration * 1000, 3),
+            'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            'bytes': self.bytes,
+            'attempts': self.attempts,
+            'cache': self.cache,
+            'error': error
+        }
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.total = Histogram()
+        self.phases = {}
+        self.statuses = Counter()
+        self.bytes = 0
+        self.cache = Counter()
+        self.errors = 0
+
+
+def _phase_order(name: str):
+    return (PHASES.index(name), name) if name in PHASES else (len(PHASES), name)
+
+
+class Metrics:
+    """
+    Registre des appels amont du processus, commun à toutes les sessions
+
+    Chaque point d'accès (dataflows, series, catalog...) tient des histogrammes
+    de durée (total et par phase), des compteurs de statuts, d'octets et de
+    cache ; les derniers appels sont gardés dans un tampon circulaire.
+    """
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._events = deque(maxlen=max_events)
+        self.started_at = time.time()
+
+    @contextmanager
+    def call(self, endpoint: str) -> Iterator[CallTrace]:
+        """
+        Mesure un appel : les requêtes et phases exécutées dans le bloc lui sont rattachées
+        """
+        trace = CallTrace(endpoint)
+        token = _current_trace.set(trace)
+        error = None
+        try:
+            yield trace
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            _current_trace.reset(token)
+            self.record(trace, time.perf_counter() - trace.started, error)
+
+    def record(self, trace: CallTrace, duration: float, error: Optional[str] = None):
+        """Enregistre un appel terminé"""
+        with self._lock:
+            stats = self._endpoints.get(trace.endpoint)
+            if stats is None:
+                stats = self._endpoints[trace.endpoint] = _EndpointStats()
+            stats.total.add(duration)
+            for name, seconds in trace.phases.items():
+                histogram = stats.phases.get(name)
+                if histogram is None:
+                    histogram = stats.phases[name] = Histogram()
+                histogram.add(seconds)
+            stats.statuses[str(trace.status) if trace.status is not None else 'aucun'] += 1
+            stats.bytes += trace.bytes
+            if trace.cache:
+                stats.cache[trace.cache] += 1
+            if error is not None or (trace.status is not None and trace.status >= 400):
+                stats.errors += 1
+            self._events.append(trace.to_event(duration, error))
+
+    def count_cache(self, endpoint: str, outcome: str, count: int = 1):
+        """Compte des accès au cache hors appel mesuré (ex: séries d'un lot servies localement)"""
+        if not count:
+            return
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = _EndpointStats()
+            stats.cache[outcome] += count
+
+    def summary(self) -> Dict:
+        """Statistiques par point d'accès : latences p50/p95/p99, statuts, octets, cache"""
+        with self._lock:
+            summary = {}
+            for endpoint, stats in sorted(self._endpoints.items()):
+                summary[endpoint] = {
+                    'total': stats.total.summary(),
+                    'phases': {name: stats.phases[name].summary()
+                               for name in sorted(stats.phases, key=_phase_order)},
+                    'statuses': dict(stats.statuses),
+                    'errors': stats.errors,
+                    'bytes': stats.bytes,
+                    'cache': dict(stats.cache)
+                }
+            return summary
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """Derniers appels, du plus récent au plus ancien"""
+        with self._lock:
+            events = list(self._events)
+        events.reverse()
+        return events[:limit] if limit else events
+
+    def export_json(self) -> str:
+        """Export JSON complet (résumé et derniers appels)"""
+        return json.dumps({
+            'started_at': self.started_at,
+            'exported_at': time.time(),
+            'endpoints': self.summary(),
+            'recent': self.recent()
+        }, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        """Remet tous les compteurs à zéro"""
+        with self._lock:
+            self._endpoints.clear()
+            self._events.clear()
+            self.started_at = time.time()
+
+
+def instrumented(endpoint: str):
+    """Décorateur de méthode du client : chaque appel est mesuré dans self.metrics"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.call(endpoint):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_trace() -> Optional[CallTrace]:
+    """Appel mesuré en cours dans ce contexte (None hors Metrics.call)"""
+    return _current_trace.get()
+
+
+def mark_cache(outcome: str):
+    """Indique comment l'appel en cours a utilisé le cache (hit, miss, refresh)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.cache = outcome
+
+
+@contextmanager
+def phase(name: str):
+    """Attribue la durée du bloc à une phase de l'appel en cours (sans effet hors appel)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.enter(name)
+    try:
+        yield
+    finally:
+        trace.exit()
+
+
+def iter_download(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Relaie les blocs d'une réponse en comptant les octets et le temps de lecture
+    (phase download, déduite de la phase parse qui consomme le flux)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield from chunks
+        return
+    iterator = iter(chunks)
+    while True:
+        trace.enter('download')
+        try:
+            chunk = next(iterator, None)
+        finally:
+            trace.exit()
+        if chunk is None:
+            return
+        trace.bytes += len(chunk)
+        yield chunk
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Registre unique du processus (créé au premier appel)"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
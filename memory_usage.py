@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+import types
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+# Une session sans exécution depuis ce délai (secondes) sort du rapport
+SESSION_IDLE_TIMEOUT = 3600
+
+# Objets dont seule l'enveloppe est comptée (code, classes, modules)
+_OPAQUE_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                 types.MethodType)
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Estimation (octets) de la mémoire occupée par une valeur et ce qu'elle référence
+
+    Les DataFrame et tableaux numpy sont mesurés par leurs tampons (chaînes des
+    colonnes objet comprises), les conteneurs et objets en parcourant leur
+    contenu ; un objet référencé plusieurs fois n'est compté qu'une fois.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        # Les données d'une vue sont comptées une fois, avec le tableau qui les possède
+        size = sys.getsizeof(value)
+        if value.base is not None:
+            size += estimate_size(value.base, _seen)
+        if value.dtype == object:
+            size += sum(estimate_size(item, _seen) for item in value.ravel())
+        return size
+    if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))) \
+            or isinstance(value, _OPAQUE_TYPES):
+        return sys.getsizeof(value)
+
+    size = sys.getsizeof(value)
+    if isinstance(value, Mapping):
+        size += sum(estimate_size(key, _seen) + estimate_size(item, _seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _seen)
+    return size
+
+
+def session_footprint(state: Mapping, shared_ids: Iterable[int] = ()) -> List[Dict]:
+    """
+    Mémoire propre de chaque clé d'un état de session
+
+    Les valeurs partagées (objets dont l'id figure dans shared_ids : entrées du
+    cache partagé, client API) ne sont pas comptées dans la session, ni ce
+    qu'elles référencent.
+
+    Returns:
+        list: [{'key', 'bytes', 'shared'}] du plus gros au plus petit
+    """
+    shared_ids = set(shared_ids)
+    entries = []
+    for key, value in state.items():
+        if id(value) in shared_ids:
+            entries.append({'key': str(key), 'bytes': 0, 'shared': True})
+            continue
+        # Les objets partagés éventuellement référencés sont marqués déjà vus
+        entries.append({'key': str(key), 'bytes': estimate_size(value, set(shared_ids)), 'shared': False})
+    return sorted(entries, key=lambda entry: entry['bytes'], reverse=True)
+
+
+class SessionMemoryRegistry:
+    """
+    Derniers relevés de mémoire de chaque session du processus
+
+    Chaque exécution de page enregistre l'empreinte de sa session ; les sessions
+    inactives depuis SESSION_IDLE_TIMEOUT secondes sont oubliées.
+    """
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, footprint: List[Dict]):
+        """Enregistre l'empreinte d'une session (voir session_footprint)"""
+        with self._lock:
+            self._sessions[session_id] = {
+                'bytes': sum(entry['bytes'] for entry in footprint),
+                'keys': footprint,
+                'updated_at': time.time()
+            }
+            self._expire_locked()
+
+    def _expire_locked(self):
+        expired = time.time() - self.idle_timeout
+        for session_id in [sid for sid, report in self._sessions.items() if report['updated_at'] < expired]:
+            del self._sessions[session_id]
+
+    def report(self) -> Dict:
+        """
+        Sessions actives et mémoire propre de chacune
+
+        Returns:
+            dict: {'sessions': [{'session_id', 'bytes', 'keys', 'updated_at'}] (plus grosse
+                   d'abord), 'total_bytes': somme des sessions}
+        """
+        with self._lock:
+            self._expire_locked()
+            sessions = [{'session_id': session_id, **report} for session_id, report in self._sessions.items()]
+        sessions.sort(key=lambda session: session['bytes'], reverse=True)
+        return {'sessions': sessions, 'total_bytes': sum(session['bytes'] for session in sessions)}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionMemoryRegistry:
+    """Registre unique du processus (créé au premier appel)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SessionMemoryRegistry()
+        return _registry
@@ -0,0 +1,198 @@
+import math
+from array import array
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Nombre de mois couverts par chaque sous-période (2020-Q1, 2020-T1, 2020-S1, 2020-B1)
+SUBPERIOD_MONTHS = {'Q': 3, 'T': 3, 'S': 6, 'B': 2}
+
+
+def to_float(value) -> float:
+    """Valeur d'observation en float, NaN si elle est absente, vide ou non numérique"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def period_key(period: Optional[str]) -> Tuple[int, int, int]:
+    """
+    Convertit une période SDMX (2020, 2020-S2, 2020-Q1, 2020-B3, 2020-W01, 2020-01,
+    2020-01-15) en clé (année, mois de début, jour) comparable quelle que soit la
+    fréquence ; (0, 0, 0) si la période est absente ou illisible
+    """
+    if not period:
+        return (0, 0, 0)
+    try:
+        parts = period.split('-')
+        year = int(parts[0])
+        if len(parts) == 1:
+            return (year, 1, 1)
+        sub = parts[1].upper()
+        if sub[0] in SUBPERIOD_MONTHS:
+            return (year, SUBPERIOD_MONTHS[sub[0]] * (int(sub[1:]) - 1) + 1, 1)
+        if sub[0] == 'W':
+            # Semaine ISO : lundi de la semaine, parfois en fin d'année précédente
+            monday = date.fromisocalendar(year, int(sub[1:]), 1)
+            return (monday.year, monday.month, monday.day)
+        day = int(parts[2]) if len(parts) > 2 else 1
+        return (year, int(sub), day)
+    except (ValueError, IndexError):
+        return (0, 0, 0)
+
+
+def period_sort_value(period: Optional[str]) -> int:
+    """Clé entière AAAAMMJJ utilisée pour les filtres de période en SQL"""
+    year, month, day = period_key(period)
+    return year * 10000 + month * 100 + day
+
+
+def period_end_sort_value(period: str) -> int:
+    """Borne supérieure AAAAMMJJ incluant toutes les dates de la période"""
+    parts = period.split('-')
+    if len(parts) == 1:
+        return int(parts[0]) * 10000 + 1299
+    if len(parts) > 2:
+        return period_sort_value(period)
+    year, month, day = period_key(period)
+    if parts[1][:1].upper() == 'W' and year:
+        sunday = date(year, month, day) + timedelta(days=6)
+        return sunday.year * 10000 + sunday.month * 100 + sunday.day
+    span = SUBPERIOD_MONTHS.get(parts[1][:1].upper(), 1)
+    return year * 10000 + (month + span - 1) * 100 + 99
+
+
+def periods_to_datetime(periods: List[str]) -> np.ndarray:
+    """
+    Convertit des TIME_PERIOD SDMX en datetime64[ns] (début de période)
+
+    Le format est déduit de la première période : la conversion est vectorisée
+    pour les fréquences annuelle, mensuelle, journalière et infra-annuelles. Les
+    autres (hebdomadaire, formats mélangés) sont converties période par période,
+    NaT pour une période absente ou illisible.
+    """
+    if not periods:
+        return np.array([], dtype='datetime64[ns]')
+
+    codes = np.asarray(periods, dtype='U10')
+    sample = periods[0]
+    try:
+        if len(sample) == 4:
+            dates = codes.astype('datetime64[Y]')
+        elif len(sample) == 10:
+            dates = codes.astype('datetime64[D]')
+        elif sample[5].upper() in SUBPERIOD_MONTHS:
+            years = codes.astype('U4').astype(np.int64)
+            index = np.char.lstrip(np.char.upper(np.char.partition(codes, '-')[:, 2]), 'QTSB')
+            months = (years - 1970) * 12 + (index.astype(np.int64) - 1) * SUBPERIOD_MONTHS[sample[5].upper()]
+            dates = months.astype('datetime64[M]')
+        else:
+            dates = codes.astype('datetime64[M]')
+    except (ValueError, IndexError, TypeError):
+        # Formats mélangés : conversion période par période
+        keys = [period_key(period) for period in periods]
+        dates = np.array(['%04d-%02d-%02d' % key if key[0] else 'NaT' for key in keys],
+                         dtype='datetime64[D]')
+    return dates.astype('datetime64[ns]')
+
+
+class ObservationColumns:
+    """
+    Accumulateur colonnaire des observations d'une série
+
+    Les valeurs sont stockées directement dans un tableau de float64 pendant
+    le parsing (NaN si OBS_VALUE est absente ou non numérique), sans
+    dictionnaire intermédiaire par observation.
+    """
+    def __init__(self):
+        self.periods = []
+        self.values = array('d')
+        self.statuses = []
+        self.qualities = []
+
+    @classmethod
+    def from_arrays(cls, periods, values, statuses, qualities) -> 'ObservationColumns':
+        """
+        Construit l'accumulateur à partir de colonnes déjà décodées
+        (décodeurs vectorisés), values étant converti en float64
+        """
+        columns = cls()
+        columns.periods = list(periods)
+        columns.values = array('d', np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        columns.statuses = list(statuses)
+        columns.qualities = list(qualities)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def append(self, period: str, value, status: Optional[str], quality: Optional[str]):
+        """Ajoute une observation (value peut être un texte, un nombre ou None)"""
+        self.periods.append(period)
+        self.values.append(to_float(value))
+        self.statuses.append(status)
+        self.qualities.append(quality)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Construit le DataFrame (date, valeur, statut, qualite) trié par date
+
+        La colonne valeur partage la mémoire du tableau rempli au parsing : ne
+        plus appeler append ensuite. Les colonnes date et valeur sont en lecture
+        seule, le DataFrame pouvant être partagé entre sessions.
+        """
+        dates = periods_to_datetime(self.periods)
+        values = np.frombuffer(self.values, dtype=np.float64) if len(self.values) \
+            else np.array([], dtype=np.float64)
+        statuses = pd.Categorical(self.statuses)
+        qualities = pd.Categorical(self.qualities)
+
+        # L'API renvoie en général les périodes de la plus récente à la plus ancienne :
+        # une vue inversée suffit alors, sans copie
+        order = None
+        if len(dates) > 1:
+            steps = np.diff(dates)
+            if (steps < np.timedelta64(0)).all():
+                order = slice(None, None, -1)
+            elif not (steps >= np.timedelta64(0)).all():
+                order = np.argsort(dates, kind='stable')
+        if order is not None:
+            dates, values = dates[order], values[order]
+            statuses, qualities = statuses[order], qualities[order]
+        dates.flags.writeable = False
+        values.flags.writeable = False
+
+        return pd.DataFrame({
+            'date': dates,
+            'valeur': values,
+            'statut': statuses,
+            'qualite': qualities
+        }, copy=False)
+
+
+def frame_from_observations(observations: List[Dict]) -> pd.DataFrame:
+    """
+    DataFrame typé (voir ObservationColumns.to_frame) à partir d'observations
+    au format {'date', 'valeur', 'statut', 'qualite'}
+    """
+    columns = ObservationColumns()
+    for obs in observations:
+        columns.append(obs['date'], obs['valeur'], obs.get('statut'), obs.get('qualite'))
+    return columns.to_frame()
+
+
+def slice_frame(frame: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """
+    Restreint un DataFrame trié par date à [start, end] par recherche
+    dichotomique (sélection de lignes contiguës, sans filtre booléen)
+
+    Args:
+        start, end: Bornes incluses (texte 'AAAA-MM', datetime...), None pour ne pas borner
+    """
+    dates = frame['date'].to_numpy()
+    lower = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).to_datetime64(), 'left')
+    upper = len(dates) if end is None else np.searchsorted(dates, pd.Timestamp(end).to_datetime64(), 'right')
+    return frame.iloc[lower:upper]
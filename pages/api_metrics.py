@@ -0,0 +1,219 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from config import init_session_state, check_global_authentication, show_logout_button, get_warmup_scheduler
+from instrumentation import get_metrics, PHASES
+from rate_limiter import get_default_rate_limiter
+from circuit_breaker import get_default_circuit_breaker, CLOSED, OPEN, HALF_OPEN
+from shared_cache import get_shared_cache
+from memory_usage import get_session_registry
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Libellés des phases d'un appel
+PHASE_LABELS = {
+    'wait': "Attente (quota)",
+    'connect': "Connexion",
+    'download': "Téléchargement",
+    'parse': "Parsing",
+    'frame': "Construction",
+    'cache': "Cache SQLite",
+    'index': "Index de recherche"
+}
+
+# Libellés des états du disjoncteur
+BREAKER_LABELS = {
+    CLOSED: "Fermé (API disponible)",
+    OPEN: "Ouvert (requêtes suspendues)",
+    HALF_OPEN: "Semi-ouvert (essai en cours)"
+}
+
+# Configuration de la page
+st.set_page_config(
+    page_title="Métriques API INSEE",
+    page_icon="📈",
+    layout="wide"
+)
+
+# Initialisation de la session state globale
+init_session_state()
+
+# Vérifier l'authentification globale
+check_global_authentication()
+
+st.title("📈 Métriques des appels API")
+
+# Bouton de déconnexion dans la sidebar
+show_logout_button()
+
+metrics = get_metrics()
+summary = metrics.summary()
+
+st.caption(
+    f"Mesures communes à toutes les sessions depuis le "
+    f"{datetime.fromtimestamp(metrics.started_at):%d/%m/%Y %H:%M:%S}"
+)
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.download_button(
+        "📥 Exporter en JSON",
+        data=metrics.export_json(),
+        file_name=f"metriques_insee_{datetime.now():%Y%m%d_%H%M%S}.json",
+        mime="application/json"
+    )
+with col2:
+    if st.button("🔄 Actualiser"):
+        st.rerun()
+with col3:
+    if st.button("🗑️ Remettre à zéro"):
+        metrics.reset()
+        st.rerun()
+
+if not summary:
+    st.info("Aucun appel API mesuré pour le moment")
+    st.stop()
+
+# Synthèse par point d'accès
+st.subheader("⏱️ Latences par point d'accès")
+st.dataframe(
+    pd.DataFrame([
+        {
+            'Point d\'accès': endpoint,
+            'Appels': stats['total']['count'],
+            'Erreurs': stats['errors'],
+            'p50 (ms)': stats['total']['p50_ms'],
+            'p95 (ms)': stats['total']['p95_ms'],
+            'p99 (ms)': stats['total']['p99_ms'],
+            'Max (ms)': stats['total']['max_ms'],
+            'Octets reçus': stats['bytes'],
+            'Cache (hit/miss)': f"{stats['cache'].get('hit', 0)}/{stats['cache'].get('miss', 0)}",
+            'Statuts': ', '.join(f"{status}: {count}" for status, count in sorted(stats['statuses'].items()))
+        }
+        for endpoint, stats in summary.items() if stats['total']['count']
+    ]),
+    hide_index=True
+)
+
+# Détail des phases d'un point d'accès
+endpoints = [endpoint for endpoint, stats in summary.items() if stats['phases']]
+if endpoints:
+    st.subheader("🔬 Décomposition par phase")
+    endpoint = st.selectbox("Point d'accès", options=endpoints)
+    phases = summary[endpoint]['phases']
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Phase': PHASE_LABELS.get(name, name),
+                'Mesures': stats['count'],
+                'Moyenne (ms)': stats['mean_ms'],
+                'p50 (ms)': stats['p50_ms'],
+                'p95 (ms)': stats['p95_ms'],
+                'p99 (ms)': stats['p99_ms']
+            }
+            for name, stats in phases.items()
+        ]),
+        hide_index=True
+    )
+
+# Limiteur de débit et cache partagé
+st.subheader("🚦 Quota et caches")
+limiter_stats = get_default_rate_limiter().stats()
+shared_stats = get_shared_cache().stats()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Débit autorisé", f"{limiter_stats['rate_per_minute']:.0f} req/min")
+col2.metric("429 reçus", limiter_stats['throttled'])
+col3.metric("Requêtes en attente", limiter_stats['waiting'])
+col4.metric("Cache partagé", f"{shared_stats['hits']} hit(s)",
+            f"{shared_stats['coalesced']} regroupé(s)", delta_color="off")
+
+# Disjoncteur : requêtes suspendues après des échecs répétés de l'API
+breaker_stats = get_default_circuit_breaker().stats()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Disjoncteur", BREAKER_LABELS[breaker_stats['state']])
+col2.metric("Échecs consécutifs", breaker_stats['failures'])
+col3.metric("Ouvertures", breaker_stats['opened'],
+            f"{breaker_stats['rejected']} requête(s) refusée(s)", delta_color="off")
+col4.metric("Prochain essai", f"{breaker_stats['retry_in']:.0f} s" if breaker_stats['retry_in'] else "-")
+
+# Mémoire : données partagées (budget du cache) et mémoire propre de chaque session
+st.subheader("🧮 Mémoire")
+memory_report = get_session_registry().report()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Données partagées", f"{shared_stats['bytes'] / 2 ** 20:.1f} Mo",
+            f"budget {shared_stats['max_bytes'] / 2 ** 20:.0f} Mo" if shared_stats['max_bytes'] else None,
+            delta_color="off")
+col2.metric("Entrées partagées", shared_stats['entries'],
+            f"{shared_stats['evictions']} éviction(s)", delta_color="off")
+col3.metric("Sessions actives", len(memory_report['sessions']))
+col4.metric("Mémoire des sessions", f"{memory_report['total_bytes'] / 2 ** 10:.0f} Ko")
+if memory_report['sessions']:
+    ctx = get_script_run_ctx()
+    current_session = ctx.session_id if ctx is not None else None
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Session': session['session_id'][:8] + (" (vous)" if session['session_id'] == current_session else ""),
+                'Mémoire propre (Ko)': round(session['bytes'] / 2 ** 10, 1),
+                'Plus grosse clé': session['keys'][0]['key'] if session['keys'] else None,
+                'Dernière exécution': datetime.fromtimestamp(session['updated_at']).strftime('%H:%M:%S')
+            }
+            for session in memory_report['sessions']
+        ]),
+        hide_index=True
+    )
+    current = next((session for session in memory_report['sessions']
+                    if session['session_id'] == current_session), None)
+    if current is not None:
+        with st.expander("Détail de cette session", expanded=False):
+            st.dataframe(
+                pd.DataFrame([
+                    {
+                        'Clé': entry['key'],
+                        'Octets': entry['bytes'],
+                        'Partagée': "oui" if entry['shared'] else ""
+                    }
+                    for entry in current['keys']
+                ]),
+                hide_index=True
+            )
+
+# Préchargement en tâche de fond
+scheduler_status = get_warmup_scheduler().status()
+st.subheader("🔄 Préchargement")
+st.caption("Actif" if scheduler_status['running'] else "Arrêté")
+if scheduler_status['jobs']:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Tâche': "Catalogue des dataflows" if job['job'] == 'dataflows' else f"Série {job['idbank']}",
+                'Dernière exécution': datetime.fromtimestamp(job['last_run']).strftime('%H:%M:%S')
+                if job.get('last_run') else None,
+                'Prochaine exécution': datetime.fromtimestamp(job['next_run']).strftime('%d/%m %H:%M')
+                if job.get('next_run') else None,
+                'Erreur': job.get('error')
+            }
+            for job in scheduler_status['jobs']
+        ]),
+        hide_index=True
+    )
+
+# Derniers appels (tampon circulaire)
+st.subheader("🕒 Derniers appels")
+recent_calls = metrics.recent(100)
+st.dataframe(
+    pd.DataFrame([
+        {
+            'Heure': datetime.fromtimestamp(call['time']).strftime('%H:%M:%S'),
+            'Point d\'accès': call['endpoint'],
+            'Statut': call['status'],
+            'Durée (ms)': call['duration_ms'],
+            **{PHASE_LABELS[name]: call['phases_ms'].get(name) for name in PHASES},
+            'Octets': call['bytes'],
+            'Tentatives': call['attempts'],
+            'Cache': call['cache'],
+            'Erreur': call['error']
+        }
+        for call in recent_calls
+    ]),
+    hide_index=True
+)
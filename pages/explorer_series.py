@@ -1,11 +1,10 @@
 import streamlit as st
-from insee_bdm_api import InseeBdmAPI
+from search_index import DataflowIndex, DataflowSeriesTable
 import pandas as pd
-import requests
-import xml.etree.ElementTree as ET
-import re
 import warnings
-from config import init_session_state, check_global_authentication, show_logout_button
+from config import init_session_state, check_global_authentication, show_logout_button, get_shared_api, get_warmup_scheduler
+from shared_cache import get_shared_cache, DATAFLOWS_TTL, DATAFLOW_SERIES_TTL
+from instrumentation import get_metrics
 
 # Supprimer les warnings de dépréciation
 warnings.filterwarnings('ignore', category=FutureWarning)
@@ -24,134 +23,105 @@ init_session_state()
 # Vérifier l'authentification globale
 check_global_authentication()
 
-# Initialisation de l'API si nécessaire
+# Initialisation de l'API si nécessaire (client partagé par toutes les sessions)
 if st.session_state.api is None:
     try:
-        # Récupération des clés d'API depuis les secrets Streamlit
-        consumer_key = st.secrets.api_insee.consumer_key
-        consumer_secret = st.secrets.api_insee.consumer_secret
-        st.session_state.api = InseeBdmAPI(consumer_key, consumer_secret)
+        st.session_state.api = get_shared_api()
     except Exception as e:
         st.error(f"Erreur lors de l'initialisation de l'API : {str(e)}")
         st.stop()
 
+# Préchargement en tâche de fond (démarré une seule fois par processus)
+scheduler = get_warmup_scheduler()
+
 # Titre de la page
 st.title("🔍 Explorateur des séries INSEE")
 
 # Bouton de déconnexion dans la sidebar
 show_logout_button()
 
-# Zone de debug pour les appels API
-with st.expander("🔍 Détails des appels API", expanded=True):
-    for call in st.session_state.api_calls:
-        st.code(call)
-
-def normalize_search_term(term: str) -> str:
-    """Normalise le terme de recherche"""
-    if not term:
-        return ""
-    term = term.lower()
-    term = term.replace('é', 'e').replace('è', 'e').replace('ê', 'e')
-    term = term.replace('à', 'a').replace('â', 'a')
-    term = term.replace('ô', 'o')
-    term = term.replace('û', 'u').replace('ù', 'u')
-    term = term.replace('î', 'i')
-    term = re.sub(r'[^a-z0-9\s]', '', term)
-    return term
+# Derniers appels API du processus (le détail complet est sur la page Métriques API)
+with st.expander("🔍 Derniers appels API", expanded=False):
+    recent_calls = get_metrics().recent(10)
+    if recent_calls:
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    'Point d\'accès': call['endpoint'],
+                    'Statut': call['status'],
+                    'Durée (ms)': round(call['duration_ms']),
+                    'Octets': call['bytes'],
+                    'Erreur': call['error']
+                }
+                for call in recent_calls
+            ]),
+            hide_index=True
+        )
+    else:
+        st.caption("Aucun appel depuis le démarrage")
 
 def get_all_dataflows() -> list:
     """Récupère tous les dataflows disponibles"""
-    try:
-        url = "https://api.insee.fr/series/BDM/V1/dataflow"
-        st.session_state.api_calls.append(f"GET {url}")
-        
-        response = requests.get(url, headers=st.session_state.api.get_headers())
-        st.session_state.api_calls.append(f"Response: {response.status_code}")
-        
-        if response.status_code != 200:
-            st.session_state.api_calls.append(f"Error: {response.text}")
-            return []
-            
-        root = ET.fromstring(response.text)
-        dataflows = []
-        
-        ns = {
-            'structure': 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure',
-            'common': 'http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common'
-        }
-        
-        for dataflow in root.findall('.//structure:Dataflow', ns):
-            dataflow_id = dataflow.get('id')
-            name = dataflow.find('.//common:Name', ns)
-            description = dataflow.find('.//common:Description', ns)
-            
-            if name is not None:
-                dataflows.append({
-                    'id': dataflow_id,
-                    'name': name.text,
-                    'description': description.text if description is not None else ''
-                })
-        
-        return dataflows
-    except Exception as e:
-        st.session_state.api_calls.append(f"Exception: {str(e)}")
+    dataflows = st.session_state.api.get_dataflows()
+    if isinstance(dataflows, dict):
         return []
+    return dataflows
 
-def search_dataflows(search_term: str, dataflows: list) -> list:
-    """Recherche dans les dataflows localement"""
-    search_term = normalize_search_term(search_term)
-    matching_dataflows = []
-    
-    for dataflow in dataflows:
-        if (search_term in normalize_search_term(dataflow['id']) or
-            search_term in normalize_search_term(dataflow['name']) or
-            search_term in normalize_search_term(dataflow['description'])):
-            matching_dataflows.append(dataflow)
-    
-    return matching_dataflows
+def search_dataflows(search_term: str, index: DataflowIndex) -> list:
+    """Recherche dans les dataflows localement, via l'index construit au chargement"""
+    return index.search(search_term)
 
 def get_series_from_dataflow(dataflow_id: str) -> list:
-    """Récupère les séries d'un dataflow"""
-    try:
-        url = f"https://api.insee.fr/series/BDM/V1/data/{dataflow_id}/all"
-        
-        # Log de l'appel API
-        st.session_state.api_calls.append(f"GET {url}")
-        
-        response = requests.get(url, headers=st.session_state.api.get_headers())
-        st.session_state.api_calls.append(f"Response: {response.status_code}")
-        
-        if response.status_code != 200:
-            st.session_state.api_calls.append(f"Error: {response.text}")
-            return []
-            
-        root = ET.fromstring(response.text)
-        series_list = []
-        
-        for series in root.findall('.//Series'):
-            series_list.append({
-                'IdBank': series.get('IDBANK'),
-                'Titre': series.get('TITLE_FR'),
-                'Unité': series.get('UNIT_MEASURE'),
-                'Fréquence': series.get('FREQ'),
-                'Dernière mise à jour': series.get('LAST_UPDATE')
-            })
-        
-        return series_list
-    except Exception as e:
-        st.session_state.api_calls.append(f"Exception: {str(e)}")
+    """Récupère les séries d'un dataflow (résumés, voir dataflow_series_summary)"""
+    series = st.session_state.api.get_dataflow_series(dataflow_id)
+    if isinstance(series, dict):
         return []
+    return series
+
+def load_series_table(dataflow_id: str) -> DataflowSeriesTable:
+    """
+    Construit le tableau des séries d'un dataflow et ses index de filtres,
+    par dimension de la structure si elle est disponible
+    """
+    series = get_series_from_dataflow(dataflow_id)
+    structure = st.session_state.api.get_datastructure(dataflow_id) if series else None
+    if structure is not None and "error" in structure:
+        structure = None
+    return DataflowSeriesTable(series, structure)
+
+def get_dataflow_index() -> DataflowIndex:
+    """
+    Catalogue et index des dataflows (champs normalisés), construits une fois pour
+    tout le processus ; la session n'en garde pas de copie et le relit à chaque exécution
+    """
+    return get_shared_cache().get_or_load(
+        ('dataflows',),
+        lambda: DataflowIndex(get_all_dataflows()),
+        ttl=DATAFLOWS_TTL,
+        cache_if=lambda index: len(index) > 0
+    )
+
+def get_series_table(table_key: tuple) -> DataflowSeriesTable:
+    """
+    Tableau des séries d'un dataflow partagé par toutes les sessions, sous la clé
+    ('dataflow_series', dataflow_id) gardée en session ; rechargé s'il a été évincé
+    """
+    return get_shared_cache().get_or_load(
+        table_key,
+        lambda: load_series_table(table_key[1]),
+        ttl=DATAFLOW_SERIES_TTL,
+        cache_if=lambda table: len(table) > 0
+    )
 
 # Interface de recherche
 st.subheader("🔍 Étape 1 : Rechercher un thème")
 
-# Chargement initial des dataflows si nécessaire
-if st.session_state.all_dataflows is None:
-    with st.spinner("Chargement des thèmes disponibles..."):
-        st.session_state.all_dataflows = get_all_dataflows()
-        if not st.session_state.all_dataflows:
-            st.error("❌ Erreur lors du chargement des thèmes")
-            st.stop()
+# Catalogue des dataflows (chargé au premier affichage, puis lu dans le cache partagé)
+with st.spinner("Chargement des thèmes disponibles..."):
+    dataflow_index = get_dataflow_index()
+    if not len(dataflow_index):
+        st.error("❌ Erreur lors du chargement des thèmes")
+        st.stop()
 
 # Recherche par texte
 search_term = st.text_input("Entrez un terme de recherche (ex: construction, population)")
@@ -162,7 +132,7 @@ search_clicked = st.button("🔎 Lancer la recherche")
 # Lancement de la recherche
 if search_clicked or search_term:
     if search_term:
-        matching_dataflows = search_dataflows(search_term, st.session_state.all_dataflows)
+        matching_dataflows = search_dataflows(search_term, dataflow_index)
         
         if matching_dataflows:
             st.success(f"✅ {len(matching_dataflows)} thèmes trouvés")
@@ -211,32 +181,81 @@ else:
 if st.session_state.selected_dataflow:
     st.subheader(f"📊 Séries du thème : {st.session_state.selected_dataflow}")
     
-    if st.session_state.search_results is None:
+    # La session ne garde que la clé du tableau (en colonnes, avec ses index de
+    # filtres), construit une fois pour tout le processus
+    table_key = ('dataflow_series', st.session_state.selected_dataflow)
+    if st.session_state.search_results != table_key:
         with st.spinner("Chargement des séries..."):
-            series_list = get_series_from_dataflow(st.session_state.selected_dataflow)
-            if series_list:
-                st.session_state.search_results = pd.DataFrame(series_list)
-                st.success(f"✅ {len(series_list)} séries trouvées")
+            series_table = get_series_table(table_key)
+            if len(series_table):
+                st.session_state.search_results = table_key
+                st.session_state.series_filter = None
+                st.success(f"✅ {len(series_table)} séries trouvées")
             else:
                 st.warning("Aucune série trouvée dans ce thème")
     
     if st.session_state.search_results is not None:
-        # Filtres
-        col1, col2 = st.columns(2)
+        with st.spinner("Chargement des séries..."):
+            series_table = get_series_table(st.session_state.search_results)
+        
+        # Filtres combinables sur chaque dimension du thème (et l'unité), appliqués
+        # localement sur les index du tableau : aucun appel à l'API
+        facet_fields = series_table.facet_fields()
+        widget_keys = {field: f"facet_{st.session_state.selected_dataflow}_{field}" for field in facet_fields}
+        title_filter = st.text_input("🔤 Filtrer par titre ou IdBank")
+        selections = {field: st.session_state.get(key, []) for field, key in widget_keys.items()}
+        
+        # Positions filtrées et décomptes recalculés sur les index partagés (quelques
+        # millisecondes) : la session ne garde que les filtres, pour revenir en
+        # première page quand ils changent
+        filter_key = (st.session_state.selected_dataflow,
+                      tuple((field, tuple(values)) for field, values in selections.items()), title_filter)
+        if st.session_state.series_filter != filter_key:
+            st.session_state.series_filter = filter_key
+            st.session_state.series_page = 1
+        positions, facet_counts = series_table.drilldown(selections, title_filter)
+        
+        # Décompte de chaque valeur sous les autres filtres (0 : plus aucune série)
+        with st.expander("🧭 Filtrer par dimension", expanded=True):
+            columns = st.columns(3)
+            for i, (field, label) in enumerate(facet_fields.items()):
+                counts = facet_counts[field]
+                with columns[i % 3]:
+                    st.multiselect(
+                        label,
+                        options=series_table.facet_values[field],
+                        format_func=lambda value, field=field, counts=counts:
+                            f"{series_table.facet_label(field, value) or '(vide)'} ({counts.get(value, 0)})",
+                        key=widget_keys[field]
+                    )
+        
+        # Pagination côté serveur
+        col1, col2 = st.columns([1, 3])
         with col1:
-            freq_filter = st.multiselect(
-                "📅 Filtrer par fréquence",
-                options=sorted(st.session_state.search_results['Fréquence'].unique())
+            page_size = st.selectbox("Séries par page", options=[25, 50, 100, 200], index=1)
+        page_count = max(1, -(-len(positions) // page_size))
+        # Une page plus grande réduit le nombre de pages : la page courante y est ramenée
+        st.session_state.series_page = min(st.session_state.get('series_page', 1), page_count)
+        with col2:
+            page = st.number_input(
+                f"Page (sur {page_count})",
+                min_value=1,
+                max_value=page_count,
+                key="series_page"
             )
         
-        # Application des filtres
-        filtered_df = st.session_state.search_results.copy()
-        if freq_filter:
-            filtered_df = filtered_df[filtered_df['Fréquence'].isin(freq_filter)]
+        first = (page - 1) * page_size
+        if len(positions):
+            st.caption(
+                f"Séries {first + 1} à {min(first + page_size, len(positions))} "
+                f"sur {len(positions)} (thème : {len(series_table)} séries)"
+            )
+        else:
+            st.caption("Aucune série ne correspond aux filtres")
         
-        # Affichage du tableau
+        # Affichage de la seule page visible
         st.dataframe(
-            filtered_df,
+            series_table.page(positions, page, page_size),
             hide_index=True,
             column_config={
                 "IdBank": st.column_config.TextColumn("IdBank", width="medium"),
@@ -0,0 +1,163 @@
+import contextvars
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Classes de priorité : les requêtes interactives passent avant les tâches de fond
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Quota INSEE : 30 requêtes par minute. Sur une fenêtre glissante d'une minute, le
+# seau autorise au plus burst + rate_per_minute requêtes, d'où ces valeurs par défaut.
+DEFAULT_RATE_PER_MINUTE = 25
+DEFAULT_BURST = 5
+
+# Reprises après un 429/503 ou une erreur réseau
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+_current_priority = contextvars.ContextVar('insee_request_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """
+    Fixe la priorité des requêtes émises dans le bloc (et les threads lancés
+    avec contextvars.copy_context)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    """Priorité courante des requêtes (INTERACTIVE par défaut)"""
+    return _current_priority.get()
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Délai avant une nouvelle tentative : Retry-After s'il est fourni,
+    sinon backoff exponentiel avec jitter complet
+    """
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucketRateLimiter:
+    """
+    Limiteur de débit à seau de jetons, partagé par tous les appels à l'API
+
+    Les demandeurs attendent dans une file de priorité : un jeton disponible est
+    toujours attribué à la requête la plus prioritaire, puis la plus ancienne.
+    Le débit s'adapte : il est divisé par deux à chaque 429 et remonte
+    progressivement vers le débit nominal tant que les réponses sont acceptées.
+    """
+    def __init__(self, rate_per_minute: float = DEFAULT_RATE_PER_MINUTE,
+                 burst: int = DEFAULT_BURST):
+        self.nominal_rate = rate_per_minute / 60.0
+        self.rate = self.nominal_rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {'acquired': 0, 'throttled': 0, 'waited': 0.0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, priority: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Attend un jeton ; retourne False si timeout est dépassé
+
+        Args:
+            priority (int): INTERACTIVE ou BACKGROUND (priorité courante si None)
+        """
+        if priority is None:
+            priority = current_priority()
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        ticket = (priority, next(self._counter))
+
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    is_next = self._waiters[0] == ticket
+                    if is_next and self._tokens >= 1 and now >= self._blocked_until:
+                        self._tokens -= 1
+                        self._stats['acquired'] += 1
+                        self._stats['waited'] += now - started
+                        return True
+
+                    if is_next:
+                        wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate, 0.001)
+                    else:
+                        wait = None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def on_throttled(self, delay: float):
+        """Un 429 a été reçu : pause globale de delay secondes et débit réduit de moitié"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self.rate = max(self.nominal_rate / 8, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            self._stats['throttled'] += 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        """Réponse acceptée : le débit remonte progressivement vers le nominal"""
+        if self.rate < self.nominal_rate:
+            with self._cond:
+                self.rate = min(self.nominal_rate, self.rate + self.nominal_rate / 20)
+
+    def stats(self) -> dict:
+        """Compteurs, débit courant (requêtes/minute) et nombre de requêtes en attente"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['rate_per_minute'] = self.rate * 60
+            stats['waiting'] = len(self._waiters)
+        return stats
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_rate_limiter() -> TokenBucketRateLimiter:
+    """Limiteur unique du processus, partagé par tous les clients"""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = TokenBucketRateLimiter()
+        return _default_limiter
@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from rate_limiter import BACKGROUND, request_priority
+from search_index import DataflowIndex
+from shared_cache import SharedCache, get_shared_cache, DATAFLOWS_TTL, SERIES_TTL
+
+logger = logging.getLogger(__name__)
+
+# Nombre de jours entre deux publications selon la fréquence (code FREQ)
+PUBLICATION_DAYS = {'A': 365, 'S': 182, 'T': 91, 'Q': 91, 'B': 61, 'M': 30, 'D': 1}
+
+# Une publication est attendue quand LAST_UPDATE date de plus de cette fraction de période
+PUBLICATION_DUE_FRACTION = 0.8
+
+# Intervalles de rafraîchissement (secondes)
+DUE_REFRESH_INTERVAL = 3600
+MAX_REFRESH_INTERVAL = 6 * 3600
+DATAFLOWS_REFRESH_INTERVAL = DATAFLOWS_TTL * 0.8
+RETRY_INTERVAL = 15 * 60
+
+# Fréquence de relecture de saved_series.json (nouvelles séries sauvegardées)
+SERIES_FILE_POLL = 60
+
+
+def refresh_interval(frequency: Optional[str], last_update: Optional[str],
+                     max_interval: float = MAX_REFRESH_INTERVAL) -> float:
+    """
+    Délai avant le prochain rafraîchissement d'une série
+
+    Si la prochaine publication est attendue (LAST_UPDATE plus ancien que
+    l'essentiel d'une période), la série est vérifiée toutes les heures ;
+    sinon elle n'est rafraîchie qu'à l'approche de la publication, sans
+    dépasser max_interval.
+    """
+    days = PUBLICATION_DAYS.get((frequency or 'M').upper(), 30)
+    try:
+        updated = datetime.fromisoformat(last_update[:10])
+    except (TypeError, ValueError):
+        return DUE_REFRESH_INTERVAL
+    age = (datetime.now() - updated).total_seconds()
+    until_due = days * PUBLICATION_DUE_FRACTION * 86400 - age
+    return min(max_interval, max(DUE_REFRESH_INTERVAL, until_due))
+
+
+class WarmupScheduler:
+    """
+    Préchargement en tâche de fond des séries sauvegardées et du catalogue des dataflows
+
+    Un thread unique charge tout au démarrage puis rafraîchit chaque élément
+    à son échéance (fréquence et LAST_UPDATE de la série), avec la priorité
+    BACKGROUND du limiteur de débit : les pages trouvent les données dans le
+    cache SQLite et le cache partagé sans attendre l'INSEE.
+    """
+    def __init__(self, api, series_path: str = "saved_series.json",
+                 default_series: Optional[Dict[str, str]] = None,
+                 shared_cache: Optional[SharedCache] = None):
+        """
+        Args:
+            api: Client InseeBdmAPI partagé
+            series_path (str): Fichier des séries sauvegardées
+            default_series (dict): Séries préchargées tant que le fichier n'existe pas
+        """
+        self.api = api
+        self.series_path = series_path
+        self.shared_cache = shared_cache or get_shared_cache()
+        self._queue = []
+        self._counter = itertools.count()
+        self.default_series = default_series or {}
+        self._saved = {}
+        self._series_mtime = None
+        self._status = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Démarre le thread (sans effet s'il tourne déjà)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="insee-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Arrête le thread après la tâche en cours"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _schedule(self, delay: float, job: str, idbank: Optional[str] = None):
+        due = time.time() + delay
+        heapq.heappush(self._queue, (due, next(self._counter), job, idbank))
+        with self._lock:
+            self._status.setdefault((job, idbank), {})['next_run'] = due
+
+    def _sync_saved_series(self):
+        """Relit saved_series.json s'il a changé et planifie les nouvelles séries"""
+        try:
+            mtime = os.path.getmtime(self.series_path)
+        except OSError:
+            mtime = None
+        if mtime == self._series_mtime and self._saved:
+            return
+        if mtime is None:
+            saved = self.default_series
+        else:
+            try:
+                with open(self.series_path, encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Séries sauvegardées illisibles : {str(e)}")
+                return
+        self._series_mtime = mtime
+        with self._lock:
+            scheduled = {idbank for job, idbank in self._status if job == 'series'}
+        new_idbanks = set(saved.values()) - scheduled
+        self._saved = saved
+        for idbank in sorted(new_idbanks):
+            self._schedule(0, 'series', idbank)
+
+    def _run(self):
+        # Toutes les requêtes du thread passent après les requêtes interactives
+        with request_priority(BACKGROUND):
+            self._schedule(0, 'dataflows')
+            next_poll = 0.0
+            while not self._stop.is_set():
+                now = time.time()
+                if now >= next_poll:
+                    self._sync_saved_series()
+                    next_poll = now + SERIES_FILE_POLL
+                if not self._queue or self._queue[0][0] > now:
+                    wake_at = min(self._queue[0][0] if self._queue else next_poll, next_poll)
+                    self._stop.wait(max(0.0, wake_at - now))
+                    continue
+
+                _, _, job, idbank = heapq.heappop(self._queue)
+                # Série retirée des séries sauvegardées : plus rafraîchie
+                if job == 'series' and idbank not in self._saved.values():
+                    with self._lock:
+                        self._status.pop((job, idbank), None)
+                    continue
+                self._run_job(job, idbank)
+
+    def _run_job(self, job: str, idbank: Optional[str]):
+        with self._lock:
+            status = self._status.setdefault((job, idbank), {})
+            first_run = 'last_run' not in status
+        try:
+            if job == 'dataflows':
+                delay = self._warm_dataflows()
+            else:
+                delay = self._warm_series(idbank, force_refresh=not first_run)
+            error = None
+        except Exception as e:
+            logger.warning(f"Préchargement {job} {idbank or ''} en échec : {str(e)}")
+            delay, error = RETRY_INTERVAL, str(e)
+        with self._lock:
+            status['last_run'] = time.time()
+            status['error'] = error
+        self._schedule(delay, job, idbank)
+
+    def _warm_dataflows(self) -> float:
+        """Recharge le catalogue et son index (même clé que la page explorateur)"""
+        dataflows = self.api.get_dataflows()
+        if isinstance(dataflows, dict):
+            raise RuntimeError(dataflows['error'])
+        self.shared_cache.set(('dataflows',), DataflowIndex(dataflows), ttl=DATAFLOWS_TTL)
+        return DATAFLOWS_REFRESH_INTERVAL
+
+    def _warm_series(self, idbank: str, force_refresh: bool) -> float:
+        """
+        Met à jour l'historique complet de la série dans le cache SQLite
+        (rafraîchissement incrémental) puis dans le cache partagé, sous la
+        clé utilisée par la page principale
+        """
+        result = self.api.get_series_by_idbank(idbank, as_frame=True, force_refresh=force_refresh)
+        if "error" in result:
+            raise RuntimeError(result['error'])
+        self.shared_cache.set(('series', self.api.format_idbank(idbank)), result, ttl=SERIES_TTL)
+
+        metadata = result['metadata']
+        max_interval = MAX_REFRESH_INTERVAL
+        if self.api.cache is not None:
+            # Rafraîchir avant que le cache SQLite ne considère la série périmée
+            max_interval = min(max_interval, self.api.cache.max_age * 0.9)
+        return refresh_interval(metadata.get('FREQ'), metadata.get('LAST_UPDATE'), max_interval)
+
+    def status(self) -> Dict:
+        """État des tâches : dernière exécution, prochaine échéance et erreur éventuelle"""
+        with self._lock:
+            jobs = [
+                {'job': job, 'idbank': idbank, **status}
+                for (job, idbank), status in self._status.items()
+            ]
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'jobs': sorted(jobs, key=lambda job: job.get('next_run') or 0)
+        }
@@ -0,0 +1,604 @@
+import bisect
+import itertools
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+import unicodedata
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Pondération des champs dans le score de pertinence
+FIELD_WEIGHTS = {'idbank': 3.0, 'title_fr': 1.0, 'title_en': 0.5}
+
+# Un jeton qui ne correspond que par préfixe compte moins qu'un jeton exact
+PREFIX_FACTOR = 0.6
+
+# Pondération des champs d'un dataflow
+DATAFLOW_FIELD_WEIGHTS = {'id': 3.0, 'name': 2.0, 'description': 1.0}
+
+# Recherche approchée : similarité minimale entre trigrammes et poids relatif
+FUZZY_MIN_SIMILARITY = 0.6
+FUZZY_FACTOR = 0.5
+
+# Terme trouvé seulement à l'intérieur d'un mot (ex: "pc" dans "ipc")
+SUBSTRING_FACTOR = 0.3
+
+# Version du format de l'index sur disque (à incrémenter si la structure change)
+INDEX_FORMAT_VERSION = 2
+
+# Colonnes du tableau des séries d'un dataflow (champ de series_summary -> libellé)
+SERIES_TABLE_COLUMNS = {
+    'idbank': 'IdBank',
+    'title_fr': 'Titre',
+    'unit': 'Unité',
+    'frequency': 'Fréquence',
+    'last_update': 'Dernière mise à jour'
+}
+
+# Champs indexés pour les filtres à valeurs multiples
+SERIES_TABLE_FACETS = ('frequency', 'unit')
+
+_NO_POSITIONS = np.array([], dtype=np.int64)
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+
+
+def fold_text(text: Optional[str]) -> str:
+    """
+    Met en minuscules, retire les accents et remplace la ponctuation par des espaces
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKD', text.lower().translate(_LIGATURES))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Découpe un texte normalisé en jetons"""
+    return fold_text(text).split()
+
+
+def trigrams(token: str) -> set:
+    """Trigrammes d'un jeton, bornes de mot incluses"""
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _top_positions(keys: np.ndarray, tiebreak: np.ndarray, count: int) -> np.ndarray:
+    """
+    Positions des count plus petites valeurs de (keys, tiebreak), sans ordre,
+    en temps linéaire (les ex aequo de keys sont départagés par tiebreak)
+    """
+    threshold = np.partition(keys, count - 1)[count - 1]
+    better = np.flatnonzero(keys < threshold)
+    tied = np.flatnonzero(keys == threshold)
+    missing = count - len(better)
+    if len(tied) > missing:
+        tied = tied[np.argpartition(tiebreak[tied], missing - 1)[:missing]]
+    return np.concatenate([better, tied])
+
+
+class SeriesCatalogIndex:
+    """
+    Index inversé (jetons exacts et préfixes) sur l'annuaire SERIES_BDM
+
+    L'annuaire est téléchargé une fois puis conservé sur disque ; lors d'un
+    rafraîchissement, seules les séries dont LAST_UPDATE a changé sont réindexées.
+    Pour la recherche, les listes de séries de chaque jeton sont compilées en
+    tableaux numpy triés (numéros de séries et poids) après chaque modification.
+    """
+    def __init__(self, path: Optional[str] = "series_index.pkl", max_age: float = 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self.docs = {}
+        self.postings = {}
+        self.built_at = 0.0
+        self._vocabulary = None
+        self._compiled = None
+        self._lock = threading.RLock()
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def is_fresh(self) -> bool:
+        """Indique si l'annuaire a été synchronisé depuis moins de max_age secondes"""
+        return bool(self.docs) and time.time() - self.built_at < self.max_age
+
+    def _doc_tokens(self, doc: Dict) -> Dict[str, float]:
+        """
+        Jetons d'une série avec leur poids (le meilleur champ l'emporte) ; l'idBank
+        est aussi indexé sans ses zéros initiaux (1769682 trouve 001769682)
+        """
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            tokens = tokenize(doc.get(field))
+            if field == 'idbank':
+                tokens += [token.lstrip('0') for token in tokens if token.lstrip('0')]
+            for token in tokens:
+                if weight > weights.get(token, 0.0):
+                    weights[token] = weight
+        return weights
+
+    def _add(self, doc: Dict):
+        idbank = doc['idbank']
+        self.docs[idbank] = doc
+        for token, weight in self._doc_tokens(doc).items():
+            self.postings.setdefault(token, {})[idbank] = weight
+
+    def _remove(self, idbank: str):
+        doc = self.docs.pop(idbank)
+        for token in self._doc_tokens(doc):
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(idbank, None)
+            if not postings:
+                del self.postings[token]
+
+    def update(self, summaries: Iterable[Dict]) -> Dict:
+        """
+        Synchronise l'index avec l'annuaire complet
+
+        Args:
+            summaries: Séries de l'annuaire (format series_summary)
+
+        Returns:
+            dict: Nombre de séries ajoutées, modifiées, supprimées et inchangées
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        with self._lock:
+            seen = set()
+            for doc in summaries:
+                idbank = doc.get('idbank')
+                if not idbank:
+                    continue
+                seen.add(idbank)
+                current = self.docs.get(idbank)
+                if current is not None and current.get('last_update') == doc.get('last_update'):
+                    counts['unchanged'] += 1
+                    continue
+                if current is not None:
+                    self._remove(idbank)
+                    counts['updated'] += 1
+                else:
+                    counts['added'] += 1
+                self._add(doc)
+
+            for idbank in [idbank for idbank in self.docs if idbank not in seen]:
+                self._remove(idbank)
+                counts['removed'] += 1
+
+            # Annuaire inchangé : vocabulaire et tableaux compilés restent valables
+            if counts['added'] or counts['updated'] or counts['removed']:
+                self._vocabulary = None
+                self._compiled = None
+            self.built_at = time.time()
+            # Compilé avant l'écriture : l'index rechargé est aussitôt interrogeable
+            self._get_compiled()
+            self.save()
+        return counts
+
+    def _get_vocabulary(self) -> List[str]:
+        """Liste triée des jetons, reconstruite après chaque mise à jour"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def _get_compiled(self) -> Dict:
+        """
+        Postings compilés, reconstruits après chaque mise à jour : séries numérotées
+        dans l'ordre des idBank, et entrées (numéro, poids) de tous les jetons à la
+        suite, dans l'ordre du vocabulaire (les jetons d'un même préfixe sont contigus)
+
+        Returns:
+            dict: {'docs': séries par numéro, 'tiebreak': clé de départage par numéro
+                   (longueur du titre, puis idBank), 'ids' et 'weights': entrées
+                   triées par jeton puis numéro, 'offsets': début des entrées de
+                   chaque jeton du vocabulaire (et fin du dernier)}
+        """
+        if self._compiled is None:
+            idbanks = sorted(self.docs)
+            numbers = {idbank: number for number, idbank in enumerate(idbanks)}
+            title_lengths = np.fromiter((len(self.docs[idbank].get('title_fr') or '') for idbank in idbanks),
+                                        dtype=np.int64, count=len(idbanks))
+            postings = [self.postings[token] for token in self._get_vocabulary()]
+            sizes = np.fromiter(map(len, postings), dtype=np.int64, count=len(postings))
+            total = int(sizes.sum())
+            ids = np.fromiter(map(numbers.__getitem__, itertools.chain.from_iterable(postings)),
+                              dtype=np.int64, count=total)
+            weights = np.fromiter(itertools.chain.from_iterable(weights.values() for weights in postings),
+                                  dtype=np.float64, count=total)
+            # Entrées de chaque jeton triées par numéro de série
+            order = np.lexsort((ids, np.repeat(np.arange(len(postings)), sizes)))
+            self._compiled = {
+                'docs': [self.docs[idbank] for idbank in idbanks],
+                'tiebreak': title_lengths * max(1, len(idbanks)) + np.arange(len(idbanks)),
+                'ids': ids[order],
+                'weights': weights[order],
+                'offsets': np.concatenate([[0], np.cumsum(sizes)])
+            }
+        return self._compiled
+
+    def _term_scores(self, term: str, vocabulary: List[str], compiled: Dict,
+                     candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Séries dont un jeton commence par le terme, avec leur meilleur score pour ce terme
+
+        Args:
+            candidates: Numéros des séries retenues par les termes précédents (None : toutes)
+        """
+        start = bisect.bisect_left(vocabulary, term)
+        end = bisect.bisect_left(vocabulary, term + '\uffff')
+        offsets = compiled['offsets']
+        ids = compiled['ids'][offsets[start]:offsets[end]]
+        weights = compiled['weights'][offsets[start]:offsets[end]]
+        scores = weights * PREFIX_FACTOR
+        if start < end and vocabulary[start] == term:
+            # Le jeton exact, premier de la plage, n'est pas pénalisé
+            exact = offsets[start + 1] - offsets[start]
+            scores[:exact] = weights[:exact]
+        if end - start <= 1:
+            return ids, scores
+        if candidates is not None:
+            # Entrées restreintes aux candidats avant la fusion des jetons
+            mask = np.zeros(len(compiled['docs']), dtype=bool)
+            mask[candidates] = True
+            kept = mask[ids]
+            ids, scores = ids[kept], scores[kept]
+        # Une série trouvée par plusieurs jetons garde son meilleur score
+        order = np.lexsort((-scores, ids))
+        ids, first = np.unique(ids[order], return_index=True)
+        return ids, scores[order][first]
+
+    def search(self, query: str, page: int = 1, page_size: Optional[int] = 20) -> Dict:
+        """
+        Recherche les séries contenant tous les termes (ou leurs préfixes)
+
+        Args:
+            page (int): Numéro de page, à partir de 1 (une valeur inférieure vaut 1)
+            page_size (int): Nombre de résultats par page (None pour tout retourner)
+
+        Returns:
+            dict: {'results': séries de la page triées par pertinence, 'total': nombre de séries trouvées}
+        """
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return {'results': [], 'total': 0}
+        # Une page nulle ou négative donnerait un décalage compté depuis la fin du classement
+        page = max(1, page)
+
+        with self._lock:
+            vocabulary = self._get_vocabulary()
+            compiled = self._get_compiled()
+            ids = scores = None
+            # Les termes les plus longs, plus sélectifs, réduisent d'abord les candidats
+            for term in terms:
+                term_ids, term_scores = self._term_scores(term, vocabulary, compiled, ids)
+                if ids is None:
+                    ids, scores = term_ids, term_scores
+                else:
+                    ids, kept, matched = np.intersect1d(ids, term_ids, assume_unique=True,
+                                                        return_indices=True)
+                    scores = scores[kept] + term_scores[matched]
+                if not len(ids):
+                    break
+
+            # Tri par score décroissant, puis titre le plus court et idBank ; seules
+            # les pages jusqu'à la page demandée sont sélectionnées puis triées
+            tiebreak = compiled['tiebreak'][ids]
+            selected = np.arange(len(ids))
+            if page_size and page * page_size < len(ids):
+                selected = _top_positions(-scores, tiebreak, page * page_size)
+            ranked = selected[np.lexsort((tiebreak[selected], -scores[selected]))]
+            if page_size:
+                ranked = ranked[(page - 1) * page_size:]
+            docs = compiled['docs']
+            return {
+                'results': [docs[number] for number in ids[ranked]],
+                'total': len(ids)
+            }
+
+    def save(self):
+        """Écrit l'index sur disque (écriture atomique)"""
+        if not self.path:
+            return
+        payload = {
+            'version': INDEX_FORMAT_VERSION,
+            'built_at': self.built_at,
+            'docs': self.docs,
+            'postings': self.postings,
+            'compiled': self._compiled
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Recharge l'index depuis le disque s'il existe et est au bon format"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Index de recherche illisible, il sera reconstruit : {str(e)}")
+            return
+        if payload.get('version') != INDEX_FORMAT_VERSION:
+            return
+        with self._lock:
+            self.docs = payload['docs']
+            self.postings = payload['postings']
+            self.built_at = payload['built_at']
+            self._vocabulary = None
+            self._compiled = payload['compiled']
+
+
+class DataflowIndex:
+    """
+    Index de recherche des dataflows, construit une fois au chargement du catalogue
+
+    Les champs sont normalisés à la construction ; une requête multi-termes
+    retourne les dataflows contenant tous les termes (exacts, préfixes,
+    approchés par trigrammes ou sous-chaînes), triés par pertinence.
+    """
+    def __init__(self, dataflows: List[Dict]):
+        self.dataflows = list(dataflows)
+        self.postings = {}
+        self.folded = []
+        for position, dataflow in enumerate(self.dataflows):
+            folded_fields = []
+            for field, weight in DATAFLOW_FIELD_WEIGHTS.items():
+                folded = fold_text(dataflow.get(field))
+                folded_fields.append(folded)
+                for token in folded.split():
+                    postings = self.postings.setdefault(token, {})
+                    if weight > postings.get(position, 0.0):
+                        postings[position] = weight
+            self.folded.append(' '.join(folded_fields))
+
+        self.vocabulary = sorted(self.postings)
+        self.trigram_index = {}
+        for token in self.vocabulary:
+            for trigram in trigrams(token):
+                self.trigram_index.setdefault(trigram, []).append(token)
+
+    def __len__(self) -> int:
+        return len(self.dataflows)
+
+    def _matching_tokens(self, term: str) -> Dict[str, float]:
+        """Jetons du vocabulaire correspondant au terme, avec leur facteur de score"""
+        matches = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        for token in self.vocabulary[start:end]:
+            matches[token] = 1.0 if token == term else PREFIX_FACTOR
+
+        # Tolérance aux fautes de frappe : similarité de Dice sur les trigrammes
+        if len(term) >= 3:
+            term_trigrams = trigrams(term)
+            shared = {}
+            for trigram in term_trigrams:
+                for token in self.trigram_index.get(trigram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            for token, count in shared.items():
+                similarity = 2 * count / (len(term_trigrams) + len(token))
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    score = similarity * FUZZY_FACTOR
+                    if score > matches.get(token, 0.0):
+                        matches[token] = score
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Recherche les dataflows correspondant à tous les termes de la requête
+
+        Returns:
+            list: Dataflows triés par pertinence décroissante
+        """
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return []
+
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token, factor in self._matching_tokens(term).items():
+                for position, weight in self.postings[token].items():
+                    score = weight * factor
+                    if score > term_scores.get(position, 0.0):
+                        term_scores[position] = score
+
+            # Terme contenu à l'intérieur d'un mot, comme l'ancienne recherche par sous-chaîne
+            for position, folded in enumerate(self.folded):
+                if position not in term_scores and term in folded:
+                    term_scores[position] = SUBSTRING_FACTOR
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {position: scores[position] + score
+                          for position, score in term_scores.items() if position in scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        if limit:
+            ranked = ranked[:limit]
+        return [self.dataflows[position] for position in ranked]
+
+
+class DataflowSeriesTable:
+    """
+    Séries d'un dataflow stockées par colonnes, avec des index construits une
+    fois au chargement : positions par fréquence, par unité, par code de chaque
+    dimension de la structure (DSD) et par jeton du titre
+
+    Un filtre est une intersection de listes de positions triées (union des
+    valeurs choisies au sein d'un même champ) ; seules les lignes de la page
+    affichée sont ensuite converties en DataFrame. Chaque champ filtrable est
+    aussi codé en entiers, pour compter les séries par valeur (np.bincount)
+    parmi des positions filtrées.
+    """
+    def __init__(self, series: List[Dict], structure: Optional[Dict] = None):
+        """
+        Args:
+            series: Résumés des séries (voir dataflow_series_summary)
+            structure (dict): Structure du dataflow (voir parse_datastructure) ;
+                sans structure, seules la fréquence et l'unité sont filtrables
+        """
+        self.columns = {
+            field: np.array([serie.get(field) for serie in series], dtype=object)
+            for field in SERIES_TABLE_COLUMNS
+        }
+
+        # Dimensions de la structure renseignées dans les codes des séries
+        self.dimensions = []
+        self.labels = {}
+        codes = [serie.get('codes') or {} for serie in series]
+        if structure:
+            for dimension in structure.get('dimensions', []):
+                if any(dimension['id'] in serie_codes for serie_codes in codes):
+                    self.dimensions.append(dimension)
+                    self.labels[dimension['id']] = \
+                        structure.get('codelists', {}).get(dimension['codelist']) or {}
+
+        self.facets = {}
+        self.facet_values = {}
+        self.facet_codes = {}
+        for field in SERIES_TABLE_FACETS:
+            self._index_field(field, self.columns[field])
+        for dimension in self.dimensions:
+            self._index_field(dimension['id'], [serie_codes.get(dimension['id']) for serie_codes in codes])
+
+        postings = {}
+        for position, serie in enumerate(series):
+            tokens = set(tokenize(serie.get('title_fr')))
+            tokens.add((serie.get('idbank') or '').lstrip('0'))
+            for token in tokens:
+                postings.setdefault(token, []).append(position)
+        self.postings = {token: np.array(positions, dtype=np.int64)
+                         for token, positions in postings.items()}
+        self.vocabulary = sorted(self.postings)
+
+    def _index_field(self, field: str, values: Iterable[Optional[str]]):
+        """Code un champ en entiers (valeurs triées) et regroupe les positions par valeur"""
+        codes, uniques = pd.factorize(np.array([value or '' for value in values], dtype=object), sort=True)
+        codes = codes.astype(np.int64)
+        order = np.argsort(codes, kind='stable')
+        groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1) if len(order) else []
+        self.facet_codes[field] = codes
+        self.facet_values[field] = list(uniques)
+        self.facets[field] = dict(zip(uniques, groups))
+
+    def __len__(self) -> int:
+        return len(self.columns['idbank'])
+
+    def facet_fields(self) -> Dict[str, str]:
+        """
+        Champs filtrables et leur libellé : dimensions de la structure
+        (fréquence à défaut), puis unité
+        """
+        fields = {dimension['id']: dimension['name'] for dimension in self.dimensions}
+        if 'FREQ' not in fields:
+            fields = {'frequency': "Fréquence", **fields}
+        fields['unit'] = "Unité"
+        return fields
+
+    def facet_label(self, field: str, value: str) -> str:
+        """Code suivi de son libellé dans la codelist de la dimension, s'il est connu"""
+        label = self.labels.get(field, {}).get(value)
+        return f"{value} - {label}" if label else value
+
+    def facet_counts(self, field: str, positions: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """
+        Valeurs d'un champ indexé et leur nombre de séries, par valeur croissante
+
+        Args:
+            positions: Séries comptées (toutes si None) ; les valeurs absentes sont omises
+        """
+        codes = self.facet_codes[field]
+        if positions is not None:
+            codes = codes[positions]
+        counts = np.bincount(codes, minlength=len(self.facet_values[field]))
+        return {value: int(count) for value, count in zip(self.facet_values[field], counts) if count}
+
+    def _term_positions(self, term: str) -> np.ndarray:
+        """Séries dont un jeton du titre (ou l'idBank) commence par le terme"""
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        matches = [self.postings[token] for token in self.vocabulary[start:end]]
+        if not matches:
+            return _NO_POSITIONS
+        return matches[0] if len(matches) == 1 else np.unique(np.concatenate(matches))
+
+    def filter(self, frequencies: Sequence[str] = (), units: Sequence[str] = (),
+               text: str = '', selections: Optional[Dict[str, Sequence[str]]] = None) -> np.ndarray:
+        """
+        Positions des séries correspondant à tous les filtres renseignés
+
+        Args:
+            frequencies: Fréquences acceptées (toutes si vide)
+            units: Unités acceptées (toutes si vide)
+            text (str): Termes devant tous préfixer un mot du titre ou l'idBank
+            selections (dict): Valeurs acceptées par champ (voir facet_fields),
+                par exemple {'INDICATEUR': ['IPC'], 'CORRECTION': ['CVS', 'BRUT']}
+        """
+        selected = {'frequency': frequencies, 'unit': units}
+        for field, values in (selections or {}).items():
+            selected[field] = list(selected.get(field, ())) + list(values)
+        candidates = []
+        for field, values in selected.items():
+            if values:
+                groups = [self.facets.get(field, {}).get(value, _NO_POSITIONS) for value in values]
+                candidates.append(groups[0] if len(groups) == 1 else np.unique(np.concatenate(groups)))
+        for term in set(tokenize(text)):
+            candidates.append(self._term_positions(term.lstrip('0') or term))
+
+        if not candidates:
+            return np.arange(len(self))
+        # Intersection en partant de la liste la plus courte
+        candidates.sort(key=len)
+        positions = candidates[0]
+        for other in candidates[1:]:
+            if not len(positions):
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def drilldown(self, selections: Dict[str, Sequence[str]], text: str = '') -> Tuple[np.ndarray, Dict]:
+        """
+        Navigation par facettes : positions filtrées et, pour chaque champ
+        filtrable, décompte de ses valeurs sous les filtres des autres champs
+        (les valeurs d'un champ restent ainsi cumulables)
+
+        Returns:
+            tuple: (positions, {champ: {valeur: nombre de séries}})
+        """
+        positions = self.filter(text=text, selections=selections)
+        counts = {}
+        for field in self.facet_fields():
+            if selections.get(field):
+                others = {other: values for other, values in selections.items() if other != field}
+                counts[field] = self.facet_counts(field, self.filter(text=text, selections=others))
+            else:
+                counts[field] = self.facet_counts(field, positions)
+        return positions, counts
+
+    def page(self, positions: np.ndarray, page: int = 1, page_size: int = 50) -> pd.DataFrame:
+        """DataFrame des seules lignes de la page demandée (numérotée à partir de 1)"""
+        visible = positions[(page - 1) * page_size:page * page_size]
+        return pd.DataFrame({
+            label: self.columns[field][visible]
+            for field, label in SERIES_TABLE_COLUMNS.items()
+        })
@@ -0,0 +1,331 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from observations import ObservationColumns, period_key, period_sort_value, period_end_sort_value
+
+
+class SeriesCache:
+    """
+    Stockage local (SQLite) des observations et métadonnées des séries,
+    indexé par idBank, avec compteurs de hits/misses
+    """
+    def __init__(self, path: str = "insee_cache.sqlite", max_age: float = 6 * 3600):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale': 0, 'misses': 0, 'refreshes': 0, 'revalidations': 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Ancien format de la liste des séries d'un dataflow (sans leurs codes) :
+            # la liste est simplement redemandée à l'API
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(dataflow_series)")]
+            if columns and 'codes' not in columns:
+                conn.execute("DROP TABLE dataflow_series")
+                conn.execute("DROP TABLE IF EXISTS dataflows")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS series (
+                    idbank TEXT PRIMARY KEY,
+                    metadata TEXT NOT NULL,
+                    covered_from TEXT,
+                    last_period TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS observations (
+                    idbank TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    sort_key INTEGER NOT NULL,
+                    value REAL,
+                    status TEXT,
+                    quality TEXT,
+                    PRIMARY KEY (idbank, period)
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_observations_sort ON observations (idbank, sort_key)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS dataflows (
+                    dataflow_id TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS dataflow_series (
+                    dataflow_id TEXT NOT NULL,
+                    idbank TEXT NOT NULL,
+                    title_fr TEXT,
+                    title_en TEXT,
+                    unit TEXT,
+                    frequency TEXT,
+                    last_update TEXT,
+                    codes TEXT,
+                    PRIMARY KEY (dataflow_id, idbank)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS datastructures (
+                    dataflow_id TEXT PRIMARY KEY,
+                    structure TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS validations (
+                    idbank TEXT PRIMARY KEY,
+                    metadata TEXT,
+                    checked_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Ouvre une connexion courte : le cache est partagé entre threads et processus"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, event: str):
+        """Incrémente un compteur (hits, stale, misses, refreshes, revalidations)"""
+        with self._lock:
+            self._stats[event] += 1
+
+    def stats(self) -> Dict:
+        """
+        Retourne une copie des compteurs et le taux de hits (séries périmées
+        servies sans attendre l'API comprises)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['hits'] + stats['stale'] + stats['misses'] + stats['refreshes']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale']) / total if total else 0.0
+        return stats
+
+    def get_entry(self, idbank: str) -> Optional[Dict]:
+        """Retourne l'état en cache d'une série, ou None si elle est absente"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT metadata, covered_from, last_period, fetched_at FROM series WHERE idbank = ?",
+                (idbank,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'metadata': json.loads(row[0]),
+            'covered_from': row[1],
+            'last_period': row[2],
+            'fetched_at': row[3]
+        }
+
+    def covers(self, entry: Dict, start_period: Optional[str]) -> bool:
+        """Indique si l'historique en cache remonte au moins jusqu'à start_period"""
+        if entry['covered_from'] is None:
+            return True
+        if start_period is None:
+            return False
+        return period_key(entry['covered_from']) <= period_key(start_period)
+
+    def is_fresh(self, entry: Dict, max_age: Optional[float] = None) -> bool:
+        """Indique si l'entrée a été rafraîchie depuis moins de max_age secondes (self.max_age par défaut)"""
+        return time.time() - entry['fetched_at'] < (self.max_age if max_age is None else max_age)
+
+    def store(self, idbank: str, metadata: Dict, observations: List[Dict],
+              covered_from: Optional[str] = None):
+        """
+        Fusionne des observations dans le cache et met à jour les métadonnées
+
+        Args:
+            covered_from (str): Période de début demandée (None pour l'historique complet)
+        """
+        entry = self.get_entry(idbank)
+        if entry is not None:
+            # On conserve la couverture la plus large entre l'existant et le nouvel appel
+            if entry['covered_from'] is None or covered_from is None:
+                covered_from = None
+            elif period_key(entry['covered_from']) < period_key(covered_from):
+                covered_from = entry['covered_from']
+
+        rows = [
+            (idbank, obs['date'], period_sort_value(obs['date']), obs['valeur'],
+             obs['statut'], obs['qualite'])
+            for obs in observations
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            last = conn.execute(
+                "SELECT period FROM observations WHERE idbank = ? ORDER BY sort_key DESC LIMIT 1",
+                (idbank,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?)",
+                (idbank, json.dumps(metadata, ensure_ascii=False), covered_from,
+                 last[0] if last else None, time.time())
+            )
+
+    def load(self, idbank: str, start_period: Optional[str] = None,
+             end_period: Optional[str] = None, as_frame: bool = False) -> Optional[Dict]:
+        """
+        Relit une série depuis le cache, au même format que parse_series_xml
+        (avec as_frame, les observations sont retournées sous 'frame')
+        """
+        entry = self.get_entry(idbank)
+        if entry is None:
+            return None
+
+        query = "SELECT period, value, status, quality FROM observations WHERE idbank = ?"
+        params = [idbank]
+        if start_period:
+            query += " AND sort_key >= ?"
+            params.append(period_sort_value(start_period))
+        if end_period:
+            query += " AND sort_key <= ?"
+            params.append(period_end_sort_value(end_period))
+        query += " ORDER BY sort_key"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        if as_frame:
+            columns = ObservationColumns()
+            for period, value, status, quality in rows:
+                columns.append(period, value, status, quality)
+            return {'metadata': entry['metadata'], 'frame': columns.to_frame()}
+
+        return {
+            'metadata': entry['metadata'],
+            'observations': [
+                {'date': period, 'valeur': value, 'statut': status, 'qualite': quality}
+                for period, value, status, quality in rows
+            ]
+        }
+
+    def get_dataflow_entry(self, dataflow_id: str) -> Optional[Dict]:
+        """
+        Retourne la liste des séries d'un dataflow en cache, ou None si elle est absente
+
+        Returns:
+            dict: {'series': [résumés (voir series_summary)], 'fetched_at': horodatage}
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fetched_at FROM dataflows WHERE dataflow_id = ?", (dataflow_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = conn.execute(
+                "SELECT idbank, title_fr, title_en, unit, frequency, last_update, codes "
+                "FROM dataflow_series WHERE dataflow_id = ? ORDER BY idbank",
+                (dataflow_id,)
+            ).fetchall()
+        return {
+            'series': [
+                {'idbank': idbank, 'title_fr': title_fr, 'title_en': title_en,
+                 'unit': unit, 'frequency': frequency, 'last_update': last_update,
+                 'codes': json.loads(codes) if codes else {}}
+                for idbank, title_fr, title_en, unit, frequency, last_update, codes in rows
+            ],
+            'fetched_at': row[0]
+        }
+
+    def store_dataflow(self, dataflow_id: str, series: List[Dict]):
+        """Remplace la liste des séries d'un dataflow"""
+        rows = [
+            (dataflow_id, serie['idbank'], serie['title_fr'], serie['title_en'],
+             serie['unit'], serie['frequency'], serie['last_update'],
+             json.dumps(serie.get('codes') or {}, ensure_ascii=False))
+            for serie in series if serie['idbank']
+        ]
+        with self._connect() as conn:
+            conn.execute("DELETE FROM dataflow_series WHERE dataflow_id = ?", (dataflow_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO dataflow_series VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO dataflows VALUES (?, ?)", (dataflow_id, time.time())
+            )
+
+    def get_datastructure(self, dataflow_id: str) -> Optional[Dict]:
+        """
+        Retourne la structure (dimensions et codelists) d'un dataflow en cache, ou None
+
+        Returns:
+            dict: {'structure': voir parse_datastructure, 'fetched_at': horodatage}
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT structure, fetched_at FROM datastructures WHERE dataflow_id = ?", (dataflow_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'structure': json.loads(row[0]), 'fetched_at': row[1]}
+
+    def store_datastructure(self, dataflow_id: str, structure: Dict):
+        """Enregistre la structure d'un dataflow"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO datastructures VALUES (?, ?, ?)",
+                (dataflow_id, json.dumps(structure, ensure_ascii=False), time.time())
+            )
+
+    def get_validations(self, idbanks: List[str], invalid_max_age: float) -> Dict[str, Optional[Dict]]:
+        """
+        Résultats de validation encore valables : métadonnées pour un idBank
+        existant, None pour un idBank inconnu de l'API depuis moins de invalid_max_age
+
+        Les séries présentes dans le cache sont considérées comme existantes.
+        """
+        results = {}
+        # Requêtes par paquets : SQLite limite le nombre de paramètres
+        for start in range(0, len(idbanks), 500):
+            chunk = idbanks[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            with self._connect() as conn:
+                for idbank, metadata in conn.execute(
+                    f"SELECT idbank, metadata FROM series WHERE idbank IN ({placeholders})", chunk
+                ):
+                    results[idbank] = json.loads(metadata)
+                for idbank, metadata, checked_at in conn.execute(
+                    f"SELECT idbank, metadata, checked_at FROM validations WHERE idbank IN ({placeholders})",
+                    chunk
+                ):
+                    if idbank in results:
+                        continue
+                    if metadata is not None:
+                        results[idbank] = json.loads(metadata)
+                    elif time.time() - checked_at < invalid_max_age:
+                        results[idbank] = None
+        return results
+
+    def store_validations(self, validations: Dict[str, Optional[Dict]]):
+        """Enregistre des résultats de validation (None : idBank inconnu)"""
+        now = time.time()
+        rows = [
+            (idbank, json.dumps(metadata, ensure_ascii=False) if metadata is not None else None, now)
+            for idbank, metadata in validations.items()
+        ]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO validations VALUES (?, ?, ?)", rows)
+
+    def clear(self):
+        """Vide entièrement le cache"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM observations")
+            conn.execute("DELETE FROM series")
+            conn.execute("DELETE FROM dataflow_series")
+            conn.execute("DELETE FROM dataflows")
+            conn.execute("DELETE FROM datastructures")
+            conn.execute("DELETE FROM validations")
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+from memory_usage import estimate_size
+
+# Durées de validité par défaut (secondes) des données partagées entre sessions
+SERIES_TTL = 15 * 60
+DATAFLOWS_TTL = 6 * 3600
+DATAFLOW_SERIES_TTL = 3600
+
+# Mémoire allouée par défaut aux données partagées (octets, estimation de estimate_size)
+DEFAULT_MAX_BYTES = 512 * 2 ** 20
+
+
+def is_cacheable(value: Any) -> bool:
+    """Les retours d'erreur de l'API ({"error": ...}) ne sont jamais mis en cache"""
+    return value is not None and not (isinstance(value, dict) and "error" in value)
+
+
+class _Flight:
+    """Appel en cours partagé par les requêtes identiques concurrentes"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    """
+    Cache mémoire du processus, commun à toutes les sessions Streamlit
+
+    Les entrées expirent après leur TTL et les moins récemment utilisées sont
+    évincées au-delà de max_entries ou de max_bytes (taille estimée à l'ajout).
+    Des appels concurrents sur la même clé sont regroupés : un seul appel amont
+    est lancé, les autres attendent son résultat.
+
+    Les valeurs sont partagées en lecture seule : les sessions n'en gardent que
+    la clé et les relisent à chaque exécution (rechargées si elles ont été évincées).
+    """
+    def __init__(self, max_entries: int = 256, default_ttl: float = SERIES_TTL,
+                 max_bytes: Optional[int] = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retourne la valeur en cache si elle n'a pas expiré, sinon None"""
+        with self._lock:
+            return self._get_locked(key)
+
+    def _get_locked(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if time.time() >= expires_at:
+            self._remove_locked(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remove_locked(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Ajoute une valeur, en évinçant les entrées les moins récemment utilisées
+        tant que le nombre d'entrées ou la mémoire estimée dépasse le budget
+        (la valeur ajoutée est toujours conservée)
+        """
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        size = estimate_size(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > 1 and (
+                    len(self._entries) > self.max_entries
+                    or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                self._remove_locked(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None,
+                    cache_if: Callable[[Any], bool] = is_cacheable) -> Any:
+        """
+        Retourne la valeur en cache ou la charge une seule fois pour tous les demandeurs
+
+        Args:
+            key: Clé de la requête (ex: ('series', idbank))
+            loader: Fonction sans argument qui interroge l'API
+            ttl (float): Durée de validité en secondes (default_ttl si None)
+            cache_if: Prédicat indiquant si le résultat peut être conservé
+        """
+        with self._lock:
+            value = self._get_locked(key)
+            if value is not None:
+                self._stats['hits'] += 1
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._stats['misses'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            if cache_if(flight.value):
+                self.set(key, flight.value, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, key: Hashable):
+        """Supprime une entrée du cache"""
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key)
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def shared_ids(self) -> Set[int]:
+        """Identifiants (id) des valeurs en cache, pour ne pas les compter dans les sessions"""
+        with self._lock:
+            return {id(value) for value, _, _ in self._entries.values()}
+
+    def stats(self) -> Dict:
+        """Compteurs d'utilisation, nombre d'entrées et mémoire estimée (octets)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """Retourne l'instance unique du processus (créée au premier appel)"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SharedCache()
+        return _shared_cache